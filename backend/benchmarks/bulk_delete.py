@@ -0,0 +1,116 @@
+"""
+Benchmark bulk message deletion, one statement versus one query per id.
+
+Usage: python -m benchmarks.bulk_delete
+"""
+
+import statistics
+import time
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.orm import undefer
+
+from benchmarks.common import make_session_factory, print_table
+from src.models.chat_models import Chat, ChatStats, Message
+from src.models.user import User
+from src.services.chat import MessageService
+from src.services.images import ImageService
+
+SIZES = [10, 100, 1000]
+REPEAT = 5
+
+
+def seed_messages(db, chat, count: int):
+    ids = [uuid.uuid4() for _ in range(count)]
+    db.execute(
+        Message.__table__.insert(),
+        [
+            {"id": id_, "chat_id": chat.id, "role": "user", "content": "x" * 200}
+            for id_ in ids
+        ],
+    )
+    db.query(ChatStats).filter(ChatStats.chat_id == chat.id).update(
+        {ChatStats.message_count: ChatStats.message_count + count}
+    )
+    db.commit()
+    return ids
+
+
+def delete_per_id(db, user, chat_id, message_ids):
+    """The previous implementation: a SELECT and an ORM delete per id."""
+    chat = db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).one()
+    for message_id in message_ids:
+        message = (
+            db.query(Message)
+            .options(undefer(Message.images))
+            .filter(Message.id == message_id, Message.chat_id == chat.id)
+            .first()
+        )
+        if message:
+            ImageService.release_images(db, [message.images])
+            db.delete(message)
+    db.commit()
+
+
+def measure(session_factory, user, chat, delete, count: int):
+    engine = session_factory.kw["bind"]
+    statements = []
+
+    def record(*args):
+        statements.append(1)
+
+    samples = []
+    for _ in range(REPEAT):
+        db = session_factory()
+        ids = seed_messages(db, chat, count)
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", record)
+        start = time.perf_counter()
+        delete(db, user, chat.id, ids)
+        samples.append((time.perf_counter() - start) * 1000)
+        event.remove(engine, "before_cursor_execute", record)
+        db.close()
+    return {
+        "statements": len(statements),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+    }
+
+
+def main() -> None:
+    session_factory = make_session_factory()
+    db = session_factory()
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chat = Chat(user_id=user.id, title="Benchmark", stats=ChatStats())
+    db.add(chat)
+    db.commit()
+    # Rows to keep the table from being empty between runs
+    seed_messages(db, chat, 10_000)
+
+    bulk = MessageService.bulk_delete_messages
+    rows = []
+    for count in SIZES:
+        for name, delete in (("per id", delete_per_id), ("one statement", bulk)):
+            rows.append(
+                {
+                    "method": name,
+                    "ids": count,
+                    **measure(session_factory, user, chat, delete, count),
+                }
+            )
+    print("Bulk message deletion")
+    print_table(rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark chat turns over HTTP versus the multiplexed WebSocket channel.
+
+Ollama is replaced by a stub that answers at once, so the numbers show the
+per-turn overhead of the backend: authentication, idempotency bookkeeping,
+persistence and framing.
+
+Usage: python -m benchmarks.chat_channel
+"""
+
+import time
+
+from fastapi.testclient import TestClient
+
+from benchmarks.common import make_session_factory, print_table
+from src.auth.jwt import create_access_token
+from src.database import get_db, get_session_factory
+from src.main import app
+from src.models.chat_models import Chat, ChatStats
+from src.models.user import User
+from src.services.chat_models import OllamaService
+
+TURNS = 300
+CHUNKS = [1, 50]
+CONCURRENCY = [1, 4]
+
+
+def stub_ollama(chunks: int) -> None:
+    async def chat_with_model(payload):
+        return {"message": {"role": "assistant", "content": "ok"}, "eval_count": 1}
+
+    async def stream_chat(payload, on_chunk):
+        for _ in range(chunks):
+            await on_chunk({"message": {"role": "assistant", "content": "ok "}})
+        return {"message": {"role": "assistant", "content": "ok"}, "eval_count": 1}
+
+    async def get_context_window(model_name, options=None):
+        return 4096
+
+    OllamaService.chat_with_model = staticmethod(chat_with_model)
+    OllamaService.stream_chat = staticmethod(stream_chat)
+    OllamaService.get_context_window = staticmethod(get_context_window)
+
+
+def turn_body(chat_id, i: int):
+    # Distinct contents, identical ones would be deduplicated
+    return {
+        "model": "llama3",
+        "chatId": str(chat_id),
+        "messages": [{"role": "user", "content": f"turn {i}"}],
+    }
+
+
+def run_http(client, chat_id) -> float:
+    start = time.perf_counter()
+    for i in range(TURNS):
+        client.post("/api/v1/ollama/chat", json=turn_body(chat_id, i)).raise_for_status()
+    return time.perf_counter() - start
+
+
+def run_channel(client, chat_id, concurrency: int, offset: int) -> float:
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        start = time.perf_counter()
+        sent = done = 0
+        while done < TURNS:
+            while sent < TURNS and sent - done < concurrency:
+                ws.send_json(
+                    {
+                        "op": "send",
+                        "id": str(sent),
+                        "request": turn_body(chat_id, offset + sent),
+                    }
+                )
+                sent += 1
+            frame = ws.receive_json()
+            if frame["type"] == "error":
+                raise RuntimeError(frame)
+            if frame["type"] == "done":
+                done += 1
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    session_factory = make_session_factory()
+    db = session_factory()
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chat = Chat(user_id=user.id, title="Benchmark", stats=ChatStats())
+    db.add(chat)
+    db.commit()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    client = TestClient(app)
+    client.cookies.set(
+        "access_token",
+        create_access_token(
+            data={"sub": str(user.id), "username": user.username},
+            token_version=user.token_version,
+        ),
+    )
+
+    rows = []
+    offset = 0
+    for chunks in CHUNKS:
+        stub_ollama(chunks)
+        offset += TURNS
+        elapsed = run_http(client, chat.id) if chunks == 1 else None
+        if elapsed is not None:
+            rows.append(
+                {
+                    "path": "HTTP POST /ollama/chat",
+                    "chunks": "-",
+                    "concurrency": 1,
+                    "turns_per_s": TURNS / elapsed,
+                    "ms_per_turn": elapsed * 1000 / TURNS,
+                }
+            )
+        for concurrency in CONCURRENCY:
+            offset += TURNS
+            elapsed = run_channel(client, chat.id, concurrency, offset)
+            rows.append(
+                {
+                    "path": "WebSocket /ollama/ws",
+                    "chunks": chunks,
+                    "concurrency": concurrency,
+                    "turns_per_s": TURNS / elapsed,
+                    "ms_per_turn": elapsed * 1000 / TURNS,
+                }
+            )
+
+    print(f"Chat turns ({TURNS} per row, stubbed Ollama)")
+    print_table(rows)
+    app.dependency_overrides.clear()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
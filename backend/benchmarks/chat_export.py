@@ -0,0 +1,145 @@
+"""
+Benchmark the peak memory of exporting a whole account, built in memory
+versus streamed, and the throughput of the batched import.
+
+Peak memory is measured with tracemalloc; the streamed export should stay
+flat as the history grows.
+
+Usage: python -m benchmarks.chat_export
+"""
+
+import io
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_session_factory, print_table
+from src.core.responses import json_bytes
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+from src.services.chat import ChatService
+from src.services.chat_export import (
+    EXPORT_MESSAGE_FIELDS,
+    ChatExportService,
+    ChatImporter,
+)
+
+SIZES = [10_000, 50_000]
+CHATS = 10
+
+
+def seed(session_factory, message_count: int) -> uuid.UUID:
+    db = session_factory()
+    user = User(
+        username=f"bench{message_count}",
+        email=f"bench{message_count}@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+
+    start = datetime(2025, 1, 1)
+    text = "lorem ipsum dolor sit amet " * 20
+    for c in range(CHATS):
+        chat = Chat(user_id=user.id, title=f"Chat {c}")
+        db.add(chat)
+        db.flush()
+        db.execute(
+            Message.__table__.insert(),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "chat_id": chat.id,
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": f"{i} {text}",
+                    "thinking": text if i % 2 else None,
+                    "created_at": start + timedelta(seconds=i),
+                    "tokens_used": i,
+                }
+                for i in range(message_count // CHATS)
+            ],
+        )
+    user_id = user.id
+    db.commit()
+    db.close()
+    return user_id
+
+
+def export_in_memory(session_factory, user_id: uuid.UUID) -> int:
+    """Every chat loaded whole, then serialized as one document."""
+    db = session_factory()
+    user = User(id=user_id)
+    chats = [
+        ChatService.get_chat_with_messages(db, user, chat_id, EXPORT_MESSAGE_FIELDS)
+        for (chat_id,) in db.query(Chat.id).filter(Chat.user_id == user_id)
+    ]
+    size = len(json_bytes({"chats": chats}))
+    db.close()
+    return size
+
+
+def export_streamed(session_factory, user_id: uuid.UUID) -> int:
+    chunks = ChatExportService.export_ndjson(session_factory, user_id)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main() -> None:
+    session_factory = make_session_factory()
+    rows = []
+    for size in SIZES:
+        user_id = seed(session_factory, size)
+        for name, variant in [
+            ("export, in memory", export_in_memory),
+            ("export, streamed", export_streamed),
+        ]:
+            out, elapsed, peak = measure(lambda: variant(session_factory, user_id))
+            rows.append(
+                {
+                    "messages": size,
+                    "operation": name,
+                    "mb_out": out / 1024 / 1024,
+                    "ms": elapsed,
+                    "peak_mb": peak,
+                }
+            )
+
+        exported = b"".join(ChatExportService.export_ndjson(session_factory, user_id))
+
+        def run_import():
+            db = session_factory()
+            importer = ChatImporter(db, db.get(User, user_id))
+            for number, line in enumerate(io.BytesIO(exported), 1):
+                importer.add(number, line)
+            result = importer.finish()
+            db.close()
+            return result["imported_messages"]
+
+        imported, elapsed, peak = measure(run_import)
+        rows.append(
+            {
+                "messages": imported,
+                "operation": "import, batched",
+                "mb_out": 0.0,
+                "ms": elapsed,
+                "peak_mb": peak,
+            }
+        )
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
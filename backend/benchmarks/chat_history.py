@@ -0,0 +1,87 @@
+"""
+Benchmark loading a 10k message chat, whole versus keyset pages.
+
+Usage: python -m benchmarks.chat_history [message_count]
+"""
+
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_session_factory, print_table, timeit
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+from src.services.chat import ChatService
+
+PAGE_SIZE = 50
+
+
+def seed(db, message_count: int):
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chat = Chat(user_id=user.id, title="Benchmark")
+    db.add(chat)
+    db.flush()
+
+    start = datetime(2025, 1, 1)
+    text = "lorem ipsum dolor sit amet " * 20
+    db.execute(
+        Message.__table__.insert(),
+        [
+            {
+                "id": uuid.uuid4(),
+                "chat_id": chat.id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"{i} {text}",
+                "thinking": text * 5 if i % 2 else None,
+                "created_at": start + timedelta(seconds=i),
+                "tokens_used": 0,
+            }
+            for i in range(message_count)
+        ],
+    )
+    db.commit()
+    return user, chat
+
+
+def main(message_count: int = 10_000) -> None:
+    db = make_session_factory()()
+    user, chat = seed(db, message_count)
+
+    def load(limit=None, before=None):
+        return ChatService.get_chat_with_messages(
+            db, user, chat.id, limit=limit, before=before
+        )
+
+    # Cursor of a page halfway into the history
+    cursor = None
+    for _ in range(message_count // PAGE_SIZE // 2):
+        cursor = load(PAGE_SIZE, cursor)["next_cursor"]
+
+    rows = [
+        {"query": "whole history", "messages": message_count, **timeit(load)},
+        {
+            "query": "newest page",
+            "messages": PAGE_SIZE,
+            **timeit(lambda: load(PAGE_SIZE)),
+        },
+        {
+            "query": "middle page (cursor)",
+            "messages": PAGE_SIZE,
+            **timeit(lambda: load(PAGE_SIZE, cursor)),
+        },
+    ]
+    print(f"Chat history, {message_count} messages")
+    print_table(rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,86 @@
+"""
+Benchmark the title_contains filter of the chat list.
+
+One user with many chats among other users' chats; times the first page of
+matches for a rare and a common title fragment, with exact totals.
+
+Usage: python -m benchmarks.chat_titles [chats_per_user]
+"""
+
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_session_factory, print_table, timeit
+from src.migrations import upgrade
+from src.models.chat_models import Chat
+from src.models.user import User
+from src.services.chat import ChatService
+
+USERS = 20
+WORDS = ["docker", "python", "recipe", "travel", "budget", "resume", "poem", "sql"]
+
+
+def seed(db, chats_per_user: int):
+    users = [
+        User(
+            username=f"bench{i}",
+            email=f"bench{i}@example.com",
+            password_hash="x",
+            role="user",
+            is_active=True,
+        )
+        for i in range(USERS)
+    ]
+    db.add_all(users)
+    db.flush()
+
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    for user in users:
+        db.execute(
+            Chat.__table__.insert(),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user.id,
+                    "title": " ".join(rng.sample(WORDS, 3)) + f" #{i}",
+                    "created_at": start,
+                    "updated_at": start + timedelta(minutes=i),
+                    "is_archived": False,
+                }
+                for i in range(chats_per_user)
+            ],
+        )
+    db.commit()
+    return users[0]
+
+
+def main(chats_per_user: int = 5000) -> None:
+    session_factory = make_session_factory()
+    db = session_factory()
+    user = seed(db, chats_per_user)
+    upgrade(session_factory.kw["bind"])
+
+    def page(text):
+        return ChatService.get_user_chats(
+            db, user, limit=20, title_contains=text, total="exact"
+        )
+
+    rows = []
+    for label, text in (
+        ("common word", "docker"),
+        ("rare suffix", "#4999"),
+        ("no match", "kubernetes"),
+    ):
+        rows.append(
+            {"filter": label, "total": page(text)["total"], **timeit(lambda: page(text))}
+        )
+    print(f"Chat title filter, {chats_per_user} chats per user, {USERS} users")
+    print_table(rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,64 @@
+"""
+Helpers shared by the benchmarks.
+
+Benchmarks run against a throwaway SQLite file by default, or against
+BENCHMARK_DATABASE_URL (for example a scratch Postgres database).
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database import Base
+
+# Register every model so relationships between them resolve
+from src.models import (  # noqa: F401
+    chat_models,
+    embedding,
+    idempotency,
+    image_blob,
+    sync,
+    user,
+    user_settings,
+)
+
+
+def make_session_factory():
+    """Create all tables in a fresh benchmark database."""
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    if not url:
+        directory = tempfile.mkdtemp(prefix="rovert-bench-")
+        url = f"sqlite:///{directory}/bench.db"
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def timeit(func: Callable[[], object], repeat: int = 5) -> Dict[str, float]:
+    """Run func a few times and return timings in milliseconds."""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+
+
+def print_table(rows: List[Dict[str, object]]) -> None:
+    """Print rows of equal keys as an aligned text table."""
+    if not rows:
+        return
+    headers = list(rows[0])
+    cells = [
+        [f"{row[h]:.2f}" if isinstance(row[h], float) else str(row[h]) for h in headers]
+        for row in rows
+    ]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    for line in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(line, widths)))
@@ -0,0 +1,169 @@
+"""
+Benchmark the CPU cost and ratio of response compression per encoding/level.
+
+Compresses a real chat history response, a model list shaped like the
+/ollama/tags response, and a generation streamed as 500 small chunks each
+followed by a flush, as the compression middleware does for streams.
+
+Usage: python -m benchmarks.compression [message_count]
+"""
+
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.common import make_session_factory, print_table, timeit
+from src.core.compression import (
+    BrotliEncoder,
+    GzipEncoder,
+    ZstdEncoder,
+    available_encoders,
+)
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+from src.services.chat import ChatService
+
+LEVELS = {
+    GzipEncoder: [1, 6, 9],
+    ZstdEncoder: [1, 3, 9],
+    BrotliEncoder: [1, 4, 6],
+}
+STREAM_CHUNKS = 500
+
+WORDS = (
+    "the a to of and in is it you that for docker compose container image "
+    "python function return value error config file server request model "
+    "token chat message user assistant run install version build test"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def chat_payload(message_count: int) -> bytes:
+    db = make_session_factory()()
+    rng = random.Random(0)
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chat = Chat(user_id=user.id, title="Benchmark")
+    db.add(chat)
+    db.flush()
+
+    start = datetime(2025, 1, 1)
+    db.execute(
+        Message.__table__.insert(),
+        [
+            {
+                "id": uuid.uuid4(),
+                "chat_id": chat.id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": sentence(rng, 20 if i % 2 == 0 else 150),
+                "created_at": start + timedelta(seconds=i),
+                "tokens_used": rng.randint(10, 400),
+            }
+            for i in range(message_count)
+        ],
+    )
+    db.commit()
+    result = ChatService.get_chat_with_messages(db, user, chat.id)
+    db.close()
+    return json.dumps(jsonable_encoder(result)).encode()
+
+
+def tags_payload() -> bytes:
+    models = [
+        {
+            "name": f"model-{i}:latest",
+            "model": f"model-{i}:latest",
+            "modified_at": "2025-01-01T00:00:00Z",
+            "size": 4_000_000_000 + i,
+            "digest": uuid.UUID(int=i).hex * 2,
+            "details": {
+                "format": "gguf",
+                "family": "llama",
+                "parameter_size": "8B",
+                "quantization_level": "Q4_K_M",
+            },
+            "capabilities": ["completion", "tools"],
+        }
+        for i in range(40)
+    ]
+    return json.dumps({"models": models}).encode()
+
+
+def compress_whole(encoder_class, level: int, payload: bytes) -> bytes:
+    encoder = encoder_class(level)
+    return encoder.compress(payload) + encoder.finish()
+
+
+def compress_stream(encoder_class, level: int, chunks) -> bytes:
+    encoder = encoder_class(level)
+    out = [encoder.compress(chunk) + encoder.flush() for chunk in chunks]
+    out.append(encoder.finish())
+    return b"".join(out)
+
+
+def main(message_count: int = 200) -> None:
+    rng = random.Random(1)
+    chunks = [
+        f"data: {json.dumps({'content': sentence(rng, 2)})}\n\n".encode()
+        for _ in range(STREAM_CHUNKS)
+    ]
+    payloads = {
+        f"chat ({message_count} msgs)": chat_payload(message_count),
+        "ollama tags": tags_payload(),
+    }
+    installed = set(available_encoders().values())
+
+    rows = []
+    for encoder_class, levels in LEVELS.items():
+        if encoder_class not in installed:
+            print(f"{encoder_class.__name__} skipped, its package is not installed")
+            continue
+        for level in levels:
+            for name, payload in payloads.items():
+                size = len(compress_whole(encoder_class, level, payload))
+                timing = timeit(lambda: compress_whole(encoder_class, level, payload))
+                rows.append(
+                    {
+                        "payload": name,
+                        "encoder": encoder_class.__name__,
+                        "level": level,
+                        "kb_in": len(payload) / 1024,
+                        "ratio": len(payload) / size,
+                        "median_ms": timing["median_ms"],
+                        "mb_per_s": len(payload) / 1e3 / timing["median_ms"],
+                    }
+                )
+            raw = sum(len(chunk) for chunk in chunks)
+            size = len(compress_stream(encoder_class, level, chunks))
+            timing = timeit(lambda: compress_stream(encoder_class, level, chunks))
+            rows.append(
+                {
+                    "payload": f"stream ({STREAM_CHUNKS} chunks)",
+                    "encoder": encoder_class.__name__,
+                    "level": level,
+                    "kb_in": raw / 1024,
+                    "ratio": raw / size,
+                    "median_ms": timing["median_ms"],
+                    "mb_per_s": raw / 1e3 / timing["median_ms"],
+                }
+            )
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,95 @@
+"""
+Benchmark full-text message search.
+
+Seeds one user with 1000 chats of random sentences from a Zipf-like
+vocabulary, builds the index with the migrations and times ranked searches
+for common, rare and prefix terms.
+
+Usage: python -m benchmarks.search [message_count]
+"""
+
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_session_factory, print_table, timeit
+from src.migrations import upgrade
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+from src.services.search import SearchService
+
+CHATS = 1000
+VOCABULARY = [f"word{i}" for i in range(20_000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+BATCH = 20_000
+
+
+def seed(db, message_count: int):
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chats = [Chat(user_id=user.id, title=f"chat {i}") for i in range(CHATS)]
+    db.add_all(chats)
+    db.flush()
+
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    for offset in range(0, message_count, BATCH):
+        rows = []
+        for i in range(offset, min(offset + BATCH, message_count)):
+            words = rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(5, 60))
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "chat_id": chats[i % CHATS].id,
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "content": " ".join(words),
+                    "created_at": start + timedelta(seconds=i),
+                    "tokens_used": 0,
+                }
+            )
+        db.execute(Message.__table__.insert(), rows)
+    db.commit()
+    return user
+
+
+def main(message_count: int = 1_000_000) -> None:
+    session_factory = make_session_factory()
+    db = session_factory()
+    user = seed(db, message_count)
+    # Builds the index over the existing rows, like on an upgraded database
+    upgrade(session_factory.kw["bind"])
+
+    def search(query, cursor=None):
+        return SearchService.search_messages(db, user, query, cursor=cursor)
+
+    second_page = search("word5000")["next_cursor"]
+    rows = []
+    for label, query, cursor in (
+        ("common word", "word3", None),
+        ("rare word", "word15000", None),
+        ("two words", "word10 word200", None),
+        ("prefix", "word1999", None),
+        ("rare word, page 2", "word5000", second_page),
+    ):
+        rows.append(
+            {
+                "query": label,
+                "results": len(search(query, cursor)["results"]),
+                **timeit(lambda: search(query, cursor)),
+            }
+        )
+    print(f"Message search, {message_count} messages")
+    print_table(rows)
+    db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,45 @@
+"""
+Benchmark brute-force top-k over float16 message vectors.
+
+Uses random unit vectors of nomic-embed-text's size, so no Ollama is needed.
+
+Usage: python -m benchmarks.semantic_search [dimensions]
+"""
+
+import sys
+import uuid
+
+import numpy as np
+
+from benchmarks.common import print_table, timeit
+from src.services.embeddings import VectorIndex
+
+SIZES = [10_000, 100_000, 500_000]
+
+
+def main(dimensions: int = 768) -> None:
+    rng = np.random.default_rng(42)
+    rows = []
+    for count in SIZES:
+        matrix = rng.standard_normal((count, dimensions), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        query = matrix[count // 2]
+        ids = [uuid.uuid4() for _ in range(count)]
+
+        for dtype in (np.float32, np.float16):
+            index = VectorIndex((), ids, matrix.astype(dtype))
+            assert index.top_k(query, 10)[0][0] == ids[count // 2]
+            rows.append(
+                {
+                    "vectors": count,
+                    "dtype": np.dtype(dtype).name,
+                    "matrix_mb": index.matrix.nbytes / 2**20,
+                    **timeit(lambda: index.top_k(query, 10)),
+                }
+            )
+    print(f"Top 10 of {dimensions}-dimensional vectors")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 768)
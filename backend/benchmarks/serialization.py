@@ -0,0 +1,144 @@
+"""
+Benchmark serializing a chat of 1k and 10k messages to a JSON response body.
+
+Compares loading ORM entities and validating them with from_attributes
+schemas, validating row DTOs against the response model and encoding them
+with the stdlib (the previous GET /chats/chat/{id} path), and encoding the
+row DTOs with orjson directly (the current path). Each variant includes its
+query; peak memory is measured with tracemalloc in a separate run.
+
+Usage: python -m benchmarks.serialization
+"""
+
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import undefer_group
+
+from benchmarks.common import make_session_factory, print_table, timeit
+from src.core.responses import FastJSONResponse
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+from src.schemas import chat as chat_schemas
+from src.services.chat import HEAVY_MESSAGE_FIELDS, ChatService
+
+SIZES = [1_000, 10_000]
+# Left out of the message list by default, see select_message_fields
+HEAVY_FIELDS = {"messages": {"__all__": set(HEAVY_MESSAGE_FIELDS)}}
+
+
+def seed(session_factory, message_count: int):
+    db = session_factory()
+    user = User(
+        username=f"bench{message_count}",
+        email=f"bench{message_count}@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chat = Chat(user_id=user.id, title="Benchmark")
+    db.add(chat)
+    db.flush()
+
+    start = datetime(2025, 1, 1)
+    text = "lorem ipsum dolor sit amet " * 20
+    db.execute(
+        Message.__table__.insert(),
+        [
+            {
+                "id": uuid.uuid4(),
+                "chat_id": chat.id,
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"{i} {text}",
+                "created_at": start + timedelta(seconds=i),
+                "tokens_used": i,
+            }
+            for i in range(message_count)
+        ],
+    )
+    db.commit()
+    ids = (user.id, chat.id)
+    db.close()
+    return ids
+
+
+def orm_entities(session_factory, user_id, chat_id) -> bytes:
+    db = session_factory()
+    chat = db.get(Chat, chat_id)
+    messages = (
+        db.query(Message)
+        # One query, rather than one per message for the deferred columns
+        .options(undefer_group("heavy"))
+        .filter(Message.chat_id == chat_id)
+        .order_by(Message.created_at, Message.id)
+        .all()
+    )
+    body = chat_schemas.ChatMessagesResponse(
+        chat=chat_schemas.ChatSchema.model_validate(chat),
+        messages=[chat_schemas.MessageSchema.model_validate(m) for m in messages],
+    ).model_dump(mode="json", exclude=HEAVY_FIELDS)
+    db.close()
+    return JSONResponse(body).body
+
+
+def rows_validated(session_factory, user_id, chat_id) -> bytes:
+    db = session_factory()
+    result = ChatService.get_chat_with_messages(db, User(id=user_id), chat_id)
+    body = chat_schemas.ChatMessagesResponse.model_validate(result).model_dump(
+        mode="json", exclude_unset=True
+    )
+    db.close()
+    return JSONResponse(body).body
+
+
+def rows_orjson(session_factory, user_id, chat_id) -> bytes:
+    db = session_factory()
+    result = ChatService.get_chat_with_messages(db, User(id=user_id), chat_id)
+    db.close()
+    return FastJSONResponse(result).body
+
+
+def peak_mb(func) -> float:
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def main() -> None:
+    session_factory = make_session_factory()
+    variants = {
+        "ORM + from_attributes + json": orm_entities,
+        "rows + response_model + json": rows_validated,
+        "rows + orjson": rows_orjson,
+    }
+
+    rows = []
+    for size in SIZES:
+        user_id, chat_id = seed(session_factory, size)
+        for name, variant in variants.items():
+
+            def run():
+                return variant(session_factory, user_id, chat_id)
+
+            timing = timeit(run)
+            rows.append(
+                {
+                    "messages": size,
+                    "path": name,
+                    "kb_out": len(run()) / 1024,
+                    "median_ms": timing["median_ms"],
+                    "peak_mb": peak_mb(run),
+                }
+            )
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark message inserts with random (v4) versus time-ordered (v7) ids.
+
+Reports insert throughput and the size of the messages primary key index.
+
+Usage: python -m benchmarks.uuid_keys [message_count]
+"""
+
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from benchmarks.common import make_session_factory, print_table
+from src.core.ids import uuid7
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+
+BATCH_SIZE = 500
+
+
+def primary_key_size(db) -> str:
+    """Size of the messages primary key index, in KiB."""
+    if db.get_bind().dialect.name == "postgresql":
+        size = db.execute(text("SELECT pg_relation_size('messages_pkey')")).scalar()
+        return f"{size // 1024}"
+    try:
+        size = db.execute(
+            text(
+                "SELECT SUM(pgsize) FROM dbstat "
+                "WHERE name = 'sqlite_autoindex_messages_1'"
+            )
+        ).scalar()
+        return f"{size // 1024}"
+    except Exception:
+        # SQLite built without dbstat: report the whole file instead
+        pages = db.execute(text("PRAGMA page_count")).scalar()
+        page_size = db.execute(text("PRAGMA page_size")).scalar()
+        return f"{pages * page_size // 1024} (file)"
+
+
+def run(generate_id, message_count: int):
+    db = make_session_factory()()
+    user = User(
+        username="bench",
+        email="bench@example.com",
+        password_hash="x",
+        role="user",
+        is_active=True,
+    )
+    db.add(user)
+    db.flush()
+    chat = Chat(user_id=user.id, title="Benchmark")
+    db.add(chat)
+    db.commit()
+
+    started = time.perf_counter()
+    for offset in range(0, message_count, BATCH_SIZE):
+        db.execute(
+            Message.__table__.insert(),
+            [
+                {
+                    "id": generate_id(),
+                    "chat_id": chat.id,
+                    "role": "user",
+                    "content": f"message {offset + i}",
+                    "created_at": datetime.now(),
+                    "tokens_used": 0,
+                }
+                for i in range(min(BATCH_SIZE, message_count - offset))
+            ],
+        )
+        db.commit()
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "inserts_per_s": message_count / elapsed,
+        "total_s": elapsed,
+        "pk_index_kib": primary_key_size(db),
+    }
+    db.close()
+    return result
+
+
+def main(message_count: int = 200_000) -> None:
+    rows = [
+        {"ids": "uuid4", **run(uuid.uuid4, message_count)},
+        {"ids": "uuid7", **run(uuid7, message_count)},
+    ]
+    print(f"Message inserts, {message_count} rows in batches of {BATCH_SIZE}")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,141 @@
+"""
+Multiplexing of concurrent operations over one WebSocket.
+
+A ``Channel`` reads JSON frames from the client and hands them to a handler,
+which may start long running operations (chat generations, the chat-list
+event feed) as tasks keyed by a client chosen id so they can be cancelled.
+
+Everything sent to the client goes through one bounded queue drained by a
+single writer task. When the client reads slower than tasks produce, ``send``
+waits for room in the queue, so a generation stops pulling tokens from Ollama
+until the client catches up instead of buffering them in memory.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+from src.core.logger import app_logger
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_MAX_GENERATIONS = int(os.getenv("WS_MAX_GENERATIONS", "4"))
+
+Frame = Dict[str, Any]
+
+
+class Channel:
+    """Concurrent operations of one WebSocket client"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        max_tasks: int = WS_MAX_GENERATIONS,
+    ):
+        self.websocket = websocket
+        self.max_tasks = max_tasks
+        self._outgoing: "asyncio.Queue[Frame]" = asyncio.Queue(maxsize=queue_size)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._limited: Dict[str, bool] = {}
+        self._writer: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def send(self, frame: Frame) -> None:
+        """Queue a frame for the client, waiting while the queue is full."""
+        if self._closed:
+            return
+        await self._outgoing.put(frame)
+
+    def running(self) -> int:
+        """Number of running operations that count towards max_tasks."""
+        return sum(1 for key in self._tasks if self._limited[key])
+
+    def start(
+        self, task_id: str, coroutine: Coroutine[Any, Any, None], limited: bool = True
+    ) -> bool:
+        """
+        Run an operation in the background.
+
+        Args:
+            task_id: Client chosen id, used to cancel the operation
+            coroutine: The operation
+            limited: Whether it counts towards max_tasks
+
+        Returns:
+            False, without running it, if the id is taken or the limit reached
+        """
+        if task_id in self._tasks or (limited and self.running() >= self.max_tasks):
+            coroutine.close()
+            return False
+
+        task = asyncio.create_task(coroutine)
+        self._tasks[task_id] = task
+        self._limited[task_id] = limited
+
+        def finished(done: asyncio.Task) -> None:
+            if self._tasks.get(task_id) is done:
+                del self._tasks[task_id]
+                del self._limited[task_id]
+            if not done.cancelled() and done.exception() is not None:
+                app_logger.error(
+                    f"Channel task {task_id} failed: {done.exception()}",
+                    exc_info=done.exception(),
+                )
+
+        task.add_done_callback(finished)
+        return True
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel a running operation, returns False if there is none."""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def close(self, code: int, reason: str = "") -> None:
+        """
+        Close the socket from the server side.
+
+        Cancels the other operations and drops frames still queued for the
+        client; ``run`` returns once the client acknowledges the close.
+        """
+        self._closed = True
+        current = asyncio.current_task()
+        tasks = [self._writer, *self._tasks.values()]
+        tasks = [task for task in tasks if task is not None and task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.websocket.close(code=code, reason=reason)
+
+    async def _write(self) -> None:
+        while True:
+            frame = await self._outgoing.get()
+            await self.websocket.send_text(json.dumps(frame, default=str))
+
+    async def run(self, handle: Callable[[Frame], Awaitable[None]]) -> None:
+        """Dispatch client frames to handle until the client disconnects."""
+        writer = self._writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                try:
+                    frame = json.loads(text)
+                except ValueError:
+                    frame = None
+                if not isinstance(frame, dict):
+                    await self.send(
+                        {"type": "error", "status": 400, "detail": "Invalid frame"}
+                    )
+                    continue
+                await handle(frame)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            tasks = [writer, *self._tasks.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,252 @@
+"""
+Response compression negotiated with Accept-Encoding.
+
+JSON and text responses of at least ``COMPRESSION_MIN_SIZE`` bytes are sent
+with zstd, brotli or gzip, whichever the client accepts and is installed,
+in that order of preference. Streaming responses (server-sent events, NDJSON)
+are compressed as they go and flushed after every chunk, so each chunk still
+reaches the client as soon as it is produced.
+
+zstd needs the ``zstandard`` package and brotli the optional ``brotli``
+package; without them those encodings are simply not offered.
+"""
+
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional, clients that accept it usually accept zstd or gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_BROTLI_LEVEL = int(os.getenv("COMPRESSION_BROTLI_LEVEL", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class GzipEncoder:
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class ZstdEncoder:
+    def __init__(self, level: int = COMPRESSION_ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int = COMPRESSION_BROTLI_LEVEL):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def available_encoders() -> Dict[str, Callable]:
+    """Installed encoders by content coding, most preferred first."""
+    encoders: Dict[str, Callable] = {}
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    encoders["gzip"] = GzipEncoder
+    return encoders
+
+
+def choose_encoding(
+    accept_encoding: Optional[str], offered: List[str]
+) -> Optional[str]:
+    """
+    Pick the content coding for a response.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        offered: Codings the server can produce, most preferred first
+
+    Returns:
+        The preferred offered coding with the highest q-value the client
+        accepts, or None to send the response as is
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    for coding in offered:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best[0]:
+            best = (weight, coding)
+    return best[1]
+
+
+def is_compressible(headers: Headers, status: int) -> bool:
+    """Whether a response with these headers may be compressed."""
+    if status < 200 or status in (204, 206, 304):
+        return False
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses, see the module docstring"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        encoders: Optional[Dict[str, Callable]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = encoders if encoders is not None else available_encoders()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding"), list(self.encoders)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(
+            send, encoding, self.encoders[encoding], self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Send wrapper of one response"""
+
+    def __init__(
+        self, send: Send, encoding: str, encoder: Callable, minimum_size: int
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.encoder_factory = encoder
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+
+    def _set_encoding_headers(self, message: Message) -> MutableHeaders:
+        headers = MutableHeaders(raw=message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The compressed bytes differ, the representation does not
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return headers
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if not is_compressible(headers, message["status"]):
+                self.passthrough = True
+                await self._send(message)
+                return
+            # Wait for the first body chunk to know whether the body is small
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            # Extensions such as pathsend carry no body to compress
+            self.passthrough = True
+            if self.start is not None:
+                await self._send(self.start)
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self.encoder = self.encoder_factory()
+            headers = self._set_encoding_headers(start)
+            if more_body:
+                # Streamed, the final length is unknown
+                del headers["Content-Length"]
+            else:
+                body = self.encoder.compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(start)
+
+        if more_body:
+            # Flush so the chunk is not held back waiting for more input
+            data = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            data = self.encoder.compress(body) + self.encoder.finish()
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
@@ -0,0 +1,48 @@
+"""
+Weak ETags for conditional GET requests.
+
+Endpoints derive the tag from a cheap version stamp (a sequence number, an
+``updated_at``, a cache digest) plus whatever else shapes the response, such
+as the query string, and answer ``If-None-Match`` with 304 before doing the
+expensive part of the request.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+
+# Responses are per user and must be revalidated before each use
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag of the given version stamp parts."""
+    digest = hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8"))
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header with an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching If-None-Match."""
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,260 @@
+"""
+Per-user event feed of chat-list changes.
+
+Writers queue events on their database session with ``queue_event``; they are
+published only once the session commits, and dropped on rollback, so
+subscribers never hear of changes that did not happen.
+
+``broker`` fans events out to the subscriptions of this process, each a
+bounded queue read by one ``GET /chats/events`` stream. A subscriber that
+falls ``EVENT_QUEUE_SIZE`` events behind loses them and gets a single
+``resync`` event instead, telling it to catch up with ``GET /sync``.
+
+With several workers, set ``EVENT_BRIDGE=postgres``: events are then relayed
+to the other workers with PostgreSQL LISTEN/NOTIFY.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import select
+import threading
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from uuid import UUID, uuid4
+
+from fastapi import Request
+from sqlalchemy import event as sqlalchemy_event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_BRIDGE = os.getenv("EVENT_BRIDGE", "none").lower()
+
+EVENT_CHANNEL = "chat_events"
+# Events waiting for the bridge connection before new ones are dropped
+BRIDGE_BACKLOG = 10_000
+# Reconnect delay suggested to EventSource clients, in milliseconds
+SSE_RETRY_MS = 3000
+
+_PENDING = "pending_events"
+
+
+class Subscription:
+    """Bounded queue of events for one stream"""
+
+    def __init__(self, user_id: UUID, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(
+            maxsize=EVENT_QUEUE_SIZE
+        )
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """Add an event, replacing the backlog with a resync when full."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class EventBroker:
+    """In-process pub/sub of events by user"""
+
+    def __init__(self):
+        self._subscriptions: Dict[UUID, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.bridge: Optional["PostgresEventBridge"] = None
+
+    def subscribe(self, user_id: UUID) -> Subscription:
+        """Subscribe to a user's events; call from the event loop."""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+
+    def subscriber_count(self, user_id: UUID) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(user_id, ()))
+
+    def deliver(self, user_id: UUID, event: Dict[str, Any]) -> None:
+        """Hand an event to this process's subscribers, from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The stream's event loop is closed
+                self.unsubscribe(subscription)
+
+    def publish(self, user_id: UUID, event: Dict[str, Any]) -> None:
+        """Deliver an event here and, through the bridge, in other workers."""
+        self.deliver(user_id, event)
+        if self.bridge is not None:
+            self.bridge.send(user_id, event)
+
+
+broker = EventBroker()
+
+
+def queue_event(db: Session, user_id: Optional[UUID], event: Dict[str, Any]) -> None:
+    """Publish an event for a user when the session commits."""
+    if user_id is not None:
+        db.info.setdefault(_PENDING, []).append((user_id, event))
+
+
+@sqlalchemy_event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for user_id, event in session.info.pop(_PENDING, ()):
+        broker.publish(user_id, event)
+
+
+@sqlalchemy_event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode an event as a server-sent event named after its type."""
+    data = json.dumps({k: v for k, v in event.items() if k != "type"})
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def event_stream(
+    request: Request, subscription: Subscription, first: Dict[str, Any]
+) -> AsyncIterator[str]:
+    """
+    Server-sent events of a subscription until the client disconnects.
+
+    Starts with ``first`` and sends a comment every
+    ``EVENT_HEARTBEAT_SECONDS`` so that proxies keep the connection open.
+    """
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n" + format_sse(first)
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), EVENT_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class PostgresEventBridge:
+    """Relays events between workers with PostgreSQL LISTEN/NOTIFY"""
+
+    def __init__(self, engine: Engine, channel: str = EVENT_CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        # Lets a worker ignore the notifications it sent itself
+        self.origin = uuid4().hex
+        self._outgoing: "queue.Queue[str]" = queue.Queue(maxsize=BRIDGE_BACKLOG)
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_write, False)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, target: EventBroker) -> None:
+        target.bridge = self
+        self._thread = threading.Thread(
+            target=self._run, args=(target,), name="event-bridge", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def send(self, user_id: UUID, event: Dict[str, Any]) -> None:
+        payload = {"origin": self.origin, "user_id": str(user_id), "event": event}
+        try:
+            self._outgoing.put_nowait(json.dumps(payload))
+        except queue.Full:
+            app_logger.warning("Event bridge backlog full, dropping event")
+            return
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_write, b"\0")
+        except BlockingIOError:
+            # Already woken
+            pass
+
+    def _receive(self, target: EventBroker, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            if message["origin"] != self.origin:
+                target.deliver(UUID(message["user_id"]), message["event"])
+        except (ValueError, KeyError) as e:
+            app_logger.warning(f"Ignoring malformed event notification: {str(e)}")
+
+    def _run(self, target: EventBroker) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen(target)
+            except Exception as e:
+                app_logger.error(f"Event bridge disconnected: {str(e)}")
+                self._stopped.wait(5)
+
+    def _listen(self, target: EventBroker) -> None:
+        connection = self.engine.raw_connection()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"LISTEN {self.channel}")
+            app_logger.info(f"Relaying events through channel {self.channel}")
+
+            while not self._stopped.is_set():
+                readable, _, _ = select.select(
+                    [dbapi_connection, self._wake_read], [], [], 5
+                )
+                if self._wake_read in readable:
+                    os.read(self._wake_read, 4096)
+                while not self._outgoing.empty():
+                    cursor.execute(
+                        "SELECT pg_notify(%s, %s)",
+                        (self.channel, self._outgoing.get_nowait()),
+                    )
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    self._receive(target, notify.payload)
+        finally:
+            connection.invalidate()
+
+
+def start_bridge(engine: Engine) -> Optional[PostgresEventBridge]:
+    """Start relaying events between workers if EVENT_BRIDGE asks for it."""
+    if EVENT_BRIDGE == "none":
+        return None
+    if EVENT_BRIDGE != "postgres" or engine.dialect.name != "postgresql":
+        app_logger.warning(
+            f"EVENT_BRIDGE={EVENT_BRIDGE} needs PostgreSQL, events stay in-process"
+        )
+        return None
+
+    bridge = PostgresEventBridge(engine)
+    bridge.start(broker)
+    return bridge
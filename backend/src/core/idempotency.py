@@ -0,0 +1,288 @@
+"""
+Idempotency keys and in-flight deduplication for chat sends.
+
+Every send is registered in the ``idempotency_records`` table before any work
+starts. The table is shared by all workers, so a retry or a double click that
+lands on another worker still finds the running (or finished) request and
+waits for its result instead of starting a second generation.
+
+Requests carrying an ``Idempotency-Key`` header keep their result for
+``IDEMPOTENCY_TTL_HOURS``. Requests without a key are deduplicated by a
+fingerprint of their payload, but only while they run and for a short grace
+period afterwards (none for endpoints that pass ``fingerprint_grace=0``), so
+sending the same text again later still works.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+from src.models.idempotency import IdempotencyRecord
+
+IDEMPOTENCY_TTL = timedelta(hours=int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+INFLIGHT_GRACE = timedelta(
+    seconds=int(os.getenv("IDEMPOTENCY_INFLIGHT_GRACE_SECONDS", "10"))
+)
+# An in-progress record older than this belongs to a worker that died
+LOCK_TIMEOUT = timedelta(
+    seconds=int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "600"))
+)
+WAIT_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT_SECONDS", "300"))
+POLL_INTERVAL_SECONDS = 0.25
+PURGE_INTERVAL = timedelta(minutes=5)
+
+
+class _InFlight:
+    """Requests running in this process, so local waiters skip DB polling."""
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.has_result = False
+        self.result: Any = None
+
+
+_inflight: Dict[str, _InFlight] = {}
+_last_purge = datetime.min
+
+
+def hash_payload(payload: Any) -> str:
+    """Stable SHA-256 of a JSON-serializable request payload."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _record_key(user_id: UUID, scope: str, discriminator: str) -> str:
+    return hashlib.sha256(f"{user_id}:{scope}:{discriminator}".encode()).hexdigest()
+
+
+def _is_expired(
+    record: IdempotencyRecord,
+    now: datetime,
+    arrived_at: datetime,
+    fingerprint_grace: timedelta,
+) -> bool:
+    if record.status == "in_progress":
+        return now - record.created_at > LOCK_TIMEOUT
+    finished = record.completed_at or record.created_at
+    if record.is_fingerprint:
+        # Measured from the arrival of the new request: a request that waited
+        # for the original one to finish still gets its result
+        return arrived_at - finished > fingerprint_grace
+    return now - finished > IDEMPOTENCY_TTL
+
+
+def _purge_expired(db: Session) -> None:
+    """Drop stale records, at most once per PURGE_INTERVAL per process."""
+    global _last_purge
+    now = datetime.now()
+    if now - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = now
+
+    deleted = (
+        db.query(IdempotencyRecord)
+        .filter(
+            or_(
+                IdempotencyRecord.created_at < now - max(IDEMPOTENCY_TTL, LOCK_TIMEOUT),
+                (IdempotencyRecord.is_fingerprint.is_(True))
+                & (IdempotencyRecord.created_at < now - LOCK_TIMEOUT),
+            )
+        )
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    if deleted:
+        app_logger.debug(f"Purged {deleted} expired idempotency records")
+
+
+def _try_acquire(
+    db: Session,
+    key: str,
+    user_id: UUID,
+    scope: str,
+    chat_id: Optional[UUID],
+    request_hash: str,
+    is_fingerprint: bool,
+    arrived_at: datetime,
+    fingerprint_grace: timedelta,
+) -> Optional[IdempotencyRecord]:
+    """
+    Register a new in-progress record.
+
+    Returns:
+        None if this request now owns the key, otherwise the existing record
+    """
+    while True:
+        db.add(
+            IdempotencyRecord(
+                key=key,
+                user_id=user_id,
+                chat_id=chat_id,
+                scope=scope,
+                request_hash=request_hash,
+                status="in_progress",
+                is_fingerprint=is_fingerprint,
+            )
+        )
+        try:
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+
+        existing = (
+            db.query(IdempotencyRecord).filter(IdempotencyRecord.key == key).first()
+        )
+        if existing is None:
+            # Released between our insert and the lookup; try again
+            continue
+        if _is_expired(existing, datetime.now(), arrived_at, fingerprint_grace):
+            app_logger.debug(f"Replacing expired idempotency record {key}")
+            db.delete(existing)
+            db.commit()
+            continue
+        return existing
+
+
+def _release(db: Session, key: str) -> None:
+    """Forget a record so that a retry can run the request again."""
+    try:
+        db.rollback()
+        db.query(IdempotencyRecord).filter(IdempotencyRecord.key == key).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        app_logger.error(f"Failed to release idempotency record {key}: {str(e)}")
+        db.rollback()
+
+
+def _complete(db: Session, key: str, body: Any) -> None:
+    db.query(IdempotencyRecord).filter(IdempotencyRecord.key == key).update(
+        {
+            "status": "completed",
+            "response_body": body,
+            "completed_at": datetime.now(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+async def run_idempotent(
+    db: Session,
+    user_id: UUID,
+    scope: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+    idempotency_key: Optional[str] = None,
+    chat_id: Optional[UUID] = None,
+    should_cache: Optional[Callable[[Any], bool]] = None,
+    fingerprint_grace: timedelta = INFLIGHT_GRACE,
+) -> Tuple[Any, bool]:
+    """
+    Run ``handler`` at most once per idempotency key or in-flight payload.
+
+    Args:
+        db: Database session
+        user_id: Owner of the request, keys are scoped per user
+        scope: Endpoint scope, e.g. ``"ollama_chat:<chat_id>"``
+        payload: JSON-serializable request body used for fingerprinting
+        handler: Coroutine function producing a JSON-serializable result
+        idempotency_key: Value of the ``Idempotency-Key`` header, if any
+        chat_id: Chat the request belongs to
+        should_cache: Predicate deciding whether a result may be replayed;
+            rejected results release the key so a retry runs again
+        fingerprint_grace: How long a finished request without a key is
+            replayed to identical requests; 0 only joins running requests
+
+    Returns:
+        Tuple of (result, replayed)
+
+    Raises:
+        HTTPException: 422 if the key was used for a different payload,
+            409 if the original request is still running after the wait timeout
+    """
+    request_hash = hash_payload(payload)
+    is_fingerprint = idempotency_key is None
+    key = _record_key(
+        user_id, scope, request_hash if is_fingerprint else idempotency_key
+    )
+
+    arrived_at = datetime.now()
+    _purge_expired(db)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WAIT_TIMEOUT_SECONDS
+    while True:
+        existing = _try_acquire(
+            db,
+            key,
+            user_id,
+            scope,
+            chat_id,
+            request_hash,
+            is_fingerprint,
+            arrived_at,
+            fingerprint_grace,
+        )
+        if existing is None:
+            break
+
+        if existing.request_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+
+        if existing.status == "completed":
+            app_logger.info(f"Replaying completed request for {scope}")
+            return existing.response_body, True
+
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="An identical request is still in progress",
+            )
+
+        app_logger.info(f"Attaching to in-flight request for {scope}")
+        local = _inflight.get(key)
+        if local is not None:
+            try:
+                await asyncio.wait_for(local.event.wait(), remaining)
+            except asyncio.TimeoutError:
+                continue
+            if local.has_result:
+                return local.result, True
+        else:
+            # Running in another worker, wait for its record to change
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    entry = _InFlight()
+    _inflight[key] = entry
+    try:
+        body = await handler()
+    except BaseException:
+        _release(db, key)
+        raise
+    else:
+        if should_cache is None or should_cache(body):
+            _complete(db, key, body)
+        else:
+            _release(db, key)
+        entry.result = body
+        entry.has_result = True
+        return body, False
+    finally:
+        _inflight.pop(key, None)
+        entry.event.set()
@@ -0,0 +1,55 @@
+"""
+Time-ordered UUIDs (version 7, RFC 9562) for primary keys.
+
+Random v4 keys land anywhere in a B-tree index, so every insert touches a
+random leaf page. v7 keys start with a millisecond Unix timestamp, so new rows
+are appended at the right edge of the index. They are regular UUIDs, and
+existing v4 ids stay valid in the same columns.
+
+Within one millisecond the 12 ``rand_a`` bits act as a counter (RFC 9562
+method 1), so ids generated by one process are strictly increasing.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """Generate a UUIDv7, monotonic within this process."""
+    global _last_ms, _counter
+
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            # Random start leaves room for 2048+ more ids in this millisecond
+            _counter = int.from_bytes(os.urandom(2), "big") & 0x7FF
+        else:
+            _counter += 1
+            if _counter > 0xFFF:
+                # Counter exhausted (or clock went back): borrow the next ms
+                _last_ms += 1
+                _counter = 0
+        timestamp_ms = _last_ms
+        counter = _counter
+
+    rand_b = int.from_bytes(os.urandom(8), "big") & 0x3FFF_FFFF_FFFF_FFFF
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+def uuid7_time(value: uuid.UUID) -> float:
+    """Unix timestamp (seconds) embedded in a UUIDv7."""
+    return (value.int >> 80) / 1000
@@ -0,0 +1,67 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row of a page, usually a timestamp
+and the row id as a tie breaker. The next page starts strictly after that key,
+so the database walks an index instead of skipping ``offset`` rows, and rows
+inserted meanwhile do not shift pages.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    """Encode a (timestamp, id) sort key as a URL safe string."""
+    return _encode([timestamp.isoformat(), str(row_id)])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        timestamp, row_id = _decode(cursor)
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+def encode_score_cursor(score: float, row_id: UUID) -> str:
+    """Encode a (relevance score, id) sort key of ranked results."""
+    return _encode([score, str(row_id)])
+
+
+def decode_score_cursor(cursor: str) -> Tuple[float, UUID]:
+    """
+    Decode a cursor created by encode_score_cursor.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        score, row_id = _decode(cursor)
+        return float(score), UUID(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError("Invalid pagination cursor")
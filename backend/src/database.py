@@ -1,7 +1,12 @@
 import os
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from typing import Callable
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from src.core.logger import app_logger
 
@@ -11,6 +16,16 @@ app_logger.info(
     f"Connecting to database at: {DATABASE_URL.replace(POSTGRES_PASSWORD, '*' * len(POSTGRES_PASSWORD))}"
 )
 
+
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked."""
+    if type(dbapi_connection).__module__.startswith("sqlite3"):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -23,3 +38,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_session_factory() -> Callable[[], Session]:
+    """Sessions for work that outlives a request, e.g. WebSocket chat turns."""
+    return SessionLocal
+
+
+def dialect_insert(db: Session, model):
+    """INSERT for the session's dialect, supporting on_conflict_do_nothing()."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
@@ -1,5 +1,6 @@
 import os
 import time
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import Depends, FastAPI, HTTPException, Request
@@ -7,12 +8,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from src.core.compression import CompressionMiddleware
+from src.core.events import start_bridge
+from src.core.responses import FastJSONResponse
 from src.core.logger import app_logger
 from src.core.rate_limiter import setup_limiter, limiter
 from src.database import Base, engine, get_db
+from src.migrations import upgrade as upgrade_schema
 from src.routers.auth import router as auth_router
 from src.routers.chats import router as chat_router
+from src.routers.images import router as images_router
 from src.routers.ollama import router as ollama_router
+from src.routers.sync import router as sync_router
 from src.routers.user import router as user_router
 from src.routers.user_settings import router as user_settings_router
 
@@ -23,11 +30,27 @@ load_dotenv(".env.dev")
 app_logger.info("Creating database tables")
 Base.metadata.create_all(bind=engine)
 
+# Bring existing databases up to date, see src/migrations
+if os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true":
+    upgrade_schema(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Relay chat-list events between workers, see src/core/events.py
+    bridge = start_bridge(engine)
+    yield
+    if bridge is not None:
+        bridge.stop()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="rovertAIChat API",
     description="Backend API for rovertAIChat application",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Apply rate limiter
@@ -40,6 +63,8 @@ origins = os.getenv(
 ).split(",")
 
 app_logger.info(f"Allowed CORS origins: {origins}")
+# The chat WebSocket checks its Origin against the same list
+app.state.cors_origins = origins
 
 app.add_middleware(
     CORSMiddleware,
@@ -49,12 +74,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON and text responses, see src/core/compression.py
+if os.getenv("COMPRESSION_ENABLED", "true").lower() == "true":
+    app.add_middleware(CompressionMiddleware)
+
 # Include API routers
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(user_router, prefix="/api/v1")
 app.include_router(user_settings_router, prefix="/api/v1")
 app.include_router(ollama_router, prefix="/api/v1")
 app.include_router(chat_router, prefix="/api/v1")
+app.include_router(images_router, prefix="/api/v1")
+app.include_router(sync_router, prefix="/api/v1")
 
 
 @app.get("/api/v1/health")
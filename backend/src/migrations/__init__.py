@@ -0,0 +1,94 @@
+"""
+Schema migrations.
+
+``Base.metadata.create_all`` only creates missing tables. Everything else an
+existing database needs, such as indexes on old tables, new columns or data
+fixes, is a numbered revision module in ``src/migrations/versions`` with a
+``DESCRIPTION`` and an ``upgrade(connection)`` function. Applied revisions are
+recorded in the ``schema_migrations`` table.
+
+Revisions also run right after create_all on a fresh database, so they must
+tolerate objects that already exist (``IF NOT EXISTS`` and friends).
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+from typing import Dict, List
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+from src.core.logger import app_logger
+from src.migrations import versions
+
+# Kept out of Base.metadata, the runner manages this table itself
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("revision", String(100), primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime, default=datetime.now),
+)
+
+# Arbitrary key of the Postgres advisory lock held while migrating
+_ADVISORY_LOCK_KEY = 0x726F76657274
+
+
+def discover() -> Dict[str, ModuleType]:
+    """Revision modules by name, in the order they are applied."""
+    names = sorted(module.name for module in pkgutil.iter_modules(versions.__path__))
+    return {
+        name: importlib.import_module(f"{versions.__name__}.{name}") for name in names
+    }
+
+
+def _applied(connection: Connection) -> List[str]:
+    return list(connection.execute(select(schema_migrations.c.revision)).scalars())
+
+
+def pending(engine: Engine) -> List[str]:
+    """Revisions not yet applied to the database."""
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        applied = set(_applied(connection))
+    return [name for name in discover() if name not in applied]
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """
+    Apply all pending revisions, each in its own transaction.
+
+    Safe to call from several workers at once: on Postgres they wait on an
+    advisory lock and skip what another worker already applied.
+
+    Returns:
+        Names of the revisions applied by this call
+    """
+    applied_now = []
+    for name, module in discover().items():
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": _ADVISORY_LOCK_KEY},
+                )
+            schema_migrations.create(connection, checkfirst=True)
+            if name in _applied(connection):
+                continue
+
+            app_logger.info(f"Applying migration {name}: {module.DESCRIPTION}")
+            module.upgrade(connection)
+            connection.execute(
+                schema_migrations.insert().values(
+                    revision=name,
+                    description=module.DESCRIPTION,
+                    applied_at=datetime.now(),
+                )
+            )
+            applied_now.append(name)
+
+    if applied_now:
+        app_logger.info(f"Applied {len(applied_now)} migrations")
+    return applied_now
@@ -0,0 +1,40 @@
+import argparse
+
+from src.database import Base, engine
+from src.migrations import discover, pending, upgrade
+
+# Register every model on Base before create_all
+from src.models import (  # noqa: F401
+    chat_models,
+    embedding,
+    idempotency,
+    image_blob,
+    sync,
+    user,
+    user_settings,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("upgrade", help="Create missing tables and apply migrations")
+    commands.add_parser("status", help="List pending migrations")
+
+    args = parser.parse_args()
+    if args.command == "upgrade":
+        Base.metadata.create_all(bind=engine)
+        applied = upgrade(engine)
+        print(f"Applied {len(applied)} migrations")
+        for name in applied:
+            print(f"  {name}")
+    else:
+        waiting = pending(engine)
+        modules = discover()
+        print(f"{len(waiting)} pending migrations")
+        for name in waiting:
+            print(f"  {name}: {modules[name].DESCRIPTION}")
+
+
+if __name__ == "__main__":
+    main()
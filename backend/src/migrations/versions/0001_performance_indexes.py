@@ -0,0 +1,31 @@
+"""
+Indexes for the hot chat queries.
+
+- chat list: chats of a user, filtered on is_archived, newest activity first
+- chat history: messages of a chat by (created_at, id)
+- model lookup by name when saving assistant replies
+- access checks on user_model_access(user_id, model_id)
+
+The single column chats.user_id and messages.chat_id lookups are served by
+the leading columns of the composite indexes.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DESCRIPTION = "Add performance indexes"
+
+INDEXES = [
+    (
+        "ix_chats_user_archived_updated",
+        "chats (user_id, is_archived, updated_at DESC, id DESC)",
+    ),
+    ("ix_messages_chat_created_id", "messages (chat_id, created_at, id)"),
+    ("ix_models_name", "models (name)"),
+    ("ix_user_model_access_user_model", "user_model_access (user_id, model_id)"),
+]
+
+
+def upgrade(connection: Connection) -> None:
+    for name, target in INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
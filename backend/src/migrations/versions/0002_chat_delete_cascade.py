@@ -0,0 +1,50 @@
+"""
+ON DELETE CASCADE on the foreign keys to chats.
+
+Deleting a chat row then removes its messages, summary and stats in the
+database, without loading them. Postgres only: SQLite cannot alter foreign
+keys in place, and its tables created before this change keep the old ones.
+The services delete child rows explicitly as well, so both kinds of databases
+behave the same.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DESCRIPTION = "Cascade chat deletes to messages, summaries and stats"
+
+CHILD_TABLES = ["messages", "chat_summaries", "chat_stats"]
+
+FOREIGN_KEYS = text(
+    """
+    SELECT tc.constraint_name
+    FROM information_schema.table_constraints tc
+    JOIN information_schema.key_column_usage kcu
+      ON kcu.constraint_name = tc.constraint_name
+     AND kcu.table_schema = tc.table_schema
+    JOIN information_schema.referential_constraints rc
+      ON rc.constraint_name = tc.constraint_name
+     AND rc.constraint_schema = tc.table_schema
+    WHERE tc.constraint_type = 'FOREIGN KEY'
+      AND tc.table_schema = current_schema()
+      AND tc.table_name = :table
+      AND kcu.column_name = 'chat_id'
+      AND rc.delete_rule <> 'CASCADE'
+    """
+)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+
+    for table in CHILD_TABLES:
+        names = connection.execute(FOREIGN_KEYS, {"table": table}).scalars().all()
+        for name in names:
+            connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+            connection.execute(
+                text(
+                    f'ALTER TABLE {table} ADD CONSTRAINT "{name}" FOREIGN KEY '
+                    "(chat_id) REFERENCES chats (id) ON DELETE CASCADE"
+                )
+            )
@@ -0,0 +1,58 @@
+"""
+Full-text index over message content.
+
+- Postgres: a GIN index on ``to_tsvector('simple', content)``, kept current by
+  Postgres itself.
+- SQLite: an FTS5 table using ``messages`` as external content, kept current
+  by triggers on insert, content update and delete, and filled from the
+  existing rows once.
+
+The ``simple`` configuration does no stemming, so matches behave the same for
+every language and on both databases. Queries must use the same expression,
+see src/services/search.py.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DESCRIPTION = "Add full-text search index on messages"
+
+POSTGRES = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_content_fts "
+    "ON messages USING GIN (to_tsvector('simple', content))",
+]
+
+SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, content='messages', content_rowid='rowid', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts (rowid, content) VALUES (new.rowid, new.content); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts (messages_fts, rowid, content) "
+    "VALUES ('delete', old.rowid, old.content); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_update "
+    "AFTER UPDATE OF content ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts (messages_fts, rowid, content) "
+    "VALUES ('delete', old.rowid, old.content); "
+    "INSERT INTO messages_fts (rowid, content) VALUES (new.rowid, new.content); "
+    "END",
+    "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        statements = POSTGRES
+    elif connection.dialect.name == "sqlite":
+        statements = SQLITE
+    else:
+        return
+
+    for statement in statements:
+        connection.execute(text(statement))
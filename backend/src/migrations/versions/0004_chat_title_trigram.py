@@ -0,0 +1,35 @@
+"""
+Trigram index on chat titles for the ``title_contains`` filter.
+
+Postgres only: pg_trgm lets a GIN index answer ``ILIKE '%text%'``. Creating
+the extension needs sufficient privileges; without them the index is skipped
+and the filter falls back to scanning the user's chats. SQLite scans the
+user's chats through ``ix_chats_user_archived_updated``, which is fast for the
+few thousand chats a user has.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from src.core.logger import app_logger
+
+DESCRIPTION = "Add trigram index on chat titles"
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError as e:
+        app_logger.warning(f"pg_trgm is not available, skipping title index: {e}")
+        return
+
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_chats_title_trgm "
+            "ON chats USING GIN (title gin_trgm_ops)"
+        )
+    )
@@ -0,0 +1,66 @@
+"""
+Owners of existing image blobs.
+
+Blobs are only served to, and attachable by, users listed in
+``image_blob_owners``. Before that table existed any user could read any
+blob, so the owner of every chat becomes an owner of the images its messages
+already reference. Blobs that were uploaded but never attached have no known
+owner and stay unreadable until they are uploaded again.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from src.models.chat_models import Chat, Message
+from src.models.image_blob import ImageBlob, ImageBlobOwner
+from src.services.images import is_image_ref, ref_digest
+
+DESCRIPTION = "Record owners of existing image blobs"
+
+BATCH_SIZE = 1000
+
+
+def _insert_owners(connection: Connection, pairs: set) -> None:
+    digests = {digest for digest, _ in pairs}
+    known = set(
+        connection.execute(
+            select(ImageBlob.digest).where(ImageBlob.digest.in_(digests))
+        ).scalars()
+    )
+    rows = [
+        {"digest": digest, "user_id": user_id}
+        for digest, user_id in pairs
+        if digest in known
+    ]
+    if not rows:
+        return
+    insert = (
+        postgresql_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    )
+    connection.execute(
+        insert(ImageBlobOwner)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["digest", "user_id"])
+    )
+
+
+def upgrade(connection: Connection) -> None:
+    ImageBlobOwner.__table__.create(connection, checkfirst=True)
+
+    result = connection.execute(
+        select(Chat.user_id, Message.images)
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(Message.images.isnot(None))
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    pairs = set()
+    for user_id, images in result:
+        for image in images or []:
+            if is_image_ref(image):
+                pairs.add((ref_digest(image), user_id))
+        if len(pairs) >= BATCH_SIZE:
+            _insert_owners(connection, pairs)
+            pairs = set()
+    if pairs:
+        _insert_owners(connection, pairs)
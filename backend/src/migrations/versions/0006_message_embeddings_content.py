@@ -0,0 +1,20 @@
+"""
+Index on message_embeddings (content_hash, model).
+
+The embedding job prunes content embeddings that no message refers to any
+more; the index keeps that anti-join cheap.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DESCRIPTION = "Add index for pruning unused embeddings"
+
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_message_embeddings_content "
+            "ON message_embeddings (content_hash, model)"
+        )
+    )
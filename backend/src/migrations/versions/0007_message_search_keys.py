@@ -0,0 +1,58 @@
+"""
+Stable keys for the SQLite full-text index.
+
+``0003_message_search`` keyed ``messages_fts`` on the implicit rowid of
+``messages``. Its primary key is a UUID, so that rowid is not stable and
+``VACUUM`` may renumber it, leaving the index pointing at other messages.
+
+The index now stores its own copy of the content, keyed on
+``messages_fts_keys.id``, an INTEGER PRIMARY KEY assigned once per message.
+The triggers keep both tables current, and the index is refilled from the
+existing rows. Postgres indexes the content expression and needs nothing.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DESCRIPTION = "Key the SQLite full-text index on a stable id"
+
+SQLITE = [
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TABLE IF EXISTS messages_fts",
+    "CREATE TABLE IF NOT EXISTS messages_fts_keys ("
+    "id INTEGER PRIMARY KEY, message_id CHAR(32) NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE messages_fts USING fts5("
+    "content, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages "
+    "BEGIN "
+    "INSERT INTO messages_fts_keys (message_id) VALUES (new.id); "
+    "INSERT INTO messages_fts (rowid, content) "
+    "VALUES (last_insert_rowid(), new.content); "
+    "END",
+    "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages "
+    "BEGIN "
+    "DELETE FROM messages_fts WHERE rowid = "
+    "(SELECT id FROM messages_fts_keys WHERE message_id = old.id); "
+    "DELETE FROM messages_fts_keys WHERE message_id = old.id; "
+    "END",
+    "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages "
+    "BEGIN "
+    "UPDATE messages_fts SET content = new.content WHERE rowid = "
+    "(SELECT id FROM messages_fts_keys WHERE message_id = new.id); "
+    "END",
+    "DELETE FROM messages_fts_keys",
+    "INSERT INTO messages_fts_keys (message_id) SELECT id FROM messages",
+    "INSERT INTO messages_fts (rowid, content) "
+    "SELECT messages_fts_keys.id, messages.content FROM messages_fts_keys "
+    "JOIN messages ON messages.id = messages_fts_keys.message_id",
+]
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+
+    for statement in SQLITE:
+        connection.execute(text(statement))
@@ -1,4 +1,3 @@
-import uuid
 from datetime import datetime
 
 from sqlalchemy import (
@@ -7,19 +6,21 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
 )
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
+from src.core.ids import uuid7
 from src.database import Base
 
 
 class ModelProvider(Base):
     __tablename__ = "model_providers"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name = Column(String(100), nullable=False)
     api_url = Column(String(255), nullable=False)
     auth_type = Column(String(50), nullable=True)
@@ -35,7 +36,7 @@ class ModelProvider(Base):
 class Model(Base):
     __tablename__ = "models"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     provider_id = Column(UUID(as_uuid=True), ForeignKey("model_providers.id"))
     name = Column(String(100), nullable=False)
     display_name = Column(String(100))
@@ -50,11 +51,13 @@ class Model(Base):
     messages = relationship("Message", back_populates="model")
     user_access = relationship("UserModelAccess", back_populates="model")
 
+    __table_args__ = (Index("ix_models_name", "name"),)
+
 
 class Chat(Base):
     __tablename__ = "chats"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     title = Column(String(255), default="New Chat")
     created_at = Column(DateTime, default=datetime.now)
@@ -63,41 +66,155 @@ class Chat(Base):
 
     # Relationships
     user = relationship("User", back_populates="chats")
+    # Children are removed by ON DELETE CASCADE, the ORM never loads them for it
     messages = relationship(
-        "Message", back_populates="chat", cascade="all, delete-orphan"
+        "Message",
+        back_populates="chat",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    summary = relationship(
+        "ChatSummary",
+        back_populates="chat",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    stats = relationship(
+        "ChatStats",
+        back_populates="chat",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class ChatStats(Base):
+    """Denormalized message totals of a chat, kept up to date by ChatStatsService"""
+
+    __tablename__ = "chat_stats"
+
+    chat_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("chats.id", ondelete="CASCADE"),
+        primary_key=True,
     )
+    message_count = Column(Integer, nullable=False, default=0)
+    total_tokens = Column(Integer, nullable=False, default=0)
+    last_message_id = Column(UUID(as_uuid=True), nullable=True)
+    last_message_preview = Column(String(255), nullable=True)
+    last_message_role = Column(String(50), nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    chat = relationship("Chat", back_populates="stats")
+
+
+class ChatPurgeJob(Base):
+    """Background deletion of chats too large to delete in one request"""
+
+    __tablename__ = "chat_purge_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    chat_ids = Column(JSON, nullable=False)
+    # pending, running, done or failed
+    status = Column(String(20), nullable=False, default="pending")
+    total_messages = Column(Integer, nullable=False, default=0)
+    deleted_messages = Column(Integer, nullable=False, default=0)
+    deleted_chats = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class UserChatStats(Base):
+    """Per-user chat counts, kept up to date by ChatService"""
+
+    __tablename__ = "user_chat_stats"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    chat_count = Column(Integer, nullable=False, default=0)
+    archived_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+# Chat list: a user's (non-archived) chats by latest activity, see src/migrations
+Index(
+    "ix_chats_user_archived_updated",
+    Chat.user_id,
+    Chat.is_archived,
+    Chat.updated_at.desc(),
+    Chat.id.desc(),
+)
 
 
 class Message(Base):
     __tablename__ = "messages"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    chat_id = Column(UUID(as_uuid=True), ForeignKey("chats.id"))
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    chat_id = Column(
+        UUID(as_uuid=True), ForeignKey("chats.id", ondelete="CASCADE")
+    )
     role = Column(String(50), nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
-    thinking = Column(
-        Text, nullable=True
+    # Heavy columns are only loaded on access or with undefer_group("heavy")
+    thinking = deferred(
+        Column(Text, nullable=True), group="heavy"
     )  # For assistant messages that think before responding
-    tool_calls = Column(JSON, nullable=True)  # For assistant messages that call tools
-    images = Column(
-        JSON, nullable=True
-    )  # Store base64 encoded images for multimodal models
+    tool_calls = deferred(
+        Column(JSON, nullable=True), group="heavy"
+    )  # For assistant messages that call tools
+    images = deferred(
+        Column(JSON, nullable=True), group="heavy"
+    )  # sha256:<digest> references to the image blob store
     model_id = Column(
         UUID(as_uuid=True), ForeignKey("models.id"), nullable=True
     )  # Only for assistant messages
     created_at = Column(DateTime, default=datetime.now)
     tokens_used = Column(Integer, default=0)
-    extended_metadata = Column(JSON)
+    extended_metadata = deferred(Column(JSON), group="heavy")
 
     # Relationships
     chat = relationship("Chat", back_populates="messages")
     model = relationship("Model", back_populates="messages")
 
+    __table_args__ = (
+        # Keyset pagination of chat history on (created_at, id)
+        Index("ix_messages_chat_created_id", "chat_id", "created_at", "id"),
+    )
+
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    chat_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("chats.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    content = Column(Text, nullable=False)
+    model = Column(String(100), nullable=False)
+    # Leading non-system messages of the history replaced by this summary
+    covered_messages = Column(Integer, nullable=False, default=0)
+    covered_hash = Column(String(64), nullable=False)
+    covered_tokens = Column(Integer, nullable=False, default=0)
+    summary_tokens = Column(Integer, nullable=False, default=0)
+    # Estimated prompt tokens saved over all turns sent with the summary
+    prompt_tokens_saved = Column(Integer, nullable=False, default=0)
+    turns_compacted = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    # Relationships
+    chat = relationship("Chat", back_populates="summary")
+
 
 class UserModelAccess(Base):
     __tablename__ = "user_model_access"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     model_id = Column(UUID(as_uuid=True), ForeignKey("models.id"))
     granted_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
@@ -108,3 +225,7 @@ class UserModelAccess(Base):
     user = relationship("User", foreign_keys=[user_id])
     model = relationship("Model", back_populates="user_access")
     admin = relationship("User", foreign_keys=[granted_by])
+
+    __table_args__ = (
+        Index("ix_user_model_access_user_model", "user_id", "model_id"),
+    )
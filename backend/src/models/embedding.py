@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
+from sqlalchemy.dialects.postgresql import UUID
+from src.database import Base
+
+
+class ContentEmbedding(Base):
+    """Embedding of a text, shared by every message with the same content"""
+
+    __tablename__ = "content_embeddings"
+
+    # Hex SHA-256 of the embedded text
+    content_hash = Column(String(64), primary_key=True)
+    model = Column(String(255), primary_key=True)
+    dimensions = Column(Integer, nullable=False)
+    # Unit length float16 vector, little endian
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class MessageEmbedding(Base):
+    """Links a message to the embedding of its current content"""
+
+    __tablename__ = "message_embeddings"
+
+    message_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    content_hash = Column(String(64), nullable=False)
+    model = Column(String(255), nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        # Finds unused content embeddings when pruning
+        Index("ix_message_embeddings_content", "content_hash", "model"),
+    )
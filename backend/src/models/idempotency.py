@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, String
+from sqlalchemy.dialects.postgresql import UUID
+from src.database import Base
+
+
+class IdempotencyRecord(Base):
+    __tablename__ = "idempotency_records"
+
+    # SHA-256 of (user, scope, client key or request fingerprint)
+    key = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    chat_id = Column(UUID(as_uuid=True), nullable=True)
+    scope = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")
+    response_body = Column(JSON, nullable=True)
+    # Client supplied keys are kept for the full TTL, fingerprints only briefly
+    is_fingerprint = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    completed_at = Column(DateTime, nullable=True)
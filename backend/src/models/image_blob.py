@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from src.database import Base
+
+
+class ImageBlob(Base):
+    __tablename__ = "image_blobs"
+
+    # Hex SHA-256 of the image bytes, also the file name in the blob store
+    digest = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    # Number of message image slots pointing at this blob
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class ImageBlobOwner(Base):
+    """A user who uploaded a blob, and may read it and attach it to messages"""
+
+    __tablename__ = "image_blob_owners"
+
+    digest = Column(
+        String(64),
+        ForeignKey("image_blobs.digest", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.now)
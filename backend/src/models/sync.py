@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, String
+from sqlalchemy.dialects.postgresql import UUID
+from src.database import Base
+
+
+class UserSyncState(Base):
+    """Last change sequence number handed out for a user"""
+
+    __tablename__ = "user_sync_state"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    last_seq = Column(BigInteger, nullable=False, default=0)
+
+
+class SyncChange(Base):
+    """Change log entry of a chat or message, read by GET /sync"""
+
+    __tablename__ = "sync_changes"
+
+    user_id = Column(UUID(as_uuid=True), primary_key=True)
+    # Per-user sequence number, the sync cursor
+    seq = Column(BigInteger, primary_key=True, autoincrement=False)
+    # "chat" or "message"
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    chat_id = Column(UUID(as_uuid=True), nullable=False)
+    # "upsert" or "delete"
+    op = Column(String(10), nullable=False)
+    created_at = Column(DateTime, default=datetime.now, index=True)
@@ -1,16 +1,16 @@
-import uuid
 from datetime import datetime
 
 from sqlalchemy import Boolean, Column, DateTime, Enum, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
+from src.core.ids import uuid7
 from src.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(), primary_key=True, default=uuid7)
     username = Column(String(100), unique=True, nullable=False)
     email = Column(String(255), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
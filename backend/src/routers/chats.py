@@ -1,44 +1,315 @@
+from datetime import timedelta
+from typing import Callable, List, Literal, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from src.auth.service import get_current_active_user
-from src.database import get_db
+from src.auth.service import get_current_active_user, get_user_by_id
+from src.core.etag import etag_matches, make_etag, not_modified, set_etag
+from src.core.events import broker, event_stream
+from src.core.idempotency import run_idempotent
+from src.core.pagination import InvalidCursorError
+from src.core.responses import FastJSONResponse
+from src.database import get_db, get_session_factory
 from src.models.user import User
 from src.schemas import chat as chat_schemas
-from src.services.chat import ChatService, MessageService
+from src.services.change_log import ChangeLogService
+from src.services.chat import ChatService, MessageService, select_message_fields
+from src.services.chat_export import (
+    ChatExportService,
+    ChatImporter,
+    ChatImportError,
+    ndjson_lines,
+    spooled,
+)
+from src.services.chat_purge import ChatPurgeService
+from src.services.embeddings import (
+    EMBEDDINGS_ENABLED,
+    EmbeddingService,
+    SemanticSearchUnavailableError,
+)
+from src.services.images import InvalidImageError
+from src.services.search import SearchService, SearchUnavailableError
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 
+def message_fields(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma separated message fields to return, e.g. id,role,content",
+    ),
+    include: Optional[str] = Query(
+        None,
+        description="Comma separated heavy fields to add: images, thinking, "
+        "tool_calls, extended_metadata",
+    ),
+) -> List[str]:
+    """Sparse fieldset of messages, from the fields and include parameters."""
+    try:
+        return select_message_fields(fields, include)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("/my", response_model=chat_schemas.ChatListResponse)
 async def get_user_chats(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    skip: int = 0,
-    limit: int = 20,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
     include_archived: bool = False,
+    cursor: Optional[str] = None,
+    total: Literal["estimated", "exact", "none"] = "estimated",
+    title_contains: Optional[str] = Query(None, min_length=1, max_length=255),
 ):
     """
     Get all chats for the current user.
 
     Args:
-        skip: Number of chats to skip for pagination
+        skip: Number of chats to skip, ignored when a cursor is given
         limit: Maximum number of chats to return
         include_archived: Whether to include archived chats
+        cursor: next_cursor of the previous page
+        total: "estimated" (maintained counter), "exact" (recount) or "none"
+        title_contains: Only chats whose title contains this, ignoring case
 
     Returns:
-        A paginated list of user chats
-    """
-    return ChatService.get_user_chats(
-        db=db,
-        user=current_user,
-        skip=skip,
-        limit=limit,
-        include_archived=include_archived,
+        A paginated list of user chats, or 304 if If-None-Match matches
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    etag = make_etag(
+        "chats",
+        current_user.id,
+        ChatService.chat_list_version(db, current_user),
+        request.url.query,
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    try:
+        result = ChatService.get_user_chats(
+            db=db,
+            user=current_user,
+            skip=skip,
+            limit=limit,
+            include_archived=include_archived,
+            cursor=cursor,
+            total=total,
+            title_contains=title_contains,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Rows are already shaped like ChatListResponse, skip validating them
+    response = FastJSONResponse(result)
+    set_etag(response, etag)
+    return response
+
+
+@router.get("/search", response_model=chat_schemas.MessageSearchResponse)
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Search the messages of the current user's chats.
+
+    Every word must match, the last one as a prefix. Results are ranked by
+    relevance; pass next_cursor as cursor= for the next page.
+
+    Raises:
+        HTTPException: If the cursor is invalid or search is unavailable
+    """
+    try:
+        return SearchService.search_messages(
+            db=db, user=current_user, query=q, limit=limit, cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except SearchUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+
+
+@router.get("/semantic-search", response_model=chat_schemas.MessageSearchResponse)
+async def semantic_search_messages(
+    q: str = Query(..., min_length=1, max_length=1000),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Find the messages of the current user closest in meaning to a query.
+
+    Uses embeddings from EMBEDDING_MODEL; messages are embedded in the
+    background shortly after they are written.
+
+    Raises:
+        HTTPException: If semantic search is disabled or the model is unavailable
+    """
+    try:
+        return await EmbeddingService.search(
+            db=db, user=current_user, query=q, limit=limit
+        )
+    except SemanticSearchUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def chat_events(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Stream changes to the user's chat list as server-sent events.
+
+    Events are chat.created, chat.title, chat.updated and chat.deleted with
+    the chat_id, the title where it changed and the sync cursor of the
+    change. The stream opens with a ready event carrying the current cursor.
+    After a resync event, or a reconnect, catch up with GET /sync.
+
+    Returns:
+        A text/event-stream response
+    """
+    subscription = broker.subscribe(current_user.id)
+    cursor = ChangeLogService.last_seq(db, current_user.id)
+    # The stream outlives the request, so do not hold a connection for it
+    db.close()
+
+    return StreamingResponse(
+        event_stream(request, subscription, {"type": "ready", "cursor": cursor}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_chats(
+    format: Literal["ndjson", "json"] = "ndjson",
+    chat_id: Optional[UUID] = None,
+    user_id: Optional[UUID] = Query(
+        None, description="Export the chats of this user instead (admins only)"
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+):
+    """
+    Export all chats of the user, or one chat, with their messages.
+
+    The export is streamed while it is read from the database, so its size
+    does not affect the memory of the server. NDJSON exports have a header
+    line, then each chat followed by its messages, and can be imported with
+    POST /chats/import.
+
+    Args:
+        format: "ndjson" (one object per line) or "json" (one document)
+        chat_id: Only export this chat
+        user_id: Owner of the exported chats, for admins
+
+    Returns:
+        An application/x-ndjson or application/json stream
+
+    Raises:
+        HTTPException: If the chat or user is not found, or a non-admin
+            asks for another user's chats
+    """
+    owner = current_user
+    if user_id is not None and user_id != current_user.id:
+        if not current_user.is_admin():
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Not an admin user"
+            )
+        owner = get_user_by_id(db, str(user_id))
+        if owner is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+    if chat_id is not None:
+        try:
+            ChatService.chat_version(db, owner, chat_id)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    owner_id = owner.id
+    # The export reads with its own session, do not hold this one meanwhile
+    db.close()
+
+    if format == "json":
+        body = ChatExportService.export_json(session_factory, owner_id, chat_id)
+        media_type = "application/json"
+    else:
+        body = ChatExportService.export_ndjson(session_factory, owner_id, chat_id)
+        media_type = "application/x-ndjson"
+    filename = f"rovertchat-{chat_id or owner_id}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
+@router.post(
+    "/import",
+    response_model=chat_schemas.ChatImportResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_chats(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Import chats from an NDJSON export into the user's account.
+
+    The request body is received into a temporary file first, then read
+    line by line and messages are inserted in batches, so exports of any size
+    can be uploaded. Imported chats get new IDs. Nothing is imported if any
+    line is invalid.
+
+    Returns:
+        Numbers of imported chats and messages
+
+    Raises:
+        HTTPException: If a line is invalid, with its line number
+    """
+    importer = ChatImporter(db, current_user)
+    try:
+        async for line, text in ndjson_lines(spooled(request.stream())):
+            importer.add(line, text)
+        result = importer.finish()
+    except ChatImportError as e:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if EMBEDDINGS_ENABLED:
+        background_tasks.add_task(EmbeddingService.index_user_messages, current_user.id)
+    return result
+
+
 @router.post(
     "/my",
     response_model=chat_schemas.ChatResponse,
@@ -61,42 +332,134 @@ async def create_chat(
     return ChatService.create_chat(db=db, user=current_user, chat_data=chat_data)
 
 
-@router.delete("/my", status_code=status.HTTP_200_OK)
+@router.delete(
+    "/my",
+    status_code=status.HTTP_200_OK,
+    response_model=chat_schemas.ChatDeleteResponse,
+)
 async def delete_all_chats(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
     Delete all chats for the current user.
 
+    Very large deletions return a purge_job_id and finish in the background;
+    the chats are gone from the list right away.
+
     Returns:
-        Success confirmation
+        Deleted chat and message counts
+    """
+    result = ChatService.delete_all_user_chats(db=db, user=current_user)
+    if result["purge_job_id"]:
+        background_tasks.add_task(ChatPurgeService.run, result["purge_job_id"])
+    return result
+
+
+@router.get("/purge/{job_id}", response_model=chat_schemas.ChatPurgeJobResponse)
+async def get_purge_job(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get the progress of a background chat purge.
+
+    Raises:
+        HTTPException: If the job is not found or not owned by user
     """
-    return ChatService.delete_all_user_chats(db=db, user=current_user)
+    try:
+        return ChatPurgeService.get_job(db=db, user_id=current_user.id, job_id=job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.get("/chat/{chat_id}", response_model=chat_schemas.ChatMessagesResponse)
+@router.get(
+    "/chat/{chat_id}",
+    response_model=chat_schemas.ChatMessagesResponse,
+    response_model_exclude_unset=True,
+)
 async def get_chat(
     chat_id: UUID,
+    request: Request,
+    fields: List[str] = Depends(message_fields),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Get a specific chat with all messages.
+    Get a specific chat with its messages.
+
+    Messages leave out images, thinking, tool calls and metadata unless
+    they are requested with include=, or fetched per message from the
+    images and thinking endpoints.
+
+    With a limit, the newest messages are returned first; pass next_cursor
+    as before= to load older ones.
 
     Args:
         chat_id: UUID of the chat to retrieve
+        fields: Message fields to return (fields= and include= parameters)
+        limit: Maximum number of messages, all messages when omitted
+        before: Cursor returned by the previous page
 
     Returns:
-        The chat details and all messages in the chat
+        The chat details and its messages in chronological order, or 304 if
+        If-None-Match matches
 
     Raises:
         HTTPException: If chat not found or not owned by user
     """
     try:
-        return ChatService.get_chat_with_messages(
-            db=db, user=current_user, chat_id=chat_id
+        version = ChatService.chat_version(db, current_user, chat_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    etag = make_etag("chat", chat_id, *version, request.url.query)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    try:
+        result = ChatService.get_chat_with_messages(
+            db=db,
+            user=current_user,
+            chat_id=chat_id,
+            fields=fields,
+            limit=limit,
+            before=before,
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    # Messages hold only the selected fields, like response_model_exclude_unset
+    response = FastJSONResponse(result)
+    set_etag(response, etag)
+    return response
+
+
+@router.get("/chat/{chat_id}/summary", response_model=chat_schemas.ChatSummaryResponse)
+async def get_chat_summary(
+    chat_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get the rolling summary of a long chat.
+
+    Args:
+        chat_id: UUID of the chat
+
+    Returns:
+        The summary text and the prompt tokens it has saved so far
+
+    Raises:
+        HTTPException: If chat not found, not owned by user or not summarized
+    """
+    try:
+        return ChatService.get_chat_summary(db=db, user=current_user, chat_id=chat_id)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
@@ -129,9 +492,14 @@ async def update_chat(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.delete("/chat/{chat_id}", status_code=status.HTTP_200_OK)
+@router.delete(
+    "/chat/{chat_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=chat_schemas.ChatDeleteResponse,
+)
 async def delete_chat(
     chat_id: UUID,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -142,27 +510,40 @@ async def delete_chat(
         chat_id: UUID of the chat to delete
 
     Returns:
-        Success confirmation
+        Deleted chat and message counts, or a purge_job_id for chats too
+        large to delete within the request
 
     Raises:
         HTTPException: If chat not found or not owned by user
     """
     try:
-        return ChatService.delete_chat(db=db, user=current_user, chat_id=chat_id)
+        result = ChatService.delete_chat(db=db, user=current_user, chat_id=chat_id)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
+    if result["purge_job_id"]:
+        background_tasks.add_task(ChatPurgeService.run, result["purge_job_id"])
+    return result
+
 
 @router.get("/models", response_model=chat_schemas.ModelListResponse)
 async def get_available_models(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
 ):
     """
     Get all available models from the database.
 
     Returns:
-        A list of active models and their providers
+        A list of active models and their providers, or 304 if
+        If-None-Match matches
     """
+    etag = make_etag("models", *ChatService.models_version(db))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return ChatService.get_available_models(db=db)
 
 
@@ -171,24 +552,64 @@ async def get_available_models(
 async def create_message(
     chat_id: UUID,
     message: chat_schemas.MessageCreateSchema,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
-    """Create a new message in a chat"""
-    try:
-        return MessageService.create_message(
+    """
+    Create a new message in a chat.
+
+    Retries with the same Idempotency-Key header, and identical requests that
+    arrive while the first one is still running, return the original message
+    instead of inserting a duplicate. Once it is stored, the same text can be
+    sent again right away.
+    """
+    user_id = current_user.id
+
+    async def handler():
+        db_message = MessageService.create_message(
             db=db, user=current_user, chat_id=chat_id, message=message
         )
+        return chat_schemas.MessageResponse.model_validate(db_message).model_dump(
+            mode="json"
+        )
+
+    try:
+        body, replayed = await run_idempotent(
+            db=db,
+            user_id=user_id,
+            scope=f"chat_message:{chat_id}",
+            payload=message.model_dump(mode="json"),
+            handler=handler,
+            idempotency_key=idempotency_key,
+            chat_id=chat_id,
+            fingerprint_grace=timedelta(0),
+        )
+    except InvalidImageError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    elif EMBEDDINGS_ENABLED:
+        background_tasks.add_task(EmbeddingService.index_user_messages, user_id)
+    return body
+
 
 @router.get(
-    "/{chat_id}/messages/{message_id}", response_model=chat_schemas.MessageResponse
+    "/{chat_id}/messages/{message_id}",
+    response_model=chat_schemas.MessageSchema,
+    response_model_exclude_unset=True,
 )
 async def get_message(
     chat_id: UUID,
     message_id: UUID,
+    fields: List[str] = Depends(message_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
@@ -198,6 +619,7 @@ async def get_message(
     Args:
         chat_id: UUID of the chat containing the message
         message_id: UUID of the message to retrieve
+        fields: Message fields to return (fields= and include= parameters)
 
     Returns:
         The requested message
@@ -207,79 +629,131 @@ async def get_message(
     """
     try:
         return MessageService.get_message(
-            db=db, user=current_user, chat_id=chat_id, message_id=message_id
+            db=db,
+            user=current_user,
+            chat_id=chat_id,
+            message_id=message_id,
+            fields=fields,
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
-@router.patch(
-    "/{chat_id}/messages/{message_id}", response_model=chat_schemas.MessageResponse
+@router.get(
+    "/{chat_id}/messages/{message_id}/images",
+    response_model=chat_schemas.MessageImagesResponse,
 )
-async def update_message(
+async def get_message_images(
     chat_id: UUID,
     message_id: UUID,
-    message_update: chat_schemas.MessageUpdateSchema,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Update a message in a chat.
+    Get the image references of a message.
 
     Args:
         chat_id: UUID of the chat containing the message
-        message_id: UUID of the message to update
-        message_update: Data for updating the message
+        message_id: UUID of the message
 
     Returns:
-        The updated message object
+        The message's sha256: image references, served by /images/{digest}
 
     Raises:
         HTTPException: If chat or message not found, or not owned by user
     """
     try:
-        return MessageService.update_message(
+        message = MessageService.get_message(
             db=db,
             user=current_user,
             chat_id=chat_id,
             message_id=message_id,
-            message_update=message_update,
+            fields=["id", "images"],
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
-    except PermissionError as e:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    return {"message_id": message["id"], "images": message["images"] or []}
 
 
-@router.delete(
-    "/{chat_id}/messages/{message_id}",
-    response_model=chat_schemas.MessageDeleteResponse,
+@router.get(
+    "/{chat_id}/messages/{message_id}/thinking",
+    response_model=chat_schemas.MessageThinkingResponse,
 )
-async def delete_message(
+async def get_message_thinking(
     chat_id: UUID,
     message_id: UUID,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Delete a message from a chat.
+    Get the thinking process of a message.
 
     Args:
         chat_id: UUID of the chat containing the message
-        message_id: UUID of the message to delete
+        message_id: UUID of the message
 
     Returns:
-        Success confirmation with deleted message ID
+        The model's thinking before it responded, if any
 
     Raises:
         HTTPException: If chat or message not found, or not owned by user
     """
     try:
-        return MessageService.delete_message(
-            db=db, user=current_user, chat_id=chat_id, message_id=message_id
+        message = MessageService.get_message(
+            db=db,
+            user=current_user,
+            chat_id=chat_id,
+            message_id=message_id,
+            fields=["id", "thinking"],
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return {"message_id": message["id"], "thinking": message["thinking"]}
+
+
+@router.patch(
+    "/{chat_id}/messages/{message_id}", response_model=chat_schemas.MessageResponse
+)
+async def update_message(
+    chat_id: UUID,
+    message_id: UUID,
+    message_update: chat_schemas.MessageUpdateSchema,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Update a message in a chat.
+
+    Args:
+        chat_id: UUID of the chat containing the message
+        message_id: UUID of the message to update
+        message_update: Data for updating the message
+
+    Returns:
+        The updated message object
+
+    Raises:
+        HTTPException: If chat or message not found, or not owned by user
+    """
+    try:
+        updated = MessageService.update_message(
+            db=db,
+            user=current_user,
+            chat_id=chat_id,
+            message_id=message_id,
+            message_update=message_update,
+        )
+    except InvalidImageError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    if EMBEDDINGS_ENABLED and message_update.content is not None:
+        background_tasks.add_task(EmbeddingService.index_user_messages, current_user.id)
+    return updated
 
 
 @router.delete(
@@ -294,6 +768,9 @@ async def bulk_delete_messages(
     """
     Delete multiple messages from a chat.
 
+    Declared before the single message route, which would otherwise match
+    "bulk" as a message_id.
+
     Args:
         chat_id: UUID of the chat containing the messages
         bulk_delete: Schema containing list of message IDs to delete
@@ -313,3 +790,34 @@ async def bulk_delete_messages(
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.delete(
+    "/{chat_id}/messages/{message_id}",
+    response_model=chat_schemas.MessageDeleteResponse,
+)
+async def delete_message(
+    chat_id: UUID,
+    message_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Delete a message from a chat.
+
+    Args:
+        chat_id: UUID of the chat containing the message
+        message_id: UUID of the message to delete
+
+    Returns:
+        Success confirmation with deleted message ID
+
+    Raises:
+        HTTPException: If chat or message not found, or not owned by user
+    """
+    try:
+        return MessageService.delete_message(
+            db=db, user=current_user, chat_id=chat_id, message_id=message_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
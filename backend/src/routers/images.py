@@ -0,0 +1,122 @@
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Path,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from src.auth.service import get_current_active_user
+from src.core.logger import app_logger
+from src.core.rate_limiter import limiter
+from src.database import get_db
+from src.models.user import User
+from src.schemas.image import ImageUploadResponse
+from src.services.chat_models import OllamaService
+from src.services.images import (
+    IMAGE_MAX_SIDE,
+    ImageService,
+    ImageTooLargeError,
+    InvalidImageError,
+    blob_store,
+    ref_digest,
+    sniff_content_type,
+)
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+# Blobs never change, so clients may cache them for as long as they like
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+@router.post("", response_model=ImageUploadResponse, status_code=201)
+@limiter.limit("30/minute")
+async def upload_image(
+    request: Request,
+    file: UploadFile = File(...),
+    model: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Upload an image as multipart form data.
+
+    The image is streamed to disk and downscaled to what the vision model
+    can use, so clients can attach the returned reference to messages
+    instead of sending base64 data.
+
+    Args:
+        file: Image file
+        model: Optional model name, used to pick the target image size
+
+    Returns:
+        The stored image reference and its dimensions
+
+    Raises:
+        HTTPException: If the file is too large or not an image
+    """
+    max_side = IMAGE_MAX_SIDE
+    if model:
+        max_side = await OllamaService.get_vision_image_size(model) or IMAGE_MAX_SIDE
+
+    try:
+        return await ImageService.store_upload(db, current_user.id, file, max_side)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        app_logger.error(f"Error uploading image: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to upload image")
+    finally:
+        await file.close()
+
+
+@router.get("/{digest}")
+async def get_image(
+    request: Request,
+    digest: str = Path(..., pattern="^(sha256:)?[0-9a-f]{64}$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get an image from the blob store by its SHA-256 digest.
+
+    Only images the user uploaded are served. Supports If-None-Match and
+    Range requests.
+
+    Args:
+        digest: Hex SHA-256 digest, optionally prefixed with "sha256:"
+
+    Returns:
+        The image bytes
+
+    Raises:
+        HTTPException: If the image does not exist or is not the user's
+    """
+    digest = ref_digest(digest)
+    path = blob_store.path_for(digest)
+    # Checked before the conditional request, so a 304 reveals nothing either
+    if not ImageService.owned_digests(db, current_user.id, [digest]) or (
+        not path.is_file()
+    ):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    with path.open("rb") as file:
+        media_type = sniff_content_type(file.read(16))
+
+    return FileResponse(path, media_type=media_type, headers=headers)
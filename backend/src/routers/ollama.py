@@ -1,12 +1,32 @@
+import asyncio
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import UUID
 
 import aiohttp
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+)
+from jose import JWTError
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from src.auth.jwt import decode_token
 from src.auth.service import get_current_active_admin, get_current_active_user
+from src.core.channel import Channel
+from src.core.etag import etag_matches, make_etag, not_modified, set_etag
+from src.core.events import broker
+from src.core.idempotency import run_idempotent
 from src.core.logger import app_logger
-from src.database import get_db
+from src.database import get_db, get_session_factory
 from src.models.chat_models import Chat, Message, Model
 from src.models.user import User
 from src.schemas.ollama import (
@@ -15,7 +35,14 @@ from src.schemas.ollama import (
     OllamaModelsWithCapabilitiesResponse,
     OllamaShowResponse,
 )
+from src.services.change_log import ChangeLogService
 from src.services.chat_models import OllamaService
+from src.services.chat_stats import ChatStatsService
+from src.services.context_window import ContextWindowService
+from src.services.embeddings import EMBEDDINGS_ENABLED, EmbeddingService
+from src.services.image_policy import ImagePolicyService
+from src.services.images import ImageService
+from src.services.summarizer import ConversationSummaryService
 
 # Router for Ollama API integration
 router = APIRouter(prefix="/ollama", tags=["ollama"])
@@ -24,6 +51,12 @@ router = APIRouter(prefix="/ollama", tags=["ollama"])
 OLLAMA_API_BASE_URL = os.getenv("OLLAMA_API_BASE_URL", "http://localhost:11434")
 app_logger.info(f"Using Ollama API base URL: {OLLAMA_API_BASE_URL}")
 
+# How often open WebSockets re-check that their login is still valid
+WS_AUTH_CHECK_SECONDS = float(os.getenv("WS_AUTH_CHECK_SECONDS", "60"))
+
+# Close code of sockets whose login ended (logout, expiry, deactivation)
+WS_CLOSE_LOGIN_ENDED = 4401
+
 
 @router.get("/version")
 async def get_ollama_version():
@@ -49,14 +82,28 @@ async def get_ollama_version():
 
 @router.get("/tags", response_model=OllamaModelsWithCapabilitiesResponse)
 async def get_ollama_tags_with_capabilities(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
 ):
     """
     Retrieve available Ollama model tags with their capabilities.
+
+    Answers 304 when If-None-Match matches the cached model list, without
+    contacting Ollama.
     """
     app_logger.info(f"User {current_user.id} requested Ollama tags with capabilities")
+    if_none_match = request.headers.get("if-none-match")
+    version = OllamaService.models_version()
+    if version and etag_matches(if_none_match, make_etag("tags", version)):
+        return not_modified(make_etag("tags", version))
     try:
-        return await OllamaService.get_models_with_capabilities()
+        models = await OllamaService.get_models_with_capabilities()
+        etag = make_etag("tags", OllamaService.models_version())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        return models
     except aiohttp.ClientError as e:
         raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
@@ -154,105 +201,423 @@ async def clear_model_cache(
 @router.post("/chat")
 async def chat_ollama(
     chat_request: OllamaChatRequest,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=255
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
     Asynchronously get chat responses from an Ollama model.
+
+    Retries with the same Idempotency-Key header, and identical requests that
+    arrive while a generation for them is running, receive the result of that
+    generation instead of starting another one.
     """
     try:
+        user_id = current_user.id
+
         # Verify chat belongs to the user
         chat = (
             db.query(Chat)
-            .filter(Chat.id == chat_request.chatId, Chat.user_id == current_user.id)
+            .filter(Chat.id == chat_request.chatId, Chat.user_id == user_id)
             .first()
         )
 
         if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
-        # Save the user message to the database
-        latest_user_message = next(
-            (msg for msg in reversed(chat_request.messages) if msg.role == "user"), None
-        )
 
-        # Make request to Ollama using service
         payload = chat_request.model_dump(mode="json")
-        response_data = await OllamaService.chat_with_model(payload)
 
-        # Check for errors from Ollama
-        if "error" in response_data:
-            return response_data
+        async def generate():
+            return await _generate_chat_response(
+                db, chat, chat_request, payload, background_tasks
+            )
 
-        app_logger.info(f"Chat response: {response_data}")  # Snitching ai responses :)
+        response_data, replayed = await run_idempotent(
+            db=db,
+            user_id=user_id,
+            scope=f"ollama_chat:{chat_request.chatId}",
+            payload=payload,
+            handler=generate,
+            idempotency_key=idempotency_key,
+            chat_id=chat_request.chatId,
+            should_cache=lambda body: "error" not in body,
+            fingerprint_grace=timedelta(0),
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return response_data
 
-        # Save the assistant message to the database
-        if (
-            "message" in response_data
-            and response_data.get("message", {}).get("role") == "assistant"
-        ):
-            # Look up model from the database based on name
-            model = db.query(Model).filter(Model.name == chat_request.model).first()
-            model_id = model.id if model else None
-
-            assistant_db_message = Message(
-                chat_id=chat_request.chatId,
-                role="assistant",
-                content=response_data["message"]["content"],
-                model_id=model_id,
-                tokens_used=response_data.get("eval_count", 0),
-                extended_metadata={
-                    "prompt_eval_count": response_data.get("prompt_eval_count", 0),
-                    "eval_count": response_data.get("eval_count", 0),
-                    "eval_duration": response_data.get("eval_duration", 0),
-                },
+    except HTTPException:
+        raise
+    except aiohttp.ClientError as e:
+        app_logger.error(f"Error connecting to Ollama API: {str(e)}")
+        raise HTTPException(
+            status_code=502, detail=f"Error connecting to Ollama API: {str(e)}"
+        )
+    except Exception as e:
+        app_logger.error(f"Unexpected error in chat_ollama: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.websocket("/ws")
+async def chat_channel(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+):
+    """
+    Chat over one WebSocket, authenticated once when it opens.
+
+    Client frames are JSON objects with an ``op``:
+
+    - ``{"op": "send", "id": ..., "request": {...}, "idempotencyKey": ...}``
+      runs a chat turn; ``request`` is the body of POST /ollama/chat. Replies
+      are ``chunk`` frames with the streamed message, then one ``done`` frame
+      with the same body POST /ollama/chat returns, or an ``error`` frame.
+    - ``{"op": "cancel", "id": ...}`` stops a running turn, answered by
+      ``cancelled``. Nothing is saved for a cancelled turn.
+    - ``{"op": "subscribe"}`` streams the chat-list events of GET
+      /chats/events as ``event`` frames.
+    - ``{"op": "ping"}`` is answered by ``pong``.
+
+    Up to WS_MAX_GENERATIONS turns run at once, for any chats. Frames to the
+    client wait in a queue of WS_SEND_QUEUE_SIZE; while it is full, turns
+    stop reading from Ollama.
+
+    Browsers send the session cookie with any site's WebSocket, so sockets
+    opened from an origin outside FRONTEND_ORIGINS are refused. The socket
+    is closed with code 4401 once the access token expires, or, checked every
+    WS_AUTH_CHECK_SECONDS, the user logs out or is deactivated.
+    """
+    user_id = current_user.id
+    token_version = current_user.token_version
+    # Each turn uses its own session, keep no connection for the socket
+    db.close()
+
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin not in websocket.app.state.cors_origins:
+        app_logger.warning(f"Refused chat channel of user {user_id} from {origin}")
+        await websocket.close(code=1008)
+        return
+    try:
+        expires_at = float(decode_token(websocket.cookies["access_token"])["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    channel = Channel(websocket)
+    channel.start(
+        "login",
+        _watch_login(channel, user_id, token_version, expires_at, session_factory),
+        limited=False,
+    )
+
+    async def handle(frame: Dict[str, Any]) -> None:
+        op = frame.get("op")
+        request_id = str(frame.get("id") or "")
+
+        if op == "send":
+            try:
+                chat_request = OllamaChatRequest.model_validate(frame.get("request"))
+            except ValidationError as e:
+                detail = e.errors(include_url=False, include_context=False)
+                await channel.send(_error_frame(request_id, 422, detail))
+                return
+            turn = _channel_turn(
+                channel,
+                request_id,
+                user_id,
+                chat_request,
+                frame.get("idempotencyKey"),
+                session_factory,
             )
-            db.add(assistant_db_message)
-
-            # Update the chat's updated_at timestamp
-            setattr(chat, "updated_at", datetime.now())
-
-            # Auto-generate chat title from first user message if it's still "New Chat"
-            message_count = db.query(Message).filter(Message.chat_id == chat.id).count()
-            if (
-                str(chat.title) == "New Chat" and message_count <= 2
-            ):  # First user message + assistant response
-                # Get the user message (first message)
-                user_message = (
-                    latest_user_message.content if latest_user_message else ""
-                )
-                # Create a title from the first ~30 characters of user message
-                if user_message:
-                    new_title = user_message[:30].strip()
-                    if len(user_message) > 30:
-                        new_title += "..."
-                    setattr(chat, "title", new_title)
-                    app_logger.info(
-                        f"Auto-generated title for chat {chat.id}: {new_title}"
+            if not channel.start(f"turn:{request_id}", turn):
+                await channel.send(
+                    _error_frame(
+                        request_id, 429, "Too many turns running or id already in use"
                     )
+                )
+        elif op == "cancel":
+            if channel.cancel(f"turn:{request_id}"):
+                await channel.send({"type": "cancelled", "id": request_id})
+        elif op == "subscribe":
+            channel.start("events", _forward_events(channel, user_id), limited=False)
+        elif op == "ping":
+            await channel.send({"type": "pong", "id": request_id})
+        else:
+            await channel.send(_error_frame(request_id, 400, "Unknown op"))
+
+    app_logger.info(f"User {user_id} opened a chat channel")
+    await channel.run(handle)
+    app_logger.info(f"User {user_id} closed a chat channel")
+
+
+async def _watch_login(
+    channel: Channel,
+    user_id: UUID,
+    token_version: int,
+    expires_at: float,
+    session_factory: Callable[[], Session],
+) -> None:
+    """Close a channel once the login it was opened with is no longer valid."""
+    while True:
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            app_logger.info(f"Chat channel of user {user_id} outlived its token")
+            await channel.close(WS_CLOSE_LOGIN_ENDED, "Token expired")
+            return
+        await asyncio.sleep(min(remaining, WS_AUTH_CHECK_SECONDS))
+
+        db = session_factory()
+        try:
+            user = db.get(User, user_id)
+            valid = (
+                user is not None
+                and user.is_active is not False
+                and user.token_version == token_version
+            )
+        finally:
+            db.close()
+        if not valid:
+            app_logger.info(f"Chat channel of user {user_id} outlived its login")
+            await channel.close(WS_CLOSE_LOGIN_ENDED, "Login ended")
+            return
 
-            db.commit()
-            db.refresh(assistant_db_message)
 
-            response_data["id"] = str(assistant_db_message.id)
+def _error_frame(request_id: str, status_code: int, detail: Any) -> Dict[str, Any]:
+    return {"type": "error", "id": request_id, "status": status_code, "detail": detail}
 
-            # Include updated chat data in response
-            response_data["chat"] = {"id": str(chat.id), "title": chat.title}
-        else:
-            app_logger.error(f"Unexpected response format from Ollama: {response_data}")
-            if "error" in response_data:
-                return {
-                    "error": "Ollama API error",
-                    "details": response_data.get("error"),
-                }
-            return {"error": "Invalid response format from Ollama model"}
 
-        return response_data
+async def _forward_events(channel: Channel, user_id: UUID) -> None:
+    """Send the user's chat-list events over a channel."""
+    subscription = broker.subscribe(user_id)
+    try:
+        while True:
+            event = await subscription.queue.get()
+            await channel.send({"type": "event", "event": event})
+    finally:
+        broker.unsubscribe(subscription)
 
+
+async def _channel_turn(
+    channel: Channel,
+    request_id: str,
+    user_id: UUID,
+    chat_request: OllamaChatRequest,
+    idempotency_key: Optional[str],
+    session_factory: Callable[[], Session],
+) -> None:
+    """One chat turn requested over a channel, streamed back as frames."""
+    background_tasks = BackgroundTasks()
+    db = session_factory()
+    try:
+        chat = (
+            db.query(Chat)
+            .filter(Chat.id == chat_request.chatId, Chat.user_id == user_id)
+            .first()
+        )
+        if not chat:
+            raise HTTPException(status_code=404, detail="Chat not found")
+
+        payload = chat_request.model_dump(mode="json")
+
+        async def forward(chunk: Dict[str, Any]) -> None:
+            await channel.send(
+                {"type": "chunk", "id": request_id, "message": chunk.get("message")}
+            )
+
+        async def generate():
+            return await _generate_chat_response(
+                db, chat, chat_request, payload, background_tasks, on_chunk=forward
+            )
+
+        response_data, replayed = await run_idempotent(
+            db=db,
+            user_id=user_id,
+            scope=f"ollama_chat:{chat_request.chatId}",
+            payload=payload,
+            handler=generate,
+            idempotency_key=idempotency_key,
+            chat_id=chat_request.chatId,
+            should_cache=lambda body: "error" not in body,
+            fingerprint_grace=timedelta(0),
+        )
+        await channel.send(
+            {
+                "type": "done",
+                "id": request_id,
+                "replayed": replayed,
+                "response": response_data,
+            }
+        )
+    except HTTPException as e:
+        await channel.send(_error_frame(request_id, e.status_code, e.detail))
     except aiohttp.ClientError as e:
         app_logger.error(f"Error connecting to Ollama API: {str(e)}")
-        raise HTTPException(
-            status_code=502, detail=f"Error connecting to Ollama API: {str(e)}"
+        await channel.send(
+            _error_frame(request_id, 502, f"Error connecting to Ollama API: {str(e)}")
         )
     except Exception as e:
-        app_logger.error(f"Unexpected error in chat_ollama: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        app_logger.error(f"Unexpected error in chat channel: {str(e)}", exc_info=True)
+        await channel.send(_error_frame(request_id, 500, "Internal server error"))
+    finally:
+        db.close()
+
+    await background_tasks()
+
+
+async def _generate_chat_response(
+    db: Session,
+    chat: Chat,
+    chat_request: OllamaChatRequest,
+    payload: Dict[str, Any],
+    background_tasks: BackgroundTasks,
+    on_chunk: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Run one generation and persist the assistant reply.
+
+    With on_chunk, the reply is streamed from Ollama and each chunk passed on.
+    """
+    latest_user_message = next(
+        (msg for msg in reversed(chat_request.messages) if msg.role == "user"), None
+    )
+
+    # Fit the history into the model's context window before uploading it
+    num_ctx = await OllamaService.get_context_window(
+        chat_request.model, chat_request.options
+    )
+    # Send the chat summary instead of the turns it already covers
+    compacted = ConversationSummaryService.apply_summary(
+        db, chat_request.chatId, payload["messages"]
+    )
+    # Only ship the images that this turn actually needs
+    pruned = ImagePolicyService.apply(
+        compacted["messages"], measure=ImageService.payload_size
+    )
+    window = ContextWindowService.trim_history(
+        chat_request.model, pruned["messages"], num_ctx, chat_request.options
+    )
+
+    # Make request to Ollama using service
+    request_data = {
+        **payload,
+        "messages": ImageService.resolve_for_ollama(
+            db, chat.user_id, window["messages"]
+        ),
+    }
+    if on_chunk is None:
+        response_data = await OllamaService.chat_with_model(request_data)
+    else:
+        response_data = await OllamaService.stream_chat(request_data, on_chunk)
+
+    # Check for errors from Ollama
+    if "error" in response_data:
+        return response_data
+
+    app_logger.info(f"Chat response: {response_data}")  # Snitching ai responses :)
+
+    ContextWindowService.record_prompt_eval(
+        chat_request.model,
+        window["messages"],
+        window["estimated_tokens"],
+        response_data.get("prompt_eval_count"),
+    )
+
+    # Save the assistant message to the database
+    if (
+        "message" in response_data
+        and response_data.get("message", {}).get("role") == "assistant"
+    ):
+        # Look up model from the database based on name
+        model = db.query(Model).filter(Model.name == chat_request.model).first()
+        model_id = model.id if model else None
+
+        assistant_db_message = Message(
+            chat_id=chat_request.chatId,
+            role="assistant",
+            content=response_data["message"]["content"],
+            model_id=model_id,
+            tokens_used=response_data.get("eval_count", 0),
+            extended_metadata={
+                "prompt_eval_count": response_data.get("prompt_eval_count", 0),
+                "eval_count": response_data.get("eval_count", 0),
+                "eval_duration": response_data.get("eval_duration", 0),
+                "prompt_tokens_estimate": window["estimated_tokens"],
+                "history_messages_dropped": window["dropped"],
+                "summary_tokens_saved": compacted["tokens_saved"],
+                "image_bytes_saved": pruned["bytes_saved"],
+            },
+        )
+        db.add(assistant_db_message)
+        db.flush()
+        stats = ChatStatsService.message_added(db, assistant_db_message)
+
+        if compacted["summary_applied"]:
+            ConversationSummaryService.record_savings(
+                db, chat_request.chatId, compacted["tokens_saved"]
+            )
+
+        # Update the chat's updated_at timestamp
+        setattr(chat, "updated_at", datetime.now())
+
+        # Auto-generate chat title from first user message if it's still "New Chat"
+        new_title = None
+        if (
+            str(chat.title) == "New Chat" and stats.message_count <= 2
+        ):  # First user message + assistant response
+            # Get the user message (first message)
+            user_message = latest_user_message.content if latest_user_message else ""
+            # Create a title from the first ~30 characters of user message
+            if user_message:
+                new_title = user_message[:30].strip()
+                if len(user_message) > 30:
+                    new_title += "..."
+                setattr(chat, "title", new_title)
+                app_logger.info(f"Auto-generated title for chat {chat.id}: {new_title}")
+
+        ChangeLogService.messages_changed(
+            db,
+            chat.user_id,
+            chat.id,
+            upserted=[assistant_db_message.id],
+            title=new_title,
+        )
+        db.commit()
+        db.refresh(assistant_db_message)
+
+        response_data["id"] = str(assistant_db_message.id)
+        response_data["image_bytes_saved"] = pruned["bytes_saved"]
+
+        # Compact the history in the background once it grows too long
+        history = payload["messages"] + [
+            {"role": "assistant", "content": response_data["message"]["content"]}
+        ]
+        if ConversationSummaryService.needs_summary(db, chat_request.chatId, history):
+            background_tasks.add_task(
+                ConversationSummaryService.summarize_chat,
+                chat_request.chatId,
+                chat_request.model,
+                history,
+            )
+        if EMBEDDINGS_ENABLED:
+            background_tasks.add_task(EmbeddingService.index_user_messages, chat.user_id)
+
+        # Include updated chat data in response
+        response_data["chat"] = {"id": str(chat.id), "title": chat.title}
+    else:
+        app_logger.error(f"Unexpected response format from Ollama: {response_data}")
+        if "error" in response_data:
+            return {
+                "error": "Ollama API error",
+                "details": response_data.get("error"),
+            }
+        return {"error": "Invalid response format from Ollama model"}
+
+    return response_data
@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from src.auth.service import get_current_active_user
+from src.database import get_db
+from src.models.user import User
+from src.routers.chats import message_fields
+from src.schemas import chat as chat_schemas
+from src.services.change_log import SYNC_PAGE_SIZE
+from src.services.chat import ChatService
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get(
+    "",
+    response_model=chat_schemas.SyncResponse,
+    response_model_exclude_unset=True,
+)
+async def sync_changes(
+    since: Optional[int] = Query(
+        None, ge=0, description="cursor of the previous sync, omit on first sync"
+    ),
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=SYNC_PAGE_SIZE),
+    fields: List[str] = Depends(message_fields),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get the chats and messages changed since the last sync.
+
+    Changed chats and messages are returned in full, deleted ones by ID.
+    Repeat with since=cursor while has_more is true. When reset is true the
+    client must reload its chats from the regular endpoints first.
+
+    Args:
+        since: Cursor returned by the previous sync
+        limit: Maximum number of changes to read
+        fields: Message fields to return (fields= and include= parameters)
+
+    Returns:
+        The changes and the cursor to pass next time
+    """
+    return ChatService.get_changes(
+        db=db, user=current_user, since=since, limit=limit, fields=fields
+    )
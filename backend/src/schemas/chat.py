@@ -6,20 +6,38 @@ from pydantic import BaseModel, Field
 
 
 class MessageSchema(BaseModel):
+    """Sparse message, only the requested fields are present"""
+
     id: UUID
-    chat_id: UUID
-    role: str
-    content: str
-    images: Optional[List[str]] = None  # List of base64 encoded images
+    chat_id: Optional[UUID] = None
+    role: Optional[str] = None
+    content: Optional[str] = None
     model_id: Optional[UUID] = None
-    created_at: datetime
-    tokens_used: int = 0
+    created_at: Optional[datetime] = None
+    tokens_used: Optional[int] = None
+    # Heavy fields, only returned with include=
+    images: Optional[List[str]] = None  # List of sha256:<digest> image references
+    thinking: Optional[str] = None
+    tool_calls: Optional[List[Dict[str, Any]]] = None
     extended_metadata: Optional[Dict[str, Any]] = None
 
     class Config:
         from_attributes = True
 
 
+class ChatStatsSchema(BaseModel):
+    """Message totals and the latest message of a chat"""
+
+    message_count: int = 0
+    total_tokens: int = 0
+    last_message_preview: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ChatSchema(BaseModel):
     id: UUID
     user_id: UUID
@@ -27,6 +45,7 @@ class ChatSchema(BaseModel):
     is_archived: bool
     created_at: datetime
     updated_at: datetime
+    stats: Optional[ChatStatsSchema] = None
 
     class Config:
         from_attributes = True
@@ -46,11 +65,66 @@ class ChatResponse(BaseModel):
         from_attributes = True
 
 
+class ChatSummaryResponse(BaseModel):
+    """Response schema for the rolling summary of a chat"""
+
+    chat_id: UUID
+    content: str
+    model: str
+    covered_messages: int
+    covered_tokens: int
+    summary_tokens: int
+    prompt_tokens_saved: int
+    turns_compacted: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class ChatListResponse(BaseModel):
-    total: int
+    total: Optional[int] = None
     chats: List[ChatSchema]
     skip: int
     limit: int
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as cursor= to fetch the next page"
+    )
+
+
+class MessageSearchResult(BaseModel):
+    message_id: UUID
+    chat_id: UUID
+    chat_title: Optional[str] = None
+    role: str
+    created_at: datetime
+    snippet: str = Field(
+        ..., description="HTML escaped excerpt, matches wrapped in <mark> tags"
+    )
+    score: float
+
+
+class MessageSearchResponse(BaseModel):
+    results: List[MessageSearchResult]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as cursor= to fetch the next page"
+    )
+
+
+class SyncResponse(BaseModel):
+    """Chats and messages changed since a sync cursor"""
+
+    cursor: int = Field(..., description="Pass as since= to fetch later changes")
+    reset: bool = Field(
+        False,
+        description="The cursor is unknown or too old: reload all chats, "
+        "then sync from the returned cursor",
+    )
+    has_more: bool = False
+    chats: List[ChatSchema] = []
+    messages: List[MessageSchema] = []
+    deleted_chat_ids: List[UUID] = []
+    deleted_message_ids: List[UUID] = []
 
 
 class ChatCreateSchema(BaseModel):
@@ -68,7 +142,7 @@ class MessageCreateSchema(BaseModel):
     )
     content: str = Field(..., description="Content of the message")
     images: Optional[List[str]] = Field(
-        None, description="List of base64 encoded images"
+        None, description="List of base64 encoded images or sha256: image references"
     )
 
 
@@ -79,13 +153,74 @@ class MessageUpdateSchema(BaseModel):
         None, min_length=1, description="Updated content of the message"
     )
     images: Optional[List[str]] = Field(
-        None, description="Updated list of base64 encoded images"
+        None,
+        description="Updated list of base64 encoded images or sha256: image references",
     )
     extended_metadata: Optional[Dict[str, Any]] = Field(
         None, description="Updated metadata"
     )
 
 
+class ChatDeleteResponse(BaseModel):
+    """Response schema for chat deletion"""
+
+    success: bool
+    message: str
+    deleted_chats: int
+    deleted_messages: int
+    purge_job_id: Optional[UUID] = Field(
+        None, description="Background purge job, for very large deletions"
+    )
+
+
+class ChatPurgeJobResponse(BaseModel):
+    """Progress of a background chat purge"""
+
+    id: UUID
+    status: Literal["pending", "running", "done", "failed"]
+    total_messages: int
+    deleted_messages: int
+    deleted_chats: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ImportedChat(BaseModel):
+    """Chat line of an NDJSON chat export"""
+
+    id: UUID = Field(..., description="ID in the export, messages refer to it")
+    title: str = Field("New Chat", max_length=255)
+    is_archived: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ImportedMessage(BaseModel):
+    """Message line of an NDJSON chat export"""
+
+    chat_id: UUID = Field(..., description="ID of a chat earlier in the export")
+    role: Literal["user", "assistant", "system", "tool"]
+    content: str
+    created_at: Optional[datetime] = None
+    tokens_used: int = 0
+    images: Optional[List[str]] = None
+    thinking: Optional[str] = None
+    tool_calls: Optional[List[Dict[str, Any]]] = None
+    extended_metadata: Optional[Dict[str, Any]] = None
+
+
+class ChatImportResponse(BaseModel):
+    """Response schema for chat imports"""
+
+    success: bool
+    imported_chats: int
+    imported_messages: int
+
+
 class MessageDeleteResponse(BaseModel):
     """Response schema for message deletion"""
 
@@ -118,7 +253,7 @@ class MessageResponse(BaseModel):
     chat_id: UUID
     role: str
     content: str
-    images: Optional[List[str]] = None  # List of base64 encoded images
+    images: Optional[List[str]] = None  # List of sha256:<digest> image references
     model_id: Optional[UUID] = None
     created_at: datetime
     tokens_used: int = 0
@@ -131,6 +266,26 @@ class MessageResponse(BaseModel):
 class ChatMessagesResponse(BaseModel):
     chat: ChatSchema
     messages: List[MessageSchema]
+    next_cursor: Optional[str] = Field(
+        None, description="Pass as before= to fetch the previous page"
+    )
+    has_more: bool = False
+
+
+class MessageImagesResponse(BaseModel):
+    """Response schema for the images of a message"""
+
+    message_id: UUID
+    images: List[str] = Field(
+        default_factory=list, description="sha256: image references"
+    )
+
+
+class MessageThinkingResponse(BaseModel):
+    """Response schema for the thinking process of a message"""
+
+    message_id: UUID
+    thinking: Optional[str] = None
 
 
 class ModelResponse(BaseModel):
@@ -183,6 +338,9 @@ class ChatMessage(BaseModel):
     )
     images: Optional[List[str]] = Field(
         None,
-        description="List of base64 encoded images for multimodal models",
+        description=(
+            "List of base64 encoded images or sha256: image references "
+            "for multimodal models"
+        ),
         examples=[],
     )
@@ -0,0 +1,12 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ImageUploadResponse(BaseModel):
+    ref: str = Field(..., description="sha256: reference to use in message images")
+    size: int = Field(..., description="Stored size in bytes")
+    original_size: int = Field(..., description="Uploaded size in bytes")
+    content_type: str
+    width: Optional[int] = None
+    height: Optional[int] = None
@@ -0,0 +1,194 @@
+"""
+Per-user change log of chats and messages for delta sync.
+
+Every write to a chat or message appends entries to ``sync_changes`` in the
+same transaction. Entries are numbered by a per-user sequence kept in
+``user_sync_state``: bumping it locks the user's row until commit, so the
+numbers become visible in order and a client that has read up to N can never
+miss a change numbered below N.
+
+Entries only say what changed; GET /sync reads the current rows. Deletions
+stay in the log as tombstones until they are pruned after
+``SYNC_RETENTION_DAYS``, clients further behind must reload everything.
+
+The same calls queue a chat-list event per touched chat for
+``GET /chats/events``, carrying the cursor to sync up to.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+from src.core.events import queue_event
+from src.database import dialect_insert
+from src.models.sync import SyncChange, UserSyncState
+
+SYNC_RETENTION_DAYS = int(os.getenv("SYNC_RETENTION_DAYS", "30"))
+# Change log entries read per sync request
+SYNC_PAGE_SIZE = 500
+
+# (entity, entity_id, chat_id, op)
+Change = Tuple[str, UUID, UUID, str]
+
+
+def _allocate(db: Session, user_id: UUID, count: int) -> int:
+    """Reserve count sequence numbers for a user and return the last one."""
+    statement = (
+        update(UserSyncState)
+        .where(UserSyncState.user_id == user_id)
+        .values(last_seq=UserSyncState.last_seq + count)
+    )
+    for _ in range(2):
+        if db.get_bind().dialect.update_returning:
+            last_seq = db.execute(
+                statement.returning(UserSyncState.last_seq)
+            ).scalar()
+        elif db.execute(statement).rowcount:
+            last_seq = (
+                db.query(UserSyncState.last_seq)
+                .filter(UserSyncState.user_id == user_id)
+                .scalar()
+            )
+        else:
+            last_seq = None
+        if last_seq is not None:
+            return last_seq
+
+        db.execute(
+            dialect_insert(db, UserSyncState)
+            .values(user_id=user_id, last_seq=0)
+            .on_conflict_do_nothing(index_elements=["user_id"])
+        )
+    raise RuntimeError(f"Could not allocate sync sequence for user {user_id}")
+
+
+def _queue_chat_event(
+    db: Session,
+    user_id: Optional[UUID],
+    event: str,
+    chat_id: UUID,
+    cursor: Optional[int],
+    title: Optional[str] = None,
+) -> None:
+    payload = {"type": event, "chat_id": str(chat_id), "cursor": cursor}
+    if title is not None:
+        payload["title"] = title
+    queue_event(db, user_id, payload)
+
+
+class ChangeLogService:
+    """Service class for recording chat and message changes"""
+
+    @staticmethod
+    def record(
+        db: Session, user_id: Optional[UUID], changes: List[Change]
+    ) -> Optional[int]:
+        """
+        Append changes to a user's log, without committing.
+
+        Returns:
+            Sequence number of the last change, None if nothing was recorded
+        """
+        if not changes or user_id is None:
+            return None
+
+        last_seq = _allocate(db, user_id, len(changes))
+        first_seq = last_seq - len(changes) + 1
+        db.execute(
+            insert(SyncChange),
+            [
+                {
+                    "user_id": user_id,
+                    "seq": first_seq + i,
+                    "entity": entity,
+                    "entity_id": entity_id,
+                    "chat_id": chat_id,
+                    "op": op,
+                    "created_at": datetime.now(),
+                }
+                for i, (entity, entity_id, chat_id, op) in enumerate(changes)
+            ],
+        )
+        return last_seq
+
+    @staticmethod
+    def chat_changed(
+        db: Session,
+        user_id: Optional[UUID],
+        chat_id: UUID,
+        event: str = "chat.updated",
+        title: Optional[str] = None,
+    ) -> None:
+        """
+        Record that a chat was created or updated.
+
+        Args:
+            event: chat.created, chat.updated or chat.title
+            title: New title, sent with the event
+        """
+        cursor = ChangeLogService.record(
+            db, user_id, [("chat", chat_id, chat_id, "upsert")]
+        )
+        _queue_chat_event(db, user_id, event, chat_id, cursor, title)
+
+    @staticmethod
+    def chats_deleted(
+        db: Session, user_id: Optional[UUID], chat_ids: Iterable[UUID]
+    ) -> None:
+        """Record deleted chats; their messages are implied."""
+        chat_ids = list(chat_ids)
+        cursor = ChangeLogService.record(
+            db, user_id, [("chat", chat_id, chat_id, "delete") for chat_id in chat_ids]
+        )
+        for chat_id in chat_ids:
+            _queue_chat_event(db, user_id, "chat.deleted", chat_id, cursor)
+
+    @staticmethod
+    def messages_changed(
+        db: Session,
+        user_id: Optional[UUID],
+        chat_id: UUID,
+        upserted: Iterable[UUID] = (),
+        deleted: Iterable[UUID] = (),
+        title: Optional[str] = None,
+    ) -> None:
+        """
+        Record created, updated or deleted messages and the chat they touched.
+
+        A title sends chat.title instead of chat.updated, for chats named
+        after their first turn.
+        """
+        changes = [("message", id_, chat_id, "upsert") for id_ in upserted]
+        changes += [("message", id_, chat_id, "delete") for id_ in deleted]
+        changes.append(("chat", chat_id, chat_id, "upsert"))
+        cursor = ChangeLogService.record(db, user_id, changes)
+        event = "chat.title" if title is not None else "chat.updated"
+        _queue_chat_event(db, user_id, event, chat_id, cursor, title)
+
+    @staticmethod
+    def last_seq(db: Session, user_id: UUID) -> int:
+        """The newest sequence number of a user, 0 before the first change."""
+        return (
+            db.query(UserSyncState.last_seq)
+            .filter(UserSyncState.user_id == user_id)
+            .scalar()
+            or 0
+        )
+
+    @staticmethod
+    def prune(db: Session, older_than: Optional[timedelta] = None) -> int:
+        """
+        Delete log entries older than the retention period and commit.
+
+        Returns:
+            Number of deleted entries
+        """
+        cutoff = datetime.now() - (older_than or timedelta(days=SYNC_RETENTION_DAYS))
+        deleted = db.execute(
+            delete(SyncChange).where(SyncChange.created_at < cutoff)
+        ).rowcount
+        db.commit()
+        return deleted
@@ -4,19 +4,194 @@ Separates business logic from the router layer.
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
 from uuid import UUID
 
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import Session, joinedload
 from src.core.logger import app_logger
-from src.models.chat_models import Chat, Message, Model, ModelProvider
+from src.core.pagination import decode_cursor, encode_cursor
+from src.database import dialect_insert
+from src.models.chat_models import (
+    Chat,
+    ChatStats,
+    ChatSummary,
+    Message,
+    Model,
+    ModelProvider,
+    UserChatStats,
+)
+from src.models.sync import SyncChange
 from src.models.user import User
 from src.schemas import chat as chat_schemas
+from src.services.change_log import SYNC_PAGE_SIZE, ChangeLogService
+from src.services.chat_purge import (
+    CHAT_DELETE_SYNC_LIMIT,
+    ChatPurgeService,
+    delete_chat_rows,
+    delete_message_rows,
+    delete_messages,
+)
+from src.services.chat_stats import ChatStatsService
+from src.services.embeddings import EmbeddingService
+from src.services.images import ImageService
+
+# Message columns returned when a client does not ask for specific fields
+MESSAGE_FIELDS = (
+    "id",
+    "chat_id",
+    "role",
+    "content",
+    "model_id",
+    "created_at",
+    "tokens_used",
+)
+# Deferred columns, only loaded when requested with include= or fields=
+HEAVY_MESSAGE_FIELDS = ("images", "thinking", "tool_calls", "extended_metadata")
+
+
+def select_message_fields(
+    fields: Optional[str] = None, include: Optional[str] = None
+) -> List[str]:
+    """
+    Resolve sparse fieldset parameters to message column names.
+
+    Args:
+        fields: Comma separated fields to return instead of MESSAGE_FIELDS
+        include: Comma separated heavy fields to add
+
+    Returns:
+        Column names, always starting with "id"
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    selected = ["id"]
+    requested = [f.strip() for f in fields.split(",")] if fields else MESSAGE_FIELDS
+    extra = [f.strip() for f in include.split(",")] if include else []
+
+    for name in [*requested, *extra]:
+        if not name or name in selected:
+            continue
+        if name not in MESSAGE_FIELDS and name not in HEAVY_MESSAGE_FIELDS:
+            raise ValueError(f"Unknown message field '{name}'")
+        selected.append(name)
+    return selected
+
+
+def _message_columns(fields: Sequence[str]) -> List[Any]:
+    return [getattr(Message, name) for name in fields]
+
+
+# Fields of the chat DTOs returned by list endpoints, shaped like ChatSchema
+CHAT_FIELDS = ("id", "user_id", "title", "is_archived", "created_at", "updated_at")
+CHAT_STATS_FIELDS = (
+    "message_count",
+    "total_tokens",
+    "last_message_preview",
+    "last_message_role",
+    "last_message_at",
+)
+
+
+def _chat_columns() -> List[Any]:
+    """Chat columns followed by its stats, to select with an outer join."""
+    return [
+        *(getattr(Chat, name) for name in CHAT_FIELDS),
+        ChatStats.chat_id.label("stats_chat_id"),
+        *(
+            getattr(ChatStats, name).label(f"stats_{name}")
+            for name in CHAT_STATS_FIELDS
+        ),
+    ]
+
+
+def _chat_dict(row: Any, stats: Optional[ChatStats] = None) -> Dict:
+    """
+    Chat DTO of a row of _chat_columns.
+
+    Plain dicts of column values skip the identity map and attribute
+    instrumentation of ORM objects, which dominate the cost of long lists.
+    """
+    mapping = row._mapping
+    chat = {name: mapping[name] for name in CHAT_FIELDS}
+    if stats is not None:
+        chat["stats"] = {name: getattr(stats, name) for name in CHAT_STATS_FIELDS}
+    elif mapping["stats_chat_id"] is None:
+        chat["stats"] = None
+    else:
+        chat["stats"] = {name: mapping[f"stats_{name}"] for name in CHAT_STATS_FIELDS}
+    return chat
+
+
+def title_filter(text: str) -> Any:
+    """Case insensitive substring match on Chat.title, wildcards escaped."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return Chat.title.ilike(f"%{escaped}%", escape="\\")
 
 
 class ChatService:
     """Service class for chat operations"""
 
+    @staticmethod
+    def count_user_chats(db: Session, user_id: UUID) -> UserChatStats:
+        """
+        Count a user's chats and store the result in user_chat_stats.
+
+        Args:
+            db: Database session
+            user_id: UUID of the user
+
+        Returns:
+            The refreshed UserChatStats row
+        """
+        chat_count, archived_count = (
+            db.query(
+                func.count(Chat.id),
+                func.coalesce(
+                    func.sum(case((Chat.is_archived.is_(True), 1), else_=0)), 0
+                ),
+            )
+            .filter(Chat.user_id == user_id)
+            .one()
+        )
+        counts = {"chat_count": chat_count, "archived_count": archived_count}
+        db.execute(
+            dialect_insert(db, UserChatStats)
+            .values(user_id=user_id, updated_at=datetime.now(), **counts)
+            .on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={**counts, "updated_at": datetime.now()},
+            )
+        )
+        return db.get(UserChatStats, user_id, populate_existing=True)
+
+    @staticmethod
+    def _adjust_chat_stats(
+        db: Session, user_id: UUID, chats: int = 0, archived: int = 0
+    ) -> None:
+        """
+        Apply a change to the user's chat counts, without committing.
+
+        Call after the chat changes are added to the session, so that a
+        missing stats row is created from an up to date count.
+        """
+        updated = (
+            db.query(UserChatStats)
+            .filter(UserChatStats.user_id == user_id)
+            .update(
+                {
+                    UserChatStats.chat_count: UserChatStats.chat_count + chats,
+                    UserChatStats.archived_count: UserChatStats.archived_count
+                    + archived,
+                },
+                synchronize_session=False,
+            )
+        )
+        if not updated:
+            db.flush()
+            ChatService.count_user_chats(db, user_id)
+
     @staticmethod
     def get_user_chats(
         db: Session,
@@ -24,31 +199,224 @@ class ChatService:
         skip: int = 0,
         limit: int = 20,
         include_archived: bool = False,
+        cursor: Optional[str] = None,
+        total: Literal["estimated", "exact", "none"] = "estimated",
+        title_contains: Optional[str] = None,
     ) -> Dict:
         """
-        Get all chats for a user with pagination.
+        Get the chats of a user, most recently active first.
+
+        Pages are keyed on (updated_at, id): pass the returned next_cursor as
+        ``cursor`` to get the next page without scanning the skipped rows.
+        ``skip`` is still honoured when no cursor is given.
+
+        The total comes from the per-user counters in user_chat_stats
+        ("estimated"), from a COUNT query that also refreshes those counters
+        ("exact"), or is left out ("none"). With ``title_contains``, the total
+        counts the matching chats.
 
         Args:
             db: Database session
             user: User object
-            skip: Number of chats to skip for pagination
+            skip: Number of chats to skip, ignored when a cursor is given
             limit: Maximum number of chats to return
             include_archived: Whether to include archived chats
+            cursor: Cursor returned with the previous page
+            total: How to compute the total number of chats
+            title_contains: Only chats whose title contains this, ignoring case
 
         Returns:
-            Dictionary with total count, chats list, skip and limit
+            Dictionary with total count, chats as dictionaries, skip, limit
+            and next_cursor
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
         """
-        query = db.query(Chat).filter(Chat.user_id == user.id)
+        query = (
+            db.query(*_chat_columns())
+            .outerjoin(ChatStats, ChatStats.chat_id == Chat.id)
+            .filter(Chat.user_id == user.id)
+        )
 
         if not include_archived:
             query = query.filter(Chat.is_archived.is_(False))
 
-        total = query.count()
-        app_logger.debug(f"Found {total} chats for user {user.id}")
+        if title_contains:
+            # Served by the trigram index on Postgres, see migration 0004
+            query = query.filter(title_filter(title_contains))
+        filtered = query
 
-        chats = query.order_by(Chat.updated_at.desc()).offset(skip).limit(limit).all()
+        if cursor:
+            updated_at, chat_id = decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Chat.updated_at, Chat.id) < (updated_at, chat_id)
+            )
+            skip = 0
 
-        return {"total": total, "chats": chats, "skip": skip, "limit": limit}
+        rows = (
+            query.order_by(Chat.updated_at.desc(), Chat.id.desc())
+            .offset(skip)
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id)
+
+        # Chats created before chat_stats existed get their row once
+        refreshed = {
+            row.id: ChatStatsService.refresh(db, row.id)
+            for row in rows
+            if row.stats_chat_id is None
+        }
+        chats = [_chat_dict(row, refreshed.get(row.id)) for row in rows]
+        if refreshed:
+            db.commit()
+
+        chat_total = None
+        if title_contains and total != "none":
+            chat_total = (
+                filtered.with_entities(func.count(Chat.id)).order_by(None).scalar()
+            )
+        elif total != "none":
+            stats = None
+            if total == "estimated":
+                stats = db.get(UserChatStats, user.id)
+            if stats is None:
+                stats = ChatService.count_user_chats(db, user.id)
+                db.commit()
+            chat_total = stats.chat_count
+            if not include_archived:
+                chat_total -= stats.archived_count
+            chat_total = max(chat_total, 0)
+            app_logger.debug(f"Found {chat_total} chats for user {user.id}")
+
+        return {
+            "total": chat_total,
+            "chats": chats,
+            "skip": skip,
+            "limit": limit,
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def get_changes(
+        db: Session,
+        user: User,
+        since: Optional[int] = None,
+        limit: int = SYNC_PAGE_SIZE,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict:
+        """
+        Chats and messages changed after a sync cursor.
+
+        Without ``since``, or when the changes after it were already pruned,
+        the result only has ``reset`` and the current cursor: the client
+        reloads its cache from the regular endpoints and syncs from there.
+
+        Args:
+            db: Database session
+            user: User object
+            since: Cursor returned by the previous sync
+            limit: Maximum number of change log entries to read
+            fields: Message columns to return, see select_message_fields
+
+        Returns:
+            Dictionary with the changed chats and messages, the IDs of deleted
+            ones, the next cursor and whether more changes are pending
+        """
+        result = {
+            "cursor": since,
+            "reset": False,
+            "has_more": False,
+            "chats": [],
+            "messages": [],
+            "deleted_chat_ids": [],
+            "deleted_message_ids": [],
+        }
+        last_seq = ChangeLogService.last_seq(db, user.id)
+        oldest = (
+            db.query(func.min(SyncChange.seq))
+            .filter(SyncChange.user_id == user.id)
+            .scalar()
+        )
+        first_available = last_seq + 1 if oldest is None else oldest
+        if since is None or since > last_seq or since + 1 < first_available:
+            return {**result, "cursor": last_seq, "reset": True}
+
+        entries = (
+            db.query(SyncChange)
+            .filter(SyncChange.user_id == user.id, SyncChange.seq > since)
+            .order_by(SyncChange.seq)
+            .limit(limit + 1)
+            .all()
+        )
+        if len(entries) > limit:
+            entries = entries[:limit]
+            result["has_more"] = True
+        if not entries:
+            return result
+        result["cursor"] = entries[-1].seq
+
+        # The latest entry of an entity wins
+        latest = {(entry.entity, entry.entity_id): entry for entry in entries}
+        deleted_chats = {
+            entity_id
+            for (entity, entity_id), entry in latest.items()
+            if entity == "chat" and entry.op == "delete"
+        }
+        chat_ids = {
+            entity_id
+            for (entity, entity_id), entry in latest.items()
+            if entity == "chat" and entry.op == "upsert"
+        }
+        message_ids = {
+            entity_id
+            for (entity, entity_id), entry in latest.items()
+            if entity == "message"
+            and entry.op == "upsert"
+            and entry.chat_id not in deleted_chats
+        }
+        deleted_messages = {
+            entity_id
+            for (entity, entity_id), entry in latest.items()
+            if entity == "message"
+            and entry.op == "delete"
+            and entry.chat_id not in deleted_chats
+        }
+
+        chats = []
+        if chat_ids:
+            chats = (
+                db.query(Chat)
+                .options(joinedload(Chat.stats))
+                .filter(Chat.id.in_(chat_ids), Chat.user_id == user.id)
+                .order_by(Chat.updated_at.desc(), Chat.id.desc())
+                .all()
+            )
+        messages = []
+        if message_ids:
+            columns = _message_columns(fields or select_message_fields())
+            messages = [
+                row._asdict()
+                for row in db.query(*columns)
+                .join(Chat, Chat.id == Message.chat_id)
+                .filter(Message.id.in_(message_ids), Chat.user_id == user.id)
+                .order_by(Message.created_at, Message.id)
+            ]
+
+        # Rows gone since the entry was written are reported as deleted
+        deleted_chats |= chat_ids - {chat.id for chat in chats}
+        deleted_messages |= message_ids - {message["id"] for message in messages}
+
+        return {
+            **result,
+            "chats": chats,
+            "messages": messages,
+            "deleted_chat_ids": sorted(deleted_chats),
+            "deleted_message_ids": sorted(deleted_messages),
+        }
 
     @staticmethod
     def create_chat(
@@ -71,72 +439,209 @@ class ChatService:
 
         app_logger.info(f"Creating new chat with title '{title}' for user {user.id}")
 
-        chat = Chat(user_id=user.id, title=title)
+        chat = Chat(user_id=user.id, title=title, stats=ChatStats())
         db.add(chat)
+        db.flush()
+        ChatService._adjust_chat_stats(db, user.id, chats=1)
+        ChangeLogService.chat_changed(
+            db, user.id, chat.id, event="chat.created", title=chat.title
+        )
         db.commit()
         db.refresh(chat)
 
         app_logger.debug(f"Created chat with ID: {chat.id}")
         return chat
 
+    @staticmethod
+    def _count_messages(db: Session, chat_rows: Sequence[Any]) -> int:
+        """Sum message counts of (chat_id, message_count) rows from chat_stats."""
+        total = sum(count or 0 for _, count in chat_rows)
+        missing = [chat_id for chat_id, count in chat_rows if count is None]
+        if missing:
+            total += (
+                db.query(func.count(Message.id))
+                .filter(Message.chat_id.in_(missing))
+                .scalar()
+            )
+        return total
+
     @staticmethod
     def delete_all_user_chats(db: Session, user: User) -> Dict:
         """
         Delete all chats for a user.
 
+        Messages are deleted with a single statement. When the user has more
+        than CHAT_DELETE_SYNC_LIMIT messages, the chats are handed to a
+        background purge job instead, see ChatPurgeService.
+
         Args:
             db: Database session
             user: User object
 
         Returns:
-            Success confirmation dictionary
+            Dictionary with deleted chat and message counts, or the purge
+            job ID when the deletion continues in the background
         """
         app_logger.info(f"Deleting all chats for user {user.id}")
 
-        # Delete all messages first (due to foreign key constraints)
-        db.query(Message).filter(Message.chat.has(user_id=user.id)).delete()
-        # Delete all chats
-        db.query(Chat).filter(Chat.user_id == user.id).delete()
+        chat_rows = (
+            db.query(Chat.id, ChatStats.message_count)
+            .outerjoin(ChatStats, ChatStats.chat_id == Chat.id)
+            .filter(Chat.user_id == user.id)
+            .all()
+        )
+        total_messages = ChatService._count_messages(db, chat_rows)
+
+        chat_ids = [chat_id for chat_id, _ in chat_rows]
+        ChangeLogService.chats_deleted(db, user.id, chat_ids)
+
+        if total_messages > CHAT_DELETE_SYNC_LIMIT:
+            job = ChatPurgeService.start(db, user.id, chat_ids, total_messages)
+            ChatService.count_user_chats(db, user.id)
+            db.commit()
+            return {
+                "success": True,
+                "message": "Chats are being deleted",
+                "deleted_chats": 0,
+                "deleted_messages": 0,
+                "purge_job_id": job.id,
+            }
+
+        user_chats = select(Chat.id).where(Chat.user_id == user.id)
+        deleted_messages, images = delete_messages(db, Message.chat_id.in_(user_chats))
+        # Release image references of the deleted messages
+        ImageService.release_images(db, images)
+        deleted_chats = delete_chat_rows(db, user_chats)
+        ChatService.count_user_chats(db, user.id)
         db.commit()
 
-        app_logger.info(f"Deleted all chats for user {user.id}")
-        return {"success": True, "message": "All chats deleted"}
+        app_logger.info(
+            f"Deleted {deleted_chats} chats and {deleted_messages} messages "
+            f"for user {user.id}"
+        )
+        return {
+            "success": True,
+            "message": "All chats deleted",
+            "deleted_chats": deleted_chats,
+            "deleted_messages": deleted_messages,
+            "purge_job_id": None,
+        }
 
     @staticmethod
-    def get_chat_with_messages(db: Session, user: User, chat_id: UUID) -> Dict:
+    def get_chat_with_messages(
+        db: Session,
+        user: User,
+        chat_id: UUID,
+        fields: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Dict:
         """
-        Get a specific chat with all its messages.
+        Get a specific chat with its messages.
+
+        Only the requested message columns are selected, so heavy columns
+        such as images and thinking are not read unless asked for.
+
+        Without a limit the whole history is returned. With a limit, the
+        newest messages come first and older pages are fetched by passing
+        the returned next_cursor as ``before``. Pages are keyed on
+        (created_at, id), so each one is a range scan of the
+        ``ix_messages_chat_created_id`` index. Messages within a page are
+        in chronological order.
 
         Args:
             db: Database session
             user: User object
             chat_id: UUID of the chat to retrieve
+            fields: Message columns to return, see select_message_fields
+            limit: Maximum number of messages per page
+            before: Cursor of the oldest message of the previous page
 
         Returns:
-            Dictionary with chat and messages
+            Dictionary with the chat and messages as dictionaries,
+            next_cursor and has_more
 
         Raises:
             ValueError: If chat not found or not owned by user
+            InvalidCursorError: If the cursor is malformed
         """
         app_logger.debug(f"Getting chat {chat_id} for user: {user.id}")
 
-        chat = (
-            db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).first()
+        row = (
+            db.query(*_chat_columns())
+            .outerjoin(ChatStats, ChatStats.chat_id == Chat.id)
+            .filter(Chat.id == chat_id, Chat.user_id == user.id)
+            .first()
         )
 
-        if not chat:
+        if not row:
             app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
             raise ValueError("Chat not found")
 
-        messages = (
-            db.query(Message)
-            .filter(Message.chat_id == chat_id)
-            .order_by(Message.created_at)
-            .all()
+        fields = list(fields or select_message_fields())
+        # The sort key is needed to build the next cursor
+        columns = fields if "created_at" in fields else [*fields, "created_at"]
+        query = db.query(*_message_columns(columns)).filter(
+            Message.chat_id == chat_id
         )
 
+        next_cursor = None
+        if limit is None:
+            rows = query.order_by(Message.created_at, Message.id).all()
+        else:
+            if before:
+                created_at, message_id = decode_cursor(before)
+                query = query.filter(
+                    tuple_(Message.created_at, Message.id) < (created_at, message_id)
+                )
+            rows = (
+                query.order_by(Message.created_at.desc(), Message.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+            rows.reverse()
+
+        messages = [{name: row._mapping[name] for name in fields} for row in rows]
+
         app_logger.debug(f"Found {len(messages)} messages for chat {chat_id}")
-        return {"chat": chat, "messages": messages}
+        return {
+            "chat": _chat_dict(row),
+            "messages": messages,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        }
+
+    @staticmethod
+    def get_chat_summary(db: Session, user: User, chat_id: UUID) -> ChatSummary:
+        """
+        Get the rolling summary of a chat and its prompt savings.
+
+        Args:
+            db: Database session
+            user: User object
+            chat_id: UUID of the chat
+
+        Returns:
+            ChatSummary object
+
+        Raises:
+            ValueError: If chat not found, not owned by user or not summarized
+        """
+        summary = (
+            db.query(ChatSummary)
+            .join(Chat, Chat.id == ChatSummary.chat_id)
+            .filter(ChatSummary.chat_id == chat_id, Chat.user_id == user.id)
+            .first()
+        )
+
+        if not summary:
+            app_logger.debug(f"No summary for chat {chat_id} of user {user.id}")
+            raise ValueError("Chat summary not found")
+
+        return summary
 
     @staticmethod
     def update_chat(
@@ -176,10 +681,22 @@ class ChatService:
             updates["title"] = chat_update.title
 
         if chat_update.is_archived is not None:
+            was_archived = bool(chat.is_archived)
             setattr(chat, "is_archived", chat_update.is_archived)
             updates["is_archived"] = chat_update.is_archived
+            if was_archived != chat_update.is_archived:
+                ChatService._adjust_chat_stats(
+                    db, user.id, archived=1 if chat_update.is_archived else -1
+                )
 
         app_logger.debug(f"Updating chat {chat_id} with data: {updates}")
+        ChangeLogService.chat_changed(
+            db,
+            user.id,
+            chat_id,
+            event="chat.title" if "title" in updates else "chat.updated",
+            title=updates.get("title"),
+        )
         db.commit()
         db.refresh(chat)
         app_logger.info(f"Updated chat {chat_id} for user {user.id}")
@@ -191,13 +708,17 @@ class ChatService:
         """
         Delete a chat and all its messages.
 
+        Messages are deleted with a single statement, or by a background
+        purge job when there are more than CHAT_DELETE_SYNC_LIMIT of them.
+
         Args:
             db: Database session
             user: User object
             chat_id: UUID of the chat to delete
 
         Returns:
-            Success confirmation dictionary
+            Dictionary with deleted chat and message counts, or the purge
+            job ID when the deletion continues in the background
 
         Raises:
             ValueError: If chat not found or not owned by user
@@ -205,23 +726,99 @@ class ChatService:
         app_logger.info(f"Deleting chat {chat_id} for user {user.id}")
 
         chat = (
-            db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).first()
+            db.query(Chat.is_archived, ChatStats.message_count)
+            .outerjoin(ChatStats, ChatStats.chat_id == Chat.id)
+            .filter(Chat.id == chat_id, Chat.user_id == user.id)
+            .first()
         )
 
         if not chat:
             app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
             raise ValueError("Chat not found")
 
-        # Delete all messages first (can use cascade but being explicit)
-        message_count = db.query(Message).filter(Message.chat_id == chat_id).count()
-        app_logger.debug(f"Deleting {message_count} messages for chat {chat_id}")
+        was_archived, message_count = chat
+        message_count = ChatService._count_messages(db, [(chat_id, message_count)])
+
+        if message_count > CHAT_DELETE_SYNC_LIMIT:
+            job = ChatPurgeService.start(db, user.id, [chat_id], message_count)
+            deleted_messages = deleted_chats = 0
+        else:
+            job = None
+            deleted_messages, images = delete_messages(db, Message.chat_id == chat_id)
+            ImageService.release_images(db, images)
+            deleted_chats = delete_chat_rows(db, [chat_id])
 
-        db.query(Message).filter(Message.chat_id == chat_id).delete()
-        db.delete(chat)
+        ChatService._adjust_chat_stats(
+            db, user.id, chats=-1, archived=-1 if was_archived else 0
+        )
+        ChangeLogService.chats_deleted(db, user.id, [chat_id])
         db.commit()
 
-        app_logger.info(f"Deleted chat {chat_id} with {message_count} messages")
-        return {"success": True, "message": "Chat and all messages deleted"}
+        if job:
+            return {
+                "success": True,
+                "message": "Chat is being deleted",
+                "deleted_chats": 0,
+                "deleted_messages": 0,
+                "purge_job_id": job.id,
+            }
+
+        app_logger.info(f"Deleted chat {chat_id} with {deleted_messages} messages")
+        return {
+            "success": True,
+            "message": "Chat and all messages deleted",
+            "deleted_chats": deleted_chats,
+            "deleted_messages": deleted_messages,
+            "purge_job_id": None,
+        }
+
+    @staticmethod
+    def chat_list_version(db: Session, user: User) -> int:
+        """
+        Version stamp of a user's chat list, for ETags.
+
+        The user's change log sequence number moves with every write to
+        their chats and messages, including deletions.
+        """
+        return ChangeLogService.last_seq(db, user.id)
+
+    @staticmethod
+    def chat_version(db: Session, user: User, chat_id: UUID) -> Tuple:
+        """
+        Version stamp of a chat and its messages, for ETags.
+
+        Every message write also sets the chat's updated_at, so the chat row
+        alone tells whether anything changed.
+
+        Raises:
+            ValueError: If chat not found or not owned by user
+        """
+        stamp = (
+            db.query(Chat.updated_at, Chat.title, Chat.is_archived)
+            .filter(Chat.id == chat_id, Chat.user_id == user.id)
+            .first()
+        )
+        if stamp is None:
+            raise ValueError("Chat not found")
+        return tuple(stamp)
+
+    @staticmethod
+    def models_version(db: Session) -> Tuple:
+        """Version stamp of the models and providers, for ETags."""
+        models = db.query(
+            func.count(Model.id),
+            func.count(case((Model.is_active.is_(True), 1))),
+            func.max(Model.updated_at),
+        ).one()
+        # Providers have no updated_at; the table is small, read what is shown
+        providers = db.query(
+            ModelProvider.id,
+            ModelProvider.name,
+            ModelProvider.api_url,
+            ModelProvider.auth_type,
+            ModelProvider.is_active,
+        ).order_by(ModelProvider.id)
+        return (tuple(models), *map(tuple, providers))
 
     @staticmethod
     def get_available_models(db: Session) -> Dict:
@@ -245,9 +842,49 @@ class ChatService:
         return {"models": models, "providers": providers}
 
 
+def _owned_message(user: User, chat_id: UUID, message_id: UUID) -> List[Any]:
+    """Filters for a message of a chat owned by the user, joined to Chat."""
+    return [
+        Message.id == message_id,
+        Message.chat_id == chat_id,
+        Chat.user_id == user.id,
+    ]
+
+
 class MessageService:
     """Service class for message operations"""
 
+    @staticmethod
+    def _touch_chat(db: Session, user: User, chat_id: UUID) -> bool:
+        """
+        Set a chat's last activity to now, if the user owns it.
+
+        Returns:
+            Whether the chat exists and belongs to the user
+        """
+        updated = (
+            db.query(Chat)
+            .filter(Chat.id == chat_id, Chat.user_id == user.id)
+            .update({Chat.updated_at: datetime.now()}, synchronize_session=False)
+        )
+        return updated > 0
+
+    @staticmethod
+    def _not_found(
+        db: Session, user: User, chat_id: UUID, message_id: UUID
+    ) -> ValueError:
+        """Error for a failed message lookup, telling a missing chat apart."""
+        chat_exists = (
+            db.query(Chat.id)
+            .filter(Chat.id == chat_id, Chat.user_id == user.id)
+            .first()
+        )
+        if not chat_exists:
+            app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
+            return ValueError("Chat not found")
+        app_logger.warning(f"Message {message_id} not found in chat {chat_id}")
+        return ValueError("Message not found")
+
     @staticmethod
     def create_message(
         db: Session,
@@ -269,27 +906,26 @@ class MessageService:
 
         Raises:
             ValueError: If chat not found or not owned by user
+            InvalidImageError: If an image is invalid
         """
-        # Verify chat belongs to the user
-        chat = (
-            db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).first()
-        )
-
-        if not chat:
+        # Touching the chat's last activity doubles as the ownership check
+        if not MessageService._touch_chat(db, user, chat_id):
             raise ValueError("Chat not found")
 
-        # Create the message
+        # Create the message, keeping only references to its images
         db_message = Message(
             chat_id=chat_id,
             role=message.role,
             content=message.content,
-            images=message.images,
+            images=ImageService.store_images(db, user.id, message.images),
         )
 
-        # Update the chat's last activity timestamp
-        setattr(chat, "updated_at", datetime.now())
-
         db.add(db_message)
+        db.flush()
+        ChatStatsService.message_added(db, db_message)
+        ChangeLogService.messages_changed(
+            db, user.id, chat_id, upserted=[db_message.id]
+        )
         db.commit()
         db.refresh(db_message)
 
@@ -297,8 +933,12 @@ class MessageService:
 
     @staticmethod
     def get_message(
-        db: Session, user: User, chat_id: UUID, message_id: UUID
-    ) -> Message:
+        db: Session,
+        user: User,
+        chat_id: UUID,
+        message_id: UUID,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Dict:
         """
         Get a specific message from a chat.
 
@@ -307,9 +947,10 @@ class MessageService:
             user: User object
             chat_id: UUID of the chat
             message_id: UUID of the message
+            fields: Message columns to return, see select_message_fields
 
         Returns:
-            Message object
+            Dictionary with the requested message fields
 
         Raises:
             ValueError: If chat or message not found, or not owned by user
@@ -318,28 +959,19 @@ class MessageService:
             f"Getting message {message_id} from chat {chat_id} for user {user.id}"
         )
 
-        # Verify chat belongs to the user
-        chat = (
-            db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).first()
-        )
-
-        if not chat:
-            app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
-            raise ValueError("Chat not found")
-
-        # Get the message and verify it belongs to the chat
+        # Fetch the message and check ownership of its chat in one query
         message = (
-            db.query(Message)
-            .filter(Message.id == message_id, Message.chat_id == chat_id)
+            db.query(*_message_columns(fields or select_message_fields()))
+            .join(Chat, Chat.id == Message.chat_id)
+            .filter(*_owned_message(user, chat_id, message_id))
             .first()
         )
 
         if not message:
-            app_logger.warning(f"Message {message_id} not found in chat {chat_id}")
-            raise ValueError("Message not found")
+            raise MessageService._not_found(db, user, chat_id, message_id)
 
         app_logger.debug(f"Retrieved message {message_id} from chat {chat_id}")
-        return message
+        return message._asdict()
 
     @staticmethod
     def update_message(
@@ -365,30 +997,23 @@ class MessageService:
         Raises:
             ValueError: If chat or message not found, or not owned by user
             PermissionError: If trying to edit non-user message
+            InvalidImageError: If an image is invalid
         """
         app_logger.debug(
             f"Updating message {message_id} in chat {chat_id} for user {user.id}"
         )
 
-        # Verify chat belongs to the user
-        chat = (
-            db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).first()
-        )
-
-        if not chat:
-            app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
-            raise ValueError("Chat not found")
-
-        # Get the message and verify it belongs to the chat
-        message = (
-            db.query(Message)
-            .filter(Message.id == message_id, Message.chat_id == chat_id)
+        # Fetch the message together with its chat, checking ownership
+        row = (
+            db.query(Message, Chat)
+            .join(Chat, Chat.id == Message.chat_id)
+            .filter(*_owned_message(user, chat_id, message_id))
             .first()
         )
 
-        if not message:
-            app_logger.warning(f"Message {message_id} not found in chat {chat_id}")
-            raise ValueError("Message not found")
+        if not row:
+            raise MessageService._not_found(db, user, chat_id, message_id)
+        message, chat = row
 
         # Only allow editing user messages
         if message.role not in ["user"]:
@@ -402,10 +1027,16 @@ class MessageService:
         if message_update.content is not None:
             setattr(message, "content", message_update.content)
             updates["content"] = message_update.content
+            ChatStatsService.message_updated(db, message)
+            EmbeddingService.forget_message(db, message.id)
 
         if message_update.images is not None:
-            setattr(message, "images", message_update.images)
-            updates["images"] = message_update.images
+            new_images = ImageService.store_images(
+                db, user.id, message_update.images
+            )
+            ImageService.release_images(db, [message.images])
+            setattr(message, "images", new_images)
+            updates["images"] = new_images
 
         if message_update.extended_metadata is not None:
             setattr(message, "extended_metadata", message_update.extended_metadata)
@@ -413,6 +1044,7 @@ class MessageService:
 
         # Update the chat's last activity timestamp
         setattr(chat, "updated_at", datetime.now())
+        ChangeLogService.messages_changed(db, user.id, chat_id, upserted=[message_id])
 
         app_logger.debug(f"Updating message {message_id} with data: {updates}")
         db.commit()
@@ -446,34 +1078,30 @@ class MessageService:
             f"Deleting message {message_id} from chat {chat_id} for user {user.id}"
         )
 
-        # Verify chat belongs to the user
-        chat = (
-            db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user.id).first()
+        # Delete the message only if the user owns its chat, in one statement
+        owned_chat = select(Chat.id).where(Chat.id == chat_id, Chat.user_id == user.id)
+        deleted = delete_message_rows(
+            db,
+            (Message.id == message_id)
+            & (Message.chat_id == chat_id)
+            & Message.chat_id.in_(owned_chat),
+            Message.id,
+            Message.tokens_used,
+            Message.images,
         )
 
-        if not chat:
-            app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
-            raise ValueError("Chat not found")
+        if not deleted:
+            raise MessageService._not_found(db, user, chat_id, message_id)
+        deleted_id, deleted_tokens, images = deleted[0]
 
-        # Get the message and verify it belongs to the chat
-        message = (
-            db.query(Message)
-            .filter(Message.id == message_id, Message.chat_id == chat_id)
-            .first()
+        ImageService.release_images(db, [images])
+        ChatStatsService.messages_removed(
+            db, chat_id, [deleted_id], deleted_tokens or 0
         )
 
-        if not message:
-            app_logger.warning(f"Message {message_id} not found in chat {chat_id}")
-            raise ValueError("Message not found")
-
-        # Store message ID for response
-        deleted_id = message.id
-
-        # Delete the message
-        db.delete(message)
-
         # Update the chat's last activity timestamp
-        setattr(chat, "updated_at", datetime.now())
+        MessageService._touch_chat(db, user, chat_id)
+        ChangeLogService.messages_changed(db, user.id, chat_id, deleted=[deleted_id])
 
         db.commit()
         app_logger.info(f"Deleted message {deleted_id} from chat {chat_id}")
@@ -516,38 +1144,34 @@ class MessageService:
             app_logger.warning(f"Chat {chat_id} not found for user {user.id}")
             raise ValueError("Chat not found")
 
-        deleted_count = 0
-        failed_deletions = []
-
-        # Process each message ID
-        for message_id in message_ids:
-            try:
-                # Get the message and verify it belongs to the chat
-                message = (
-                    db.query(Message)
-                    .filter(Message.id == message_id, Message.chat_id == chat_id)
-                    .first()
-                )
-
-                if message:
-                    db.delete(message)
-                    deleted_count += 1
-                    app_logger.debug(f"Queued message {message_id} for deletion")
-                else:
-                    app_logger.warning(
-                        f"Message {message_id} not found in chat {chat_id}"
-                    )
-                    failed_deletions.append(message_id)
-
-            except Exception as e:
-                app_logger.error(f"Error deleting message {message_id}: {str(e)}")
-                failed_deletions.append(message_id)
+        # One statement for the whole batch; ids that matched nothing failed
+        requested = list(dict.fromkeys(message_ids))
+        deleted = delete_message_rows(
+            db,
+            (Message.chat_id == chat_id) & Message.id.in_(requested),
+            Message.id,
+            Message.tokens_used,
+            Message.images,
+        )
+        deleted_ids = {row.id for row in deleted}
+        deleted_count = len(deleted_ids)
+        failed_deletions = [i for i in requested if i not in deleted_ids]
 
         # Update the chat's last activity timestamp if any messages were deleted
         if deleted_count > 0:
+            ImageService.release_images(db, (row.images for row in deleted))
             setattr(chat, "updated_at", datetime.now())
+            db.flush()
+            ChatStatsService.messages_removed(
+                db,
+                chat_id,
+                deleted_ids,
+                sum(row.tokens_used or 0 for row in deleted),
+            )
+            ChangeLogService.messages_changed(
+                db, user.id, chat_id, deleted=sorted(deleted_ids)
+            )
 
-        # Commit all deletions at once
         db.commit()
 
         app_logger.info(
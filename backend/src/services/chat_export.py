@@ -0,0 +1,346 @@
+"""
+Streaming export and import of whole chats and accounts.
+
+Exports are generated while they are sent. Chats and messages are read with
+``yield_per`` (a server-side cursor on PostgreSQL) as plain rows, written as
+NDJSON lines or one JSON document, and handed to the response in chunks of
+about ``CHAT_EXPORT_CHUNK_BYTES``. A worker holds one batch of rows and one
+chunk at a time, however long the history is.
+
+NDJSON exports start with an ``export`` header line, followed by each chat
+line and then that chat's message lines. Imports read the same format line by
+line and insert messages in batches of ``CHAT_IMPORT_BATCH_SIZE`` rows, in one
+transaction so a failed import leaves nothing behind. The upload is spooled
+before that transaction starts, so a slow client does not hold its locks.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from src.core.ids import uuid7
+from src.core.logger import app_logger
+from src.core.responses import json_bytes
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+from src.schemas.chat import ImportedChat, ImportedMessage
+from src.services.change_log import ChangeLogService
+from src.services.chat import HEAVY_MESSAGE_FIELDS, MESSAGE_FIELDS, ChatService
+from src.services.chat_stats import ChatStatsService
+from src.services.images import ImageService, InvalidImageError
+
+CHAT_EXPORT_BATCH_SIZE = int(os.getenv("CHAT_EXPORT_BATCH_SIZE", "500"))
+CHAT_EXPORT_CHUNK_BYTES = int(os.getenv("CHAT_EXPORT_CHUNK_BYTES", str(64 * 1024)))
+CHAT_IMPORT_BATCH_SIZE = int(os.getenv("CHAT_IMPORT_BATCH_SIZE", "1000"))
+# Longest accepted import line, a message with its thinking and metadata
+CHAT_IMPORT_MAX_LINE_BYTES = 16 * 1024 * 1024
+# Uploads larger than this are spooled to a temporary file instead of memory
+CHAT_IMPORT_SPOOL_MEMORY_BYTES = int(
+    os.getenv("CHAT_IMPORT_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024))
+)
+
+EXPORT_VERSION = 1
+EXPORT_CHAT_FIELDS = ("id", "title", "is_archived", "created_at", "updated_at")
+EXPORT_MESSAGE_FIELDS = (*MESSAGE_FIELDS, *HEAVY_MESSAGE_FIELDS)
+
+
+class ChatImportError(ValueError):
+    """An import line is malformed or refers to something unknown"""
+
+    def __init__(self, line: int, detail: str):
+        super().__init__(f"Line {line}: {detail}")
+
+
+def _chat_rows(db: Session, user_id: UUID, chat_id: Optional[UUID]) -> Iterator[Any]:
+    query = select(*(getattr(Chat, name) for name in EXPORT_CHAT_FIELDS)).where(
+        Chat.user_id == user_id
+    )
+    if chat_id is not None:
+        query = query.where(Chat.id == chat_id)
+    return db.execute(
+        query.order_by(Chat.created_at, Chat.id).execution_options(
+            yield_per=CHAT_EXPORT_BATCH_SIZE
+        )
+    )
+
+
+def _message_rows(db: Session, chat_id: UUID) -> Iterator[Any]:
+    return db.execute(
+        select(*(getattr(Message, name) for name in EXPORT_MESSAGE_FIELDS))
+        .where(Message.chat_id == chat_id)
+        .order_by(Message.created_at, Message.id)
+        .execution_options(yield_per=CHAT_EXPORT_BATCH_SIZE)
+    )
+
+
+def _chunked(parts: Iterator[bytes]) -> Iterator[bytes]:
+    """Join small parts into chunks of about CHAT_EXPORT_CHUNK_BYTES."""
+    chunk = bytearray()
+    for part in parts:
+        chunk += part
+        if len(chunk) >= CHAT_EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+class ChatExportService:
+    """Service class for streaming chat exports"""
+
+    @staticmethod
+    def _header(user_id: UUID) -> Dict[str, Any]:
+        return {
+            "version": EXPORT_VERSION,
+            "user_id": user_id,
+            "exported_at": datetime.now(),
+        }
+
+    @staticmethod
+    def export_ndjson(
+        session_factory: Callable[[], Session],
+        user_id: UUID,
+        chat_id: Optional[UUID] = None,
+    ) -> Iterator[bytes]:
+        """
+        Generate an NDJSON export of a user's chats, or of one chat.
+
+        Opens its own session, since the stream outlives the request.
+
+        Args:
+            session_factory: Creates the session the export reads with
+            user_id: UUID of the user whose chats are exported
+            chat_id: Only export this chat
+
+        Returns:
+            Iterator of chunks of the export
+        """
+
+        def lines() -> Iterator[bytes]:
+            db = session_factory()
+            try:
+                header = {"type": "export", **ChatExportService._header(user_id)}
+                yield json_bytes(header) + b"\n"
+                for chat in _chat_rows(db, user_id, chat_id):
+                    yield json_bytes({"type": "chat", **chat._asdict()}) + b"\n"
+                    for message in _message_rows(db, chat.id):
+                        yield json_bytes(
+                            {"type": "message", **message._asdict()}
+                        ) + b"\n"
+            finally:
+                db.close()
+
+        return _chunked(lines())
+
+    @staticmethod
+    def export_json(
+        session_factory: Callable[[], Session],
+        user_id: UUID,
+        chat_id: Optional[UUID] = None,
+    ) -> Iterator[bytes]:
+        """
+        Generate a JSON export: the header fields and a ``chats`` list, each
+        chat with its ``messages``.
+
+        Same arguments as export_ndjson.
+        """
+
+        def parts() -> Iterator[bytes]:
+            db = session_factory()
+            try:
+                # Open the header object to append the chats list to it
+                yield json_bytes(ChatExportService._header(user_id))[:-1]
+                yield b',"chats":['
+                for i, chat in enumerate(_chat_rows(db, user_id, chat_id)):
+                    yield (b"," if i else b"") + json_bytes(chat._asdict())[:-1]
+                    yield b',"messages":['
+                    for j, message in enumerate(_message_rows(db, chat.id)):
+                        yield (b"," if j else b"") + json_bytes(message._asdict())
+                    yield b"]}"
+                yield b"]}"
+            finally:
+                db.close()
+
+        return _chunked(parts())
+
+
+async def spooled(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Receive a whole byte stream before yielding it back.
+
+    Imports write rows as they read lines; reading them straight from the
+    client would keep the import transaction, and the change log locks it
+    takes, open for as long as the upload lasts.
+    """
+    max_size = CHAT_IMPORT_SPOOL_MEMORY_BYTES
+    with tempfile.SpooledTemporaryFile(max_size=max_size) as spool:
+        async for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(CHAT_EXPORT_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def ndjson_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Split a byte stream into numbered, non-empty lines.
+
+    Raises:
+        ChatImportError: If a line is longer than CHAT_IMPORT_MAX_LINE_BYTES
+    """
+    number = 0
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" in chunk:
+            *lines, rest = bytes(buffer).split(b"\n")
+            buffer = bytearray(rest)
+            for line in lines:
+                number += 1
+                if line.strip():
+                    yield number, line
+        if len(buffer) > CHAT_IMPORT_MAX_LINE_BYTES:
+            raise ChatImportError(number + 1, "Line too long")
+    if buffer.strip():
+        yield number + 1, bytes(buffer)
+
+
+class ChatImporter:
+    """
+    Import of an NDJSON chat export into a user's account.
+
+    Feed the lines to ``add`` in order, then call ``finish`` to commit.
+    Chats get new IDs, so an export can be imported next to its original.
+    """
+
+    def __init__(self, db: Session, user: User):
+        self.db = db
+        self.user = user
+        # Export chat ID -> imported chat ID
+        self.chat_ids: Dict[UUID, UUID] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.message_count = 0
+
+    def add(self, line: int, text: bytes) -> None:
+        """
+        Add one line of the export.
+
+        Args:
+            line: Line number, for error messages
+            text: The JSON of the line
+
+        Raises:
+            ChatImportError: If the line is invalid
+        """
+        try:
+            record = json.loads(text)
+        except ValueError:
+            raise ChatImportError(line, "Invalid JSON")
+        if not isinstance(record, dict):
+            raise ChatImportError(line, "Expected a JSON object")
+        kind = record.get("type")
+        try:
+            if kind == "chat":
+                self._add_chat(ImportedChat.model_validate(record))
+            elif kind == "message":
+                self._add_message(line, ImportedMessage.model_validate(record))
+            elif kind == "export":
+                if record.get("version") != EXPORT_VERSION:
+                    raise ChatImportError(line, "Unsupported export version")
+            else:
+                raise ChatImportError(line, f"Unknown line type '{kind}'")
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                for error in e.errors()
+            )
+            raise ChatImportError(line, errors)
+
+    def _add_chat(self, chat: ImportedChat) -> None:
+        # Messages of earlier chats go first, they reference them
+        self._flush()
+        now = datetime.now()
+        new_id = uuid7()
+        self.db.execute(
+            insert(Chat),
+            {
+                "id": new_id,
+                "user_id": self.user.id,
+                "title": chat.title,
+                "is_archived": chat.is_archived,
+                "created_at": chat.created_at or now,
+                "updated_at": chat.updated_at or chat.created_at or now,
+            },
+        )
+        self.chat_ids[chat.id] = new_id
+        ChangeLogService.chat_changed(
+            self.db, self.user.id, new_id, event="chat.created", title=chat.title
+        )
+
+    def _add_message(self, line: int, message: ImportedMessage) -> None:
+        chat_id = self.chat_ids.get(message.chat_id)
+        if chat_id is None:
+            raise ChatImportError(line, f"Unknown chat {message.chat_id}")
+        try:
+            # Base64 images are stored, references must be the user's own
+            images = ImageService.store_images(
+                self.db, self.user.id, message.images
+            )
+        except InvalidImageError as e:
+            raise ChatImportError(line, str(e))
+        values = message.model_dump()
+        values.update(
+            id=uuid7(),
+            chat_id=chat_id,
+            created_at=message.created_at or datetime.now(),
+            images=images,
+        )
+        self.pending.append(values)
+        if len(self.pending) >= CHAT_IMPORT_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self.pending:
+            return
+        self.db.execute(Message.__table__.insert(), self.pending)
+        ChangeLogService.record(
+            self.db,
+            self.user.id,
+            [("message", row["id"], row["chat_id"], "upsert") for row in self.pending],
+        )
+        self.message_count += len(self.pending)
+        self.pending = []
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Insert the remaining messages, update the counters and commit.
+
+        Returns:
+            Numbers of imported chats and messages
+        """
+        self._flush()
+        for chat_id in self.chat_ids.values():
+            ChatStatsService.refresh(self.db, chat_id)
+        ChatService.count_user_chats(self.db, self.user.id)
+        self.db.commit()
+
+        app_logger.info(
+            f"Imported {len(self.chat_ids)} chats and {self.message_count} "
+            f"messages for user {self.user.id}"
+        )
+        return {
+            "success": True,
+            "imported_chats": len(self.chat_ids),
+            "imported_messages": self.message_count,
+        }
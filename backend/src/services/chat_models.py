@@ -1,9 +1,13 @@
+import hashlib
+import json
+import math
 import os
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import aiohttp
 from src.core.logger import app_logger
+from src.services.context_window import DEFAULT_NUM_CTX
 
 # Base URL for local Ollama instance
 OLLAMA_API_BASE_URL = os.getenv("OLLAMA_API_BASE_URL", "http://localhost:11434")
@@ -14,6 +18,8 @@ class ModelCache:
     def __init__(self, ttl_minutes: int = 5):
         self._cache: Dict[str, Any] = {}
         self._timestamps: Dict[str, datetime] = {}
+        # Digest of versioned values, so every worker derives the same version
+        self._digests: Dict[str, str] = {}
         self._ttl = timedelta(minutes=ttl_minutes)
 
     def get(self, key: str) -> Optional[Any]:
@@ -24,15 +30,29 @@ class ModelCache:
                 # Expired, remove from cache
                 del self._cache[key]
                 del self._timestamps[key]
+                self._digests.pop(key, None)
         return None
 
-    def set(self, key: str, value: Any):
+    def version(self, key: str) -> Optional[str]:
+        """Digest of a value set as versioned, None if it is not cached."""
+        if self.get(key) is None:
+            return None
+        return self._digests.get(key)
+
+    def set(self, key: str, value: Any, versioned: bool = False):
+        """Cache a value; versioned values get a digest for ``version``."""
         self._cache[key] = value
         self._timestamps[key] = datetime.now()
+        if versioned:
+            encoded = json.dumps(value, sort_keys=True, default=str)
+            self._digests[key] = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        else:
+            self._digests.pop(key, None)
 
     def clear(self):
         self._cache.clear()
         self._timestamps.clear()
+        self._digests.clear()
 
 
 # Global cache instance
@@ -111,7 +131,7 @@ class OllamaService:
             result = {"models": models_with_capabilities}
 
             # Cache the result
-            model_cache.set("models_with_capabilities", result)
+            model_cache.set("models_with_capabilities", result, versioned=True)
             app_logger.info(
                 f"Cached {len(models_with_capabilities)} models with capabilities"
             )
@@ -143,6 +163,76 @@ class OllamaService:
 
                 return result
 
+    @staticmethod
+    async def get_context_window(
+        model_name: str, options: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Get the number of context tokens Ollama will use for a request.
+
+        Uses num_ctx from the request options, then from the Modelfile
+        parameters, then Ollama's default, capped by the model's trained
+        context length from model_info.
+        """
+        requested = (options or {}).get("num_ctx")
+        if isinstance(requested, int) and requested > 0:
+            return requested
+
+        try:
+            details = await OllamaService.get_model_details(model_name)
+        except Exception as e:
+            app_logger.warning(
+                f"Failed to fetch context length for model {model_name}: {str(e)}"
+            )
+            return DEFAULT_NUM_CTX
+
+        num_ctx = DEFAULT_NUM_CTX
+        for line in (details.get("parameters") or "").splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == "num_ctx" and parts[1].isdigit():
+                num_ctx = int(parts[1])
+
+        context_length = next(
+            (
+                value
+                for key, value in (details.get("model_info") or {}).items()
+                if key.endswith(".context_length") and isinstance(value, int)
+            ),
+            None,
+        )
+        if context_length:
+            num_ctx = min(num_ctx, context_length)
+        return num_ctx
+
+    @staticmethod
+    async def get_vision_image_size(model_name: str) -> Optional[int]:
+        """
+        Get the largest image side a vision model makes use of, in pixels.
+
+        Based on the vision encoder's image_size from model_info; models
+        that split images into tiles accept a grid of up to max_num_tiles.
+        Returns None when the model does not report it.
+        """
+        try:
+            details = await OllamaService.get_model_details(model_name)
+        except Exception as e:
+            app_logger.warning(
+                f"Failed to fetch vision info for model {model_name}: {str(e)}"
+            )
+            return None
+
+        image_size = tiles = None
+        for key, value in (details.get("model_info") or {}).items():
+            if key.endswith(".vision.image_size") and isinstance(value, int):
+                image_size = value
+            elif key.endswith(".vision.max_num_tiles") and isinstance(value, int):
+                tiles = value
+        if not image_size:
+            return None
+        if tiles and tiles > 1:
+            image_size *= math.ceil(math.sqrt(tiles))
+        return image_size
+
     @staticmethod
     async def pull_model(model_name: str) -> str:
         """Pull a model from Ollama registry"""
@@ -200,6 +290,91 @@ class OllamaService:
 
                 return await response.json()
 
+    @staticmethod
+    async def stream_chat(
+        chat_request_data: Dict[str, Any],
+        on_chunk: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> Dict[str, Any]:
+        """
+        Send a streaming chat request to an Ollama model.
+
+        Each chunk is passed to on_chunk as it arrives; the next one is not
+        read until it returns, so a slow consumer slows down the stream.
+
+        Returns:
+            The combined response, in the same shape as chat_with_model
+        """
+        app_logger.info(
+            f"Streaming chat request for model: {chat_request_data.get('model')}"
+        )
+
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                f"{OLLAMA_API_BASE_URL}/api/chat",
+                json={**chat_request_data, "stream": True},
+            ) as response:
+                if response.status >= 400:
+                    response_text = await response.text()
+                    app_logger.error(
+                        f"Ollama API error: {response.status}, {response_text}"
+                    )
+                    return {
+                        "error": f"Ollama API error: {response.status}",
+                        "details": response_text,
+                    }
+
+                content: List[str] = []
+                thinking: List[str] = []
+                tool_calls: List[Dict[str, Any]] = []
+                final: Dict[str, Any] = {}
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        return {"error": chunk["error"]}
+
+                    message = chunk.get("message") or {}
+                    content.append(message.get("content") or "")
+                    thinking.append(message.get("thinking") or "")
+                    tool_calls.extend(message.get("tool_calls") or [])
+                    await on_chunk(chunk)
+                    final = chunk
+
+        message = {"role": "assistant", "content": "".join(content)}
+        if any(thinking):
+            message["thinking"] = "".join(thinking)
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return {**final, "message": message}
+
+    @staticmethod
+    async def embed(model_name: str, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts with an Ollama embedding model.
+
+        Raises:
+            RuntimeError: If Ollama answers with an error
+        """
+        async with aiohttp.ClientSession() as session:
+            async with session.post(
+                f"{OLLAMA_API_BASE_URL}/api/embed",
+                json={"model": model_name, "input": texts},
+            ) as response:
+                if response.status >= 400:
+                    response_text = await response.text()
+                    app_logger.error(
+                        f"Ollama embed error: {response.status}, {response_text}"
+                    )
+                    raise RuntimeError(f"Ollama API error: {response.status}")
+
+                return (await response.json())["embeddings"]
+
+    @staticmethod
+    def models_version() -> Optional[str]:
+        """Version of the cached model list, None until it is fetched."""
+        return model_cache.version("models_with_capabilities")
+
     @staticmethod
     def clear_cache():
         """Clear all cached data"""
@@ -0,0 +1,210 @@
+"""
+Set-based deletion of chats and their messages.
+
+Messages are deleted with one statement per chat (or per batch) that returns
+their image references, so blob reference counts can be released without
+loading the rows. Deleting a chat row cascades to its summary and stats.
+
+Chats with more than ``CHAT_DELETE_SYNC_LIMIT`` messages are purged by a
+background job instead. The chats are detached from their owner right away,
+so they disappear from every listing, and the job then deletes messages in
+batches of ``CHAT_PURGE_BATCH_SIZE``, committing and recording its progress
+after each batch so that locks are held only briefly.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Callable, List, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import Row, delete, select, update
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+from src.database import SessionLocal
+from src.models.chat_models import Chat, ChatPurgeJob, ChatStats, ChatSummary, Message
+from src.services.images import ImageService
+
+CHAT_DELETE_SYNC_LIMIT = int(os.getenv("CHAT_DELETE_SYNC_LIMIT", "5000"))
+CHAT_PURGE_BATCH_SIZE = int(os.getenv("CHAT_PURGE_BATCH_SIZE", "1000"))
+
+
+def delete_message_rows(db: Session, condition: Any, *columns: Any) -> List[Row]:
+    """
+    Delete the messages matching a condition in one statement.
+
+    Uses DELETE ... RETURNING where the database supports it (Postgres,
+    SQLite 3.35+), otherwise selects the columns first.
+
+    Returns:
+        The requested columns of the deleted messages
+    """
+    statement = (
+        delete(Message)
+        .where(condition)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.delete_returning:
+        return db.execute(statement.returning(*columns)).all()
+
+    rows = db.query(*columns).filter(condition).all()
+    db.execute(statement)
+    return rows
+
+
+def delete_messages(db: Session, condition: Any) -> Tuple[int, List[Any]]:
+    """
+    Delete the messages matching a condition in one statement.
+
+    Returns:
+        Number of deleted messages and their images column values
+    """
+    rows = delete_message_rows(db, condition, Message.images)
+    return len(rows), [images for (images,) in rows]
+
+
+def delete_chat_rows(db: Session, chat_ids: Any) -> int:
+    """
+    Delete chats whose messages are gone, without committing.
+
+    ``chat_ids`` is a list of IDs or a SELECT returning them.
+
+    Summaries and stats are deleted explicitly as well, since databases
+    created before ON DELETE CASCADE keep their old foreign keys.
+
+    Returns:
+        Number of deleted chats
+    """
+    db.execute(
+        delete(ChatSummary)
+        .where(ChatSummary.chat_id.in_(chat_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(ChatStats)
+        .where(ChatStats.chat_id.in_(chat_ids))
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(
+        delete(Chat)
+        .where(Chat.id.in_(chat_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+class ChatPurgeService:
+    """Service class for background purges of large chats"""
+
+    @staticmethod
+    def start(
+        db: Session, user_id: UUID, chat_ids: Sequence[UUID], total_messages: int
+    ) -> ChatPurgeJob:
+        """
+        Detach chats from their owner and record a purge job, without committing.
+
+        Args:
+            db: Database session
+            user_id: UUID of the owner
+            chat_ids: Chats to purge
+            total_messages: Expected number of messages, for progress
+
+        Returns:
+            The pending ChatPurgeJob
+        """
+        db.execute(
+            update(Chat)
+            .where(Chat.id.in_(chat_ids), Chat.user_id == user_id)
+            .values(user_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        job = ChatPurgeJob(
+            user_id=user_id,
+            chat_ids=[str(chat_id) for chat_id in chat_ids],
+            total_messages=total_messages,
+        )
+        db.add(job)
+        db.flush()
+
+        app_logger.info(
+            f"Scheduled purge {job.id} of {len(chat_ids)} chats "
+            f"and ~{total_messages} messages for user {user_id}"
+        )
+        return job
+
+    @staticmethod
+    def run(
+        job_id: UUID,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = CHAT_PURGE_BATCH_SIZE,
+    ) -> None:
+        """
+        Delete the chats of a purge job in batches, recording progress.
+
+        Runs as a background task. Jobs interrupted by a restart can be
+        resumed with ``python -m src.tools.chats purge``.
+
+        Args:
+            job_id: UUID of the ChatPurgeJob
+            session_factory: Factory for the session used by the job
+            batch_size: Messages deleted per transaction
+        """
+        db = session_factory()
+        try:
+            job = db.get(ChatPurgeJob, job_id)
+            if job is None or job.status == "done":
+                return
+            job.status = "running"
+            db.commit()
+
+            for value in job.chat_ids:
+                chat_id = UUID(value)
+                while True:
+                    batch = (
+                        select(Message.id)
+                        .where(Message.chat_id == chat_id)
+                        .limit(batch_size)
+                        .scalar_subquery()
+                    )
+                    deleted, images = delete_messages(db, Message.id.in_(batch))
+                    ImageService.release_images(db, images)
+                    job.deleted_messages += deleted
+                    db.commit()
+                    if deleted < batch_size:
+                        break
+
+                job.deleted_chats += delete_chat_rows(db, [chat_id])
+                db.commit()
+
+            job.status = "done"
+            job.finished_at = datetime.now()
+            db.commit()
+            app_logger.info(
+                f"Purge {job_id} deleted {job.deleted_chats} chats "
+                f"and {job.deleted_messages} messages"
+            )
+        except Exception as e:
+            db.rollback()
+            app_logger.error(f"Purge {job_id} failed: {str(e)}", exc_info=True)
+            job = db.get(ChatPurgeJob, job_id)
+            if job is not None:
+                job.status = "failed"
+                job.error = str(e)
+                db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_job(db: Session, user_id: UUID, job_id: UUID) -> ChatPurgeJob:
+        """
+        Get a purge job of a user.
+
+        Raises:
+            ValueError: If the job does not exist or belongs to another user
+        """
+        job = (
+            db.query(ChatPurgeJob)
+            .filter(ChatPurgeJob.id == job_id, ChatPurgeJob.user_id == user_id)
+            .first()
+        )
+        if not job:
+            raise ValueError("Purge job not found")
+        return job
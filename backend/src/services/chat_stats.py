@@ -0,0 +1,158 @@
+"""
+Denormalized per-chat totals for the chat list.
+
+The sidebar shows the last message and the size of every chat. Reading them
+from ``messages`` means a query per chat, so the ``chat_stats`` table keeps
+them, updated in the same transaction as the messages they describe. Chats
+from before the table existed get their row the first time it is needed.
+"""
+
+import re
+from typing import Any, Dict, Iterable
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from src.database import dialect_insert
+from src.models.chat_models import ChatStats, Message
+
+PREVIEW_LENGTH = 120
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def make_preview(content: str) -> str:
+    """Single line excerpt of a message for the chat list."""
+    preview = _WHITESPACE.sub(" ", content or "").strip()
+    if len(preview) > PREVIEW_LENGTH:
+        preview = preview[: PREVIEW_LENGTH - 3].rstrip() + "..."
+    return preview
+
+
+def _last_message_values(message: Any) -> Dict[str, Any]:
+    return {
+        "last_message_id": message.id,
+        "last_message_preview": make_preview(message.content),
+        "last_message_role": message.role,
+        "last_message_at": message.created_at,
+    }
+
+
+class ChatStatsService:
+    """Service class for maintaining chat_stats"""
+
+    @staticmethod
+    def refresh(db: Session, chat_id: UUID) -> ChatStats:
+        """
+        Recompute the stats of a chat from its messages.
+
+        Args:
+            db: Database session
+            chat_id: UUID of the chat
+
+        Returns:
+            The up to date ChatStats row
+        """
+        message_count, total_tokens = (
+            db.query(
+                func.count(Message.id),
+                func.coalesce(func.sum(Message.tokens_used), 0),
+            )
+            .filter(Message.chat_id == chat_id)
+            .one()
+        )
+        last = (
+            db.query(Message.id, Message.role, Message.content, Message.created_at)
+            .filter(Message.chat_id == chat_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .first()
+        )
+
+        values = {
+            "message_count": message_count,
+            "total_tokens": total_tokens,
+            "last_message_id": None,
+            "last_message_preview": None,
+            "last_message_role": None,
+            "last_message_at": None,
+        }
+        if last:
+            values.update(_last_message_values(last))
+
+        db.execute(
+            dialect_insert(db, ChatStats)
+            .values(chat_id=chat_id, **values)
+            .on_conflict_do_update(index_elements=["chat_id"], set_=values)
+        )
+        return db.get(ChatStats, chat_id, populate_existing=True)
+
+    @staticmethod
+    def message_added(db: Session, message: Message) -> ChatStats:
+        """
+        Count a new message as the latest of its chat, without committing.
+
+        Call after the message is flushed, so that its id and timestamp are set.
+
+        Returns:
+            The updated ChatStats row
+        """
+        updated = (
+            db.query(ChatStats)
+            .filter(ChatStats.chat_id == message.chat_id)
+            .update(
+                {
+                    ChatStats.message_count: ChatStats.message_count + 1,
+                    ChatStats.total_tokens: ChatStats.total_tokens
+                    + (message.tokens_used or 0),
+                    **_last_message_values(message),
+                },
+                synchronize_session=False,
+            )
+        )
+        if not updated:
+            return ChatStatsService.refresh(db, message.chat_id)
+        return db.get(ChatStats, message.chat_id, populate_existing=True)
+
+    @staticmethod
+    def message_updated(db: Session, message: Message) -> None:
+        """Refresh the preview if the edited message is the latest one."""
+        db.query(ChatStats).filter(
+            ChatStats.chat_id == message.chat_id,
+            ChatStats.last_message_id == message.id,
+        ).update(
+            {ChatStats.last_message_preview: make_preview(message.content)},
+            synchronize_session=False,
+        )
+
+    @staticmethod
+    def messages_removed(
+        db: Session, chat_id: UUID, message_ids: Iterable[UUID], tokens: int
+    ) -> None:
+        """
+        Subtract deleted messages, without committing.
+
+        Call after the deletes are flushed. Falls back to a recount when the
+        latest message was among them.
+
+        Args:
+            db: Database session
+            chat_id: UUID of the chat
+            message_ids: IDs of the deleted messages
+            tokens: Sum of their tokens_used
+        """
+        message_ids = set(message_ids)
+        if not message_ids:
+            return
+
+        stats = db.get(ChatStats, chat_id, populate_existing=True)
+        if stats is None or stats.last_message_id in message_ids:
+            ChatStatsService.refresh(db, chat_id)
+            return
+
+        db.query(ChatStats).filter(ChatStats.chat_id == chat_id).update(
+            {
+                ChatStats.message_count: ChatStats.message_count - len(message_ids),
+                ChatStats.total_tokens: ChatStats.total_tokens - tokens,
+            },
+            synchronize_session=False,
+        )
@@ -0,0 +1,198 @@
+"""
+Token budgeting for the chat history sent to Ollama.
+
+Ollama silently drops the oldest part of a prompt that does not fit in
+``num_ctx``, after the whole history has already been uploaded and
+tokenized. Estimating the prompt size locally lets us trim the history
+ourselves, keeping the system prompt and the most recent turns.
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from src.core.logger import app_logger
+
+# Ollama's default context size when neither the request nor the Modelfile sets one
+DEFAULT_NUM_CTX = int(os.getenv("OLLAMA_DEFAULT_NUM_CTX", "4096"))
+# Tokens kept free for the model's answer when the request has no num_predict
+RESPONSE_RESERVE_TOKENS = int(os.getenv("CONTEXT_RESPONSE_RESERVE_TOKENS", "1024"))
+# Rough cost of one image for vision models
+IMAGE_TOKEN_ESTIMATE = int(os.getenv("CONTEXT_IMAGE_TOKEN_ESTIMATE", "768"))
+
+CHARS_PER_TOKEN = 3.5
+# Role markers and separators added by the chat template
+MESSAGE_OVERHEAD_TOKENS = 4
+# Weight of a new prompt_eval_count sample in the per-model correction factor
+CALIBRATION_WEIGHT = 0.2
+
+# Per-model ratio of real prompt_eval_count to our estimate
+_calibration: Dict[str, float] = {}
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate the token count of a text without running a tokenizer."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the prompt tokens used by a single chat message."""
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    tokens += estimate_text_tokens(message.get("content") or "")
+    tokens += estimate_text_tokens(message.get("thinking") or "")
+    tokens += len(message.get("images") or []) * IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
+class ContextWindowService:
+    """Service class for fitting chat history into a model's context window"""
+
+    @staticmethod
+    def response_reserve(num_ctx: int, options: Optional[Dict[str, Any]]) -> int:
+        """Tokens to leave free for the answer, never more than half the window."""
+        num_predict = (options or {}).get("num_predict")
+        reserve = (
+            num_predict
+            if isinstance(num_predict, int) and num_predict > 0
+            else RESPONSE_RESERVE_TOKENS
+        )
+        return min(reserve, num_ctx // 2)
+
+    @staticmethod
+    def estimate_prompt_tokens(model: str, messages: List[Dict[str, Any]]) -> int:
+        """Estimate the prompt size of a message list, corrected per model."""
+        raw = sum(estimate_message_tokens(message) for message in messages)
+        return math.ceil(raw * _calibration.get(model, 1.0))
+
+    @staticmethod
+    def trim_history(
+        model: str,
+        messages: List[Dict[str, Any]],
+        num_ctx: int,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Drop the oldest turns until the history fits the context window.
+
+        System messages and the latest message are always kept. If the
+        window starts with an assistant or tool reply whose question was
+        dropped, that reply is dropped as well.
+
+        Args:
+            model: Model name, used for the calibration factor
+            messages: Chat messages as dictionaries, oldest first
+            num_ctx: Context window of the model in tokens
+            options: Request options, used for num_predict
+
+        Returns:
+            Dictionary with the kept messages, estimated prompt tokens,
+            number of dropped messages and the token budget
+        """
+        budget = num_ctx - ContextWindowService.response_reserve(num_ctx, options)
+        factor = _calibration.get(model, 1.0)
+        costs = [
+            math.ceil(estimate_message_tokens(message) * factor)
+            for message in messages
+        ]
+        total = sum(costs)
+
+        if total <= budget or len(messages) <= 1:
+            return {
+                "messages": messages,
+                "estimated_tokens": total,
+                "dropped": 0,
+                "budget": budget,
+            }
+
+        last_index = len(messages) - 1
+        keep = [True] * len(messages)
+        droppable = [
+            i
+            for i, message in enumerate(messages)
+            if message.get("role") != "system" and i != last_index
+        ]
+
+        position = 0
+        while total > budget and position < len(droppable):
+            index = droppable[position]
+            keep[index] = False
+            total -= costs[index]
+            position += 1
+
+        # Do not open the window with an answer to a question we dropped
+        while position < len(droppable) and messages[droppable[position]].get(
+            "role"
+        ) in ("assistant", "tool"):
+            index = droppable[position]
+            keep[index] = False
+            total -= costs[index]
+            position += 1
+
+        kept = [message for i, message in enumerate(messages) if keep[i]]
+        dropped = len(messages) - len(kept)
+
+        if total > budget:
+            app_logger.warning(
+                f"History for {model} still needs ~{total} tokens after trimming, "
+                f"budget is {budget}"
+            )
+        app_logger.info(
+            f"Trimmed {dropped} of {len(messages)} messages to fit {model} "
+            f"context ({total}/{budget} tokens)"
+        )
+        return {
+            "messages": kept,
+            "estimated_tokens": total,
+            "dropped": dropped,
+            "budget": budget,
+        }
+
+    @staticmethod
+    def record_prompt_eval(
+        model: str,
+        messages: List[Dict[str, Any]],
+        estimated_tokens: int,
+        prompt_eval_count: Optional[int],
+    ) -> None:
+        """
+        Validate an estimate against Ollama's prompt_eval_count.
+
+        On follow-up turns Ollama only evaluates the part of the prompt that
+        is not already in its KV cache, so only prompts without an earlier
+        assistant reply (the first turn of a chat) are used for calibration.
+        Samples far off the estimate are logged and ignored as well.
+
+        Args:
+            model: Model name
+            messages: The messages that were sent
+            estimated_tokens: Estimated prompt tokens of those messages
+            prompt_eval_count: Prompt tokens Ollama reported
+        """
+        if not prompt_eval_count or estimated_tokens <= 0:
+            return
+        if any(message.get("role") == "assistant" for message in messages):
+            return
+
+        factor = _calibration.get(model, 1.0)
+        raw_estimate = estimated_tokens / factor
+        ratio = prompt_eval_count / raw_estimate
+        if not 0.5 <= ratio <= 2.0:
+            app_logger.debug(
+                f"Ignoring prompt_eval_count sample for {model}: "
+                f"estimated {estimated_tokens}, actual {prompt_eval_count}"
+            )
+            return
+
+        updated = factor + CALIBRATION_WEIGHT * (ratio - factor)
+        _calibration[model] = updated
+        app_logger.debug(
+            f"Token estimate for {model}: estimated {estimated_tokens}, "
+            f"actual {prompt_eval_count}, correction factor {updated:.3f}"
+        )
+
+    @staticmethod
+    def reset_calibration() -> None:
+        """Forget all per-model correction factors"""
+        _calibration.clear()
@@ -0,0 +1,443 @@
+"""
+Semantic search over the messages of a user.
+
+Message contents are embedded with an Ollama embedding model by a background
+job, in batches. Vectors are stored once per distinct text in
+``content_embeddings``, keyed by the SHA-256 of the text and the model, so
+duplicate messages are not embedded again. ``message_embeddings`` links each
+message to the vector of its current text. Vectors that no message uses any
+more, e.g. the old text of an edited message, are pruned by the indexing job.
+Search queries are embedded but never stored.
+
+Vectors are normalized and stored as float16, half the size of float32 and
+enough precision for cosine ranking. Queries are answered by brute force
+with NumPy over a per-user matrix, kept in a small in-process LRU cache and
+reloaded when the user's embeddings change. NumPy is only imported once
+semantic search is used.
+"""
+
+import hashlib
+import html
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Dict, List, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+from src.database import SessionLocal, dialect_insert
+from src.models.chat_models import Chat, Message
+from src.models.embedding import ContentEmbedding, MessageEmbedding
+from src.models.user import User
+from src.services.chat_models import OllamaService
+from src.services.chat_stats import make_preview
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "false").lower() == "true"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+# Texts sent to Ollama per request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Users whose vector matrix is kept in memory
+EMBEDDING_INDEX_CACHE_USERS = int(os.getenv("EMBEDDING_INDEX_CACHE_USERS", "16"))
+# Longer texts are cut before embedding
+EMBEDDING_MAX_CHARS = 8000
+# Rows converted to float32 at a time while scoring
+_SCORE_CHUNK = 16_384
+# Unused vectors are deleted at most this often per process
+PRUNE_INTERVAL = timedelta(minutes=10)
+
+EMBEDDED_ROLES = ("user", "assistant")
+
+# Users with an indexing job running in this process
+_running: Set[UUID] = set()
+_last_prune = datetime.min
+
+
+class SemanticSearchUnavailableError(RuntimeError):
+    """Raised when semantic search is disabled or Ollama cannot embed"""
+
+
+def content_hash(text: str) -> str:
+    """Hex SHA-256 of a text, the key of its embedding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Normalize a vector and encode it as little endian float16."""
+    import numpy as np
+
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    if norm > 0:
+        array = array / norm
+    return array.astype("<f2").tobytes()
+
+
+def unpack_vector(blob: bytes) -> "np.ndarray":
+    import numpy as np
+
+    return np.frombuffer(blob, dtype="<f2")
+
+
+class VectorIndex:
+    """Unit vectors of a user's messages, for brute-force top-k queries"""
+
+    def __init__(
+        self, signature: Tuple, message_ids: List[UUID], matrix: "np.ndarray"
+    ):
+        self.signature = signature
+        self.message_ids = message_ids
+        self.matrix = matrix
+
+    def top_k(self, query: "np.ndarray", k: int) -> List[Tuple[UUID, float]]:
+        """Messages most similar to a unit query vector, best first."""
+        import numpy as np
+
+        count = len(self.message_ids)
+        if not count or k <= 0:
+            return []
+
+        query = query.astype(np.float32)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, _SCORE_CHUNK):
+            chunk = self.matrix[start : start + _SCORE_CHUNK].astype(np.float32)
+            scores[start : start + len(chunk)] = chunk @ query
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.message_ids[i], float(scores[i])) for i in top]
+
+
+_indexes: "OrderedDict[Tuple[UUID, str], VectorIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class EmbeddingService:
+    """Service class for message embeddings and semantic search"""
+
+    @staticmethod
+    async def embed_texts(
+        db: Session,
+        texts: List[str],
+        model: str = EMBEDDING_MODEL,
+        store: bool = True,
+    ) -> Dict[str, bytes]:
+        """
+        Packed vectors of texts by content hash, without committing.
+
+        Only texts whose hash is not in content_embeddings are sent to Ollama.
+        New vectors are added to content_embeddings unless ``store`` is False.
+
+        Raises:
+            RuntimeError: If Ollama fails or answers a batch with fewer or more
+                vectors than texts
+        """
+        by_hash = {content_hash(text): text for text in texts}
+        vectors = dict(
+            db.query(ContentEmbedding.content_hash, ContentEmbedding.vector).filter(
+                ContentEmbedding.content_hash.in_(list(by_hash)),
+                ContentEmbedding.model == model,
+            )
+        )
+
+        missing = [digest for digest in by_hash if digest not in vectors]
+        for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+            batch = missing[start : start + EMBEDDING_BATCH_SIZE]
+            embedded = await OllamaService.embed(
+                model, [by_hash[digest][:EMBEDDING_MAX_CHARS] for digest in batch]
+            )
+            if len(embedded) != len(batch):
+                raise RuntimeError(
+                    f"Ollama returned {len(embedded)} embeddings for {len(batch)} texts"
+                )
+            rows = [
+                {
+                    "content_hash": digest,
+                    "model": model,
+                    "dimensions": len(vector),
+                    "vector": pack_vector(vector),
+                }
+                for digest, vector in zip(batch, embedded)
+            ]
+            if store:
+                db.execute(
+                    dialect_insert(db, ContentEmbedding)
+                    .values(rows)
+                    .on_conflict_do_nothing(index_elements=["content_hash", "model"])
+                )
+            vectors.update((row["content_hash"], row["vector"]) for row in rows)
+
+        return vectors
+
+    @staticmethod
+    async def index_user_messages(
+        user_id: UUID,
+        session_factory: Callable[[], Session] = SessionLocal,
+        model: str = EMBEDDING_MODEL,
+    ) -> int:
+        """
+        Embed the user's messages that have no embedding of their content yet.
+
+        Meant to run as a background task after messages are written. Also
+        prunes unused vectors, see prune_unused.
+
+        Returns:
+            Number of messages indexed
+        """
+        if user_id in _running:
+            return 0
+        _running.add(user_id)
+
+        indexed = 0
+        attempted: Set[UUID] = set()
+        db = session_factory()
+        try:
+            EmbeddingService.prune_unused(db)
+            while True:
+                pending = (
+                    db.query(Message.id, Message.content)
+                    .join(Chat, Chat.id == Message.chat_id)
+                    .outerjoin(
+                        MessageEmbedding, MessageEmbedding.message_id == Message.id
+                    )
+                    .outerjoin(
+                        ContentEmbedding,
+                        and_(
+                            ContentEmbedding.content_hash
+                            == MessageEmbedding.content_hash,
+                            ContentEmbedding.model == MessageEmbedding.model,
+                        ),
+                    )
+                    .filter(
+                        Chat.user_id == user_id,
+                        Message.role.in_(EMBEDDED_ROLES),
+                        Message.content != "",
+                        or_(
+                            MessageEmbedding.message_id.is_(None),
+                            MessageEmbedding.model != model,
+                            # Pruned while a message was linked to it
+                            ContentEmbedding.content_hash.is_(None),
+                        ),
+                    )
+                    .limit(EMBEDDING_BATCH_SIZE)
+                    .all()
+                )
+                if not pending:
+                    break
+                # Messages still pending after a pass would be embedded forever
+                if attempted.issuperset(message_id for message_id, _ in pending):
+                    app_logger.warning(
+                        f"Stopped embedding messages of user {user_id}: "
+                        f"{len(pending)} stay pending after indexing"
+                    )
+                    break
+                attempted.update(message_id for message_id, _ in pending)
+
+                await EmbeddingService.embed_texts(
+                    db, [content for _, content in pending], model
+                )
+                for message_id, content in pending:
+                    values = {
+                        "content_hash": content_hash(content),
+                        "model": model,
+                        "updated_at": datetime.now(),
+                    }
+                    db.execute(
+                        dialect_insert(db, MessageEmbedding)
+                        .values(message_id=message_id, **values)
+                        .on_conflict_do_update(
+                            index_elements=["message_id"], set_=values
+                        )
+                    )
+                db.commit()
+                indexed += len(pending)
+
+            if indexed:
+                app_logger.info(f"Embedded {indexed} messages of user {user_id}")
+            return indexed
+        except Exception as e:
+            db.rollback()
+            app_logger.error(
+                f"Failed to embed messages of user {user_id}: {str(e)}", exc_info=True
+            )
+            return indexed
+        finally:
+            db.close()
+            _running.discard(user_id)
+
+    @staticmethod
+    def prune_unused(db: Session, force: bool = False) -> int:
+        """
+        Delete vectors that no message embedding refers to, and commit.
+
+        Runs at most once per PRUNE_INTERVAL per process unless forced.
+
+        Returns:
+            Number of deleted vectors
+        """
+        global _last_prune
+        now = datetime.now()
+        if not force and now - _last_prune < PRUNE_INTERVAL:
+            return 0
+        _last_prune = now
+
+        used = (
+            db.query(MessageEmbedding.message_id)
+            .filter(
+                MessageEmbedding.content_hash == ContentEmbedding.content_hash,
+                MessageEmbedding.model == ContentEmbedding.model,
+            )
+            .exists()
+        )
+        deleted = (
+            db.query(ContentEmbedding)
+            .filter(~used)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        if deleted:
+            app_logger.debug(f"Pruned {deleted} unused embeddings")
+        return deleted
+
+    @staticmethod
+    def forget_message(db: Session, message_id: UUID) -> None:
+        """Drop a message's embedding after its content changed, without committing."""
+        db.query(MessageEmbedding).filter(
+            MessageEmbedding.message_id == message_id
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def load_index(
+        db: Session, user_id: UUID, model: str = EMBEDDING_MODEL
+    ) -> VectorIndex:
+        """
+        The user's vector matrix, from the cache while it is current.
+
+        A count and the latest change of the user's message embeddings tell
+        whether anything was added, edited or deleted since it was loaded.
+        """
+        owned = (
+            db.query(MessageEmbedding)
+            .join(Message, Message.id == MessageEmbedding.message_id)
+            .join(Chat, Chat.id == Message.chat_id)
+            .filter(Chat.user_id == user_id, MessageEmbedding.model == model)
+        )
+        signature = tuple(
+            owned.with_entities(
+                func.count(MessageEmbedding.message_id),
+                func.max(MessageEmbedding.updated_at),
+            ).one()
+        )
+
+        key = (user_id, model)
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is not None and index.signature == signature:
+                _indexes.move_to_end(key)
+                return index
+
+        rows = owned.join(
+            ContentEmbedding,
+            and_(
+                ContentEmbedding.content_hash == MessageEmbedding.content_hash,
+                ContentEmbedding.model == MessageEmbedding.model,
+            ),
+        ).with_entities(MessageEmbedding.message_id, ContentEmbedding.vector)
+        message_ids = []
+        vectors = []
+        for message_id, vector in rows:
+            message_ids.append(message_id)
+            vectors.append(vector)
+
+        import numpy as np
+
+        matrix = (
+            unpack_vector(b"".join(vectors)).reshape(len(vectors), -1)
+            if vectors
+            else np.empty((0, 0), dtype="<f2")
+        )
+        index = VectorIndex(signature, message_ids, matrix)
+
+        with _indexes_lock:
+            _indexes[key] = index
+            _indexes.move_to_end(key)
+            while len(_indexes) > EMBEDDING_INDEX_CACHE_USERS:
+                _indexes.popitem(last=False)
+        return index
+
+    @staticmethod
+    async def search(
+        db: Session,
+        user: User,
+        query: str,
+        limit: int = 10,
+        model: str = EMBEDDING_MODEL,
+    ) -> Dict:
+        """
+        Messages of the user closest in meaning to a query.
+
+        Args:
+            db: Database session
+            user: User object
+            query: Text to search for
+            limit: Maximum number of results
+
+        Returns:
+            Dictionary with results ordered by cosine similarity
+
+        Raises:
+            SemanticSearchUnavailableError: If embeddings are disabled or the
+                query cannot be embedded
+        """
+        if not EMBEDDINGS_ENABLED:
+            raise SemanticSearchUnavailableError("Semantic search is disabled")
+
+        try:
+            # Queries are not stored, they would pile up with the user's text
+            vectors = await EmbeddingService.embed_texts(
+                db, [query], model, store=False
+            )
+        except (RuntimeError, OSError) as e:
+            app_logger.error(f"Failed to embed search query: {str(e)}")
+            raise SemanticSearchUnavailableError("Embedding model is not available")
+
+        index = EmbeddingService.load_index(db, user.id, model)
+        query_vector = unpack_vector(vectors[content_hash(query)])
+        if index.matrix.shape[1:] != query_vector.shape:
+            return {"results": [], "next_cursor": None}
+        hits = index.top_k(query_vector, limit)
+
+        rows = (
+            db.query(
+                Message.id,
+                Message.chat_id,
+                Chat.title,
+                Message.role,
+                Message.content,
+                Message.created_at,
+            )
+            .join(Chat, Chat.id == Message.chat_id)
+            .filter(Message.id.in_([message_id for message_id, _ in hits]))
+        )
+        details = {row.id: row for row in rows}
+
+        results = [
+            {
+                "message_id": message_id,
+                "chat_id": details[message_id].chat_id,
+                "chat_title": details[message_id].title,
+                "role": details[message_id].role,
+                "created_at": details[message_id].created_at,
+                "snippet": html.escape(make_preview(details[message_id].content)),
+                "score": score,
+            }
+            for message_id, score in hits
+            if message_id in details
+        ]
+        return {"results": results, "next_cursor": None}
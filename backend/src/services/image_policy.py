@@ -0,0 +1,133 @@
+"""
+Decides which images of a chat history are sent to Ollama.
+
+Clients send the whole history with every turn, including every image ever
+attached. Re-sending them makes each request megabytes larger and makes
+vision models encode the same pictures again, so older images are replaced
+by short text placeholders unless the policy keeps them.
+
+Policies (``OLLAMA_IMAGE_POLICY``):
+    all: send every image (previous behaviour)
+    none: only send the images of the current turn
+    last_n: send the images of the current turn and of the latest
+        ``OLLAMA_IMAGE_HISTORY_TURNS`` earlier user turns that had images,
+        so follow-up questions about the last picture keep working (default)
+    referenced: like ``none``, unless the current message refers back to an
+        image by an English keyword, in which case the latest earlier images
+        are kept too
+"""
+
+import os
+import re
+from typing import Any, Callable, Dict, List
+
+from src.core.logger import app_logger
+
+IMAGE_POLICIES = ("all", "none", "last_n", "referenced")
+
+OLLAMA_IMAGE_POLICY = os.getenv("OLLAMA_IMAGE_POLICY", "last_n")
+OLLAMA_IMAGE_HISTORY_TURNS = int(os.getenv("OLLAMA_IMAGE_HISTORY_TURNS", "1"))
+
+# Words in the current message that point back at an earlier image
+_REFERENCE_PATTERN = re.compile(
+    r"\b(image|images|picture|pictures|photo|photos|screenshot|screenshots|"
+    r"diagram|chart|graph|figure|drawing|scan)\b",
+    re.IGNORECASE,
+)
+
+
+def _placeholder(count: int) -> str:
+    noun = "image" if count == 1 else "images"
+    return f"[{count} {noun} from this message omitted]"
+
+
+def _turns_with_images(messages: List[Dict[str, Any]], count: int) -> int:
+    """
+    Number of most recent user turns that covers the current turn and the
+    latest ``count`` earlier turns with images.
+    """
+    found = []
+    user_turns = 0
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            user_turns += 1
+        if len(found) == count:
+            break
+        if user_turns > 1 and message.get("images") and user_turns not in found:
+            found.append(user_turns)
+    return max([1, *found])
+
+
+def _turns_to_keep(messages: List[Dict[str, Any]], policy: str) -> int:
+    """Number of most recent user turns whose images are sent."""
+    if policy == "last_n":
+        return _turns_with_images(messages, max(OLLAMA_IMAGE_HISTORY_TURNS, 0))
+
+    if policy == "referenced":
+        current = next(
+            (m for m in reversed(messages) if m.get("role") == "user"), None
+        )
+        if current and _REFERENCE_PATTERN.search(current.get("content") or ""):
+            return _turns_with_images(messages, 1)
+    return 1
+
+
+class ImagePolicyService:
+    """Service class for pruning historical images from chat requests"""
+
+    @staticmethod
+    def apply(
+        messages: List[Dict[str, Any]],
+        policy: str = OLLAMA_IMAGE_POLICY,
+        measure: Callable[[str], int] = len,
+    ) -> Dict[str, Any]:
+        """
+        Drop images that the current turn does not need.
+
+        Args:
+            messages: Chat messages as dictionaries, oldest first
+            policy: One of IMAGE_POLICIES
+            measure: Request size of one image entry, in bytes
+
+        Returns:
+            Dictionary with the messages to send, the number of dropped
+            images and the payload bytes saved
+        """
+        if policy not in IMAGE_POLICIES:
+            app_logger.warning(f"Unknown image policy '{policy}', sending all images")
+            policy = "all"
+        if policy == "all" or not any(m.get("images") for m in messages):
+            return {"messages": messages, "images_dropped": 0, "bytes_saved": 0}
+
+        keep_turns = _turns_to_keep(messages, policy)
+
+        result = []
+        images_dropped = 0
+        bytes_saved = 0
+        user_turns = 0
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                user_turns += 1
+            images = message.get("images") or []
+            if images and user_turns > keep_turns:
+                images_dropped += len(images)
+                bytes_saved += sum(measure(image) for image in images)
+                content = message.get("content") or ""
+                message = {
+                    **message,
+                    "images": None,
+                    "content": f"{content}\n{_placeholder(len(images))}".lstrip(),
+                }
+            result.append(message)
+        result.reverse()
+
+        if images_dropped:
+            app_logger.info(
+                f"Image policy '{policy}' dropped {images_dropped} images, "
+                f"saving {bytes_saved} bytes"
+            )
+        return {
+            "messages": result,
+            "images_dropped": images_dropped,
+            "bytes_saved": bytes_saved,
+        }
@@ -0,0 +1,84 @@
+"""
+CPU-bound image work, run in a process pool by ImageService.
+
+This module is imported by pool workers, so it must stay free of
+application imports (database, logging setup, routers).
+"""
+
+import os
+import tempfile
+from typing import Any, Dict
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Pillow is optional; uploads are then stored without downscaling
+    Image = None
+
+# Formats every Ollama vision model accepts
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png"}
+JPEG_QUALITY = 90
+
+
+def pillow_available() -> bool:
+    return Image is not None
+
+
+def downscale_image(path: str, max_side: int) -> Dict[str, Any]:
+    """
+    Fit an image file into ``max_side`` pixels and re-encode it if needed.
+
+    Small JPEG and PNG files are kept byte for byte. Everything else is
+    resized (keeping the aspect ratio) and written as JPEG, or PNG when the
+    image has transparency, to a new file next to the input.
+
+    Args:
+        path: Image file to process
+        max_side: Largest allowed width or height in pixels
+
+    Returns:
+        Dictionary with the output path, content type, width and height
+
+    Raises:
+        ValueError: If the file is not an image Pillow can read
+    """
+    try:
+        image = Image.open(path)
+        image.load()
+    except Exception as e:
+        raise ValueError(f"Unsupported image: {e}")
+
+    source_format = image.format
+    width, height = image.size
+    if max(width, height) <= max_side and source_format in PASSTHROUGH_FORMATS:
+        return {
+            "path": path,
+            "content_type": PASSTHROUGH_FORMATS[source_format],
+            "width": width,
+            "height": height,
+        }
+
+    # Respect camera orientation before resizing, it is lost on re-encode
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    fd, output = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as out:
+        if has_alpha:
+            image.save(out, format="PNG", optimize=True)
+            content_type = "image/png"
+        else:
+            image.convert("RGB").save(
+                out, format="JPEG", quality=JPEG_QUALITY, optimize=True
+            )
+            content_type = "image/jpeg"
+
+    return {
+        "path": output,
+        "content_type": content_type,
+        "width": image.width,
+        "height": image.height,
+    }
@@ -0,0 +1,460 @@
+"""
+Content-addressed storage for chat images.
+
+Images are stored once on the local filesystem under their SHA-256 digest,
+sharded by the first two byte pairs (``ab/cd/abcd...``). Messages only keep
+references of the form ``sha256:<digest>`` in their ``images`` column, and
+the ``image_blobs`` table counts how many message slots point at each blob so
+that unreferenced files can be garbage collected.
+
+Blobs are shared between users with the same image, but a user can only read
+a blob, or attach it to a message by reference, after uploading it
+themselves. ``image_blob_owners`` records who did.
+
+Older rows may still hold inline base64 images; every reader accepts both.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+from src.database import dialect_insert
+from src.models.image_blob import ImageBlob, ImageBlobOwner
+from src.services.image_processing import downscale_image, pillow_available
+
+IMAGE_STORE_DIR = Path(os.getenv("IMAGE_STORE_DIR", "data/images"))
+REF_PREFIX = "sha256:"
+# Unreferenced blobs younger than this may be about to be referenced again
+GC_GRACE = timedelta(hours=1)
+# Largest side of uploaded images when the target model does not say
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1024"))
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+_DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_DATA_URL_PATTERN = re.compile(r"^data:[\w/+.-]+;base64,")
+
+
+class InvalidImageError(ValueError):
+    """Raised when an image is neither valid base64 nor a known reference"""
+
+
+class ImageTooLargeError(InvalidImageError):
+    """Raised when an upload exceeds IMAGE_UPLOAD_MAX_BYTES"""
+
+
+def is_image_ref(value: Any) -> bool:
+    """Whether a stored image entry is a blob reference."""
+    return (
+        isinstance(value, str)
+        and value.startswith(REF_PREFIX)
+        and bool(_DIGEST_PATTERN.match(value[len(REF_PREFIX) :]))
+    )
+
+
+def make_ref(digest: str) -> str:
+    return f"{REF_PREFIX}{digest}"
+
+
+def ref_digest(ref: str) -> str:
+    return ref[len(REF_PREFIX) :] if ref.startswith(REF_PREFIX) else ref
+
+
+def sniff_content_type(header: bytes) -> str:
+    """Guess an image MIME type from its first bytes."""
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    if header[:2] == b"BM":
+        return "image/bmp"
+    return "application/octet-stream"
+
+
+class BlobStore:
+    """Files on local disk, addressed by the SHA-256 of their content"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest).is_file()
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their digest; existing content is reused."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if path.is_file():
+            return digest
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename, so readers never see partial files
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        return digest
+
+    def temp_dir(self) -> Path:
+        """Directory for partial uploads, on the same filesystem as the blobs."""
+        path = self.root / "tmp"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def put_file(self, source: Path) -> str:
+        """Move a finished file into the store and return its digest."""
+        digest = hashlib.sha256()
+        with open(source, "rb") as file:
+            for chunk in iter(lambda: file.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        hex_digest = digest.hexdigest()
+
+        path = self.path_for(hex_digest)
+        if path.is_file():
+            os.unlink(source)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, path)
+        return hex_digest
+
+    def read(self, digest: str) -> bytes:
+        return self.path_for(digest).read_bytes()
+
+    def delete(self, digest: str) -> None:
+        try:
+            self.path_for(digest).unlink()
+        except FileNotFoundError:
+            pass
+
+
+# Global blob store instance
+blob_store = BlobStore(IMAGE_STORE_DIR)
+
+# Created on first upload so that importing this module stays cheap
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _process_pool
+
+
+class ImageService:
+    """Service class for storing and resolving message images"""
+
+    @staticmethod
+    def decode_image(value: str) -> bytes:
+        """Decode a base64 image, optionally given as a data URL."""
+        try:
+            return base64.b64decode(
+                _DATA_URL_PATTERN.sub("", value, count=1), validate=True
+            )
+        except (binascii.Error, ValueError):
+            raise InvalidImageError("Invalid base64 encoded image")
+
+    @staticmethod
+    def owned_digests(db: Session, user_id: UUID, digests: Iterable[str]) -> Set[str]:
+        """The digests among ``digests`` that the user uploaded."""
+        digests = set(digests)
+        if not digests:
+            return set()
+        return {
+            digest
+            for (digest,) in db.query(ImageBlobOwner.digest).filter(
+                ImageBlobOwner.user_id == user_id,
+                ImageBlobOwner.digest.in_(digests),
+            )
+        }
+
+    @staticmethod
+    def _add_owners(db: Session, user_id: UUID, digests: Iterable[str]) -> None:
+        rows = [{"digest": digest, "user_id": user_id} for digest in set(digests)]
+        if rows:
+            db.execute(
+                dialect_insert(db, ImageBlobOwner)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["digest", "user_id"])
+            )
+
+    @staticmethod
+    def store_images(
+        db: Session, user_id: UUID, images: Optional[List[str]]
+    ) -> Optional[List[str]]:
+        """
+        Store images in the blob store and take a reference on each.
+
+        Accepts base64 images, which the user then owns, and ``sha256:``
+        references to blobs the user owns. The caller commits the session.
+
+        Args:
+            db: Database session
+            user_id: UUID of the user attaching the images
+            images: Base64 images and image references
+
+        Returns:
+            List of references to save in Message.images
+
+        Raises:
+            InvalidImageError: If an image is invalid, or references a blob
+                that does not exist or that the user does not own
+        """
+        if not images:
+            return images
+
+        owned = ImageService.owned_digests(
+            db, user_id, (ref_digest(image) for image in images if is_image_ref(image))
+        )
+        refs = []
+        new_blobs: Dict[str, Dict[str, Any]] = {}
+        for image in images:
+            if is_image_ref(image):
+                digest = ref_digest(image)
+                if digest not in owned or not blob_store.exists(digest):
+                    raise InvalidImageError(f"Unknown image {image}")
+            else:
+                data = ImageService.decode_image(image)
+                digest = blob_store.put(data)
+                new_blobs[digest] = {
+                    "digest": digest,
+                    "size": len(data),
+                    "content_type": sniff_content_type(data[:16]),
+                    "ref_count": 0,
+                }
+            refs.append(make_ref(digest))
+
+        if new_blobs:
+            db.execute(
+                dialect_insert(db, ImageBlob)
+                .values(list(new_blobs.values()))
+                .on_conflict_do_nothing(index_elements=["digest"])
+            )
+            ImageService._add_owners(db, user_id, new_blobs)
+        ImageService._adjust_refs(db, Counter(ref_digest(ref) for ref in refs), 1)
+        return refs
+
+    @staticmethod
+    async def store_upload(
+        db: Session,
+        user_id: UUID,
+        upload: UploadFile,
+        max_side: int = IMAGE_MAX_SIDE,
+    ) -> Dict[str, Any]:
+        """
+        Stream an uploaded image to disk, downscale it and store it as a blob.
+
+        The upload is copied to a temporary file in chunks, so it never sits
+        in memory as a whole. Resizing and re-encoding run in a process pool
+        to keep the event loop free.
+
+        Args:
+            db: Database session
+            user_id: UUID of the uploading user, who then owns the blob
+            upload: Uploaded file
+            max_side: Largest allowed width or height in pixels
+
+        Returns:
+            Dictionary with the image reference, size, content type and
+            dimensions; the blob is not yet referenced by a message
+
+        Raises:
+            ImageTooLargeError: If the upload exceeds IMAGE_UPLOAD_MAX_BYTES
+            InvalidImageError: If the upload is not an image
+        """
+        fd, tmp_name = tempfile.mkstemp(dir=blob_store.temp_dir(), prefix=".tmp-")
+        paths = {tmp_name}
+        width = height = None
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > IMAGE_UPLOAD_MAX_BYTES:
+                        raise ImageTooLargeError(
+                            f"Image exceeds {IMAGE_UPLOAD_MAX_BYTES} bytes"
+                        )
+                    tmp.write(chunk)
+
+            with open(tmp_name, "rb") as tmp:
+                content_type = sniff_content_type(tmp.read(16))
+
+            if pillow_available():
+                loop = asyncio.get_running_loop()
+                try:
+                    processed = await loop.run_in_executor(
+                        _get_process_pool(), downscale_image, tmp_name, max_side
+                    )
+                except ValueError as e:
+                    raise InvalidImageError(str(e))
+                paths.add(processed["path"])
+                output = processed["path"]
+                content_type = processed["content_type"]
+                width, height = processed["width"], processed["height"]
+            else:
+                if content_type == "application/octet-stream":
+                    raise InvalidImageError("Unsupported image format")
+                app_logger.warning("Pillow is not installed, storing image as is")
+                output = tmp_name
+
+            output_size = os.path.getsize(output)
+            digest = blob_store.put_file(Path(output))
+            paths.discard(output)
+
+            db.execute(
+                dialect_insert(db, ImageBlob)
+                .values(
+                    digest=digest,
+                    size=output_size,
+                    content_type=content_type,
+                    ref_count=0,
+                )
+                # Restart the garbage collection grace of an orphaned blob
+                .on_conflict_do_update(
+                    index_elements=["digest"], set_={"updated_at": datetime.now()}
+                )
+            )
+            ImageService._add_owners(db, user_id, [digest])
+            db.commit()
+            app_logger.info(
+                f"Stored uploaded image {digest}: {size} -> {output_size} bytes"
+            )
+            return {
+                "ref": make_ref(digest),
+                "size": output_size,
+                "original_size": size,
+                "content_type": content_type,
+                "width": width,
+                "height": height,
+            }
+        finally:
+            for path in paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    @staticmethod
+    def release_images(db: Session, image_lists: Iterable[Optional[List[str]]]) -> None:
+        """Drop the references held by messages that are deleted or replaced."""
+        counts = Counter(
+            ref_digest(image)
+            for images in image_lists
+            for image in images or []
+            if is_image_ref(image)
+        )
+        if counts:
+            ImageService._adjust_refs(db, counts, -1)
+
+    @staticmethod
+    def _adjust_refs(db: Session, counts: Counter, sign: int) -> None:
+        for digest, count in counts.items():
+            db.query(ImageBlob).filter(ImageBlob.digest == digest).update(
+                {ImageBlob.ref_count: ImageBlob.ref_count + sign * count},
+                synchronize_session=False,
+            )
+
+    @staticmethod
+    def payload_size(image: str) -> int:
+        """Size of an image as base64 in a request to Ollama."""
+        if not is_image_ref(image):
+            return len(image)
+        try:
+            size = blob_store.path_for(ref_digest(image)).stat().st_size
+        except FileNotFoundError:
+            return 0
+        return (size + 2) // 3 * 4
+
+    @staticmethod
+    def resolve_for_ollama(
+        db: Session, user_id: UUID, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Replace image references with base64 data for an Ollama request.
+
+        References to blobs the user does not own are dropped.
+        """
+        owned = ImageService.owned_digests(
+            db,
+            user_id,
+            (
+                ref_digest(image)
+                for message in messages
+                for image in message.get("images") or []
+                if is_image_ref(image)
+            ),
+        )
+        resolved = []
+        for message in messages:
+            images = message.get("images")
+            if images and any(is_image_ref(image) for image in images):
+                inline = []
+                for image in images:
+                    if not is_image_ref(image):
+                        inline.append(image)
+                        continue
+                    if ref_digest(image) not in owned:
+                        app_logger.warning(f"Image {image} not owned by {user_id}")
+                        continue
+                    try:
+                        data = blob_store.read(ref_digest(image))
+                    except FileNotFoundError:
+                        app_logger.warning(f"Image {image} missing from blob store")
+                        continue
+                    inline.append(base64.b64encode(data).decode("ascii"))
+                message = {**message, "images": inline}
+            resolved.append(message)
+        return resolved
+
+    @staticmethod
+    def collect_garbage(db: Session, grace: timedelta = GC_GRACE) -> int:
+        """
+        Delete blobs that no message references anymore.
+
+        Returns:
+            Number of deleted blobs
+        """
+        cutoff = datetime.now() - grace
+        orphans = (
+            db.query(ImageBlob)
+            .filter(ImageBlob.ref_count <= 0, ImageBlob.updated_at < cutoff)
+            .all()
+        )
+        for blob in orphans:
+            blob_store.delete(str(blob.digest))
+            db.query(ImageBlobOwner).filter(
+                ImageBlobOwner.digest == blob.digest
+            ).delete(synchronize_session=False)
+            db.delete(blob)
+        db.commit()
+
+        if orphans:
+            app_logger.info(f"Garbage collected {len(orphans)} unreferenced images")
+        return len(orphans)
@@ -0,0 +1,217 @@
+"""
+Full-text search over the messages of a user.
+
+Backed by the index from migration ``0003_message_search``: a GIN index on
+``to_tsvector('simple', content)`` on Postgres, an FTS5 table on SQLite whose
+rows are matched to messages through ``messages_fts_keys`` (migration
+``0007_message_search_keys``). Both are maintained by the database as
+messages are inserted, edited and deleted.
+
+Every word of the query must match, the last one as a prefix so results
+update while typing. Results are ordered by relevance and paginated with a
+(score, id) cursor. Snippets are computed only for the returned page.
+"""
+
+import html
+import re
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, func, literal_column, or_, select, table
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+from src.core.pagination import decode_score_cursor, encode_score_cursor
+from src.models.chat_models import Chat, Message
+from src.models.user import User
+
+SEARCH_MAX_TERMS = 8
+SNIPPET_WORDS = 16
+
+_TERM = re.compile(r"\w+")
+# Highlight markers that cannot occur in escaped HTML
+_START, _STOP = "\x02", "\x03"
+
+_TEXT_CONFIG = literal_column("'simple'")
+_FTS = table("messages_fts")
+_FTS_MATCH = literal_column("messages_fts")
+_FTS_KEYS = table("messages_fts_keys")
+_FTS_ROWID = literal_column("messages_fts.rowid")
+_KEY_ID = literal_column("messages_fts_keys.id")
+_KEY_MESSAGE_ID = literal_column("messages_fts_keys.message_id")
+
+
+class SearchUnavailableError(RuntimeError):
+    """Raised when the database has no full-text index yet"""
+
+
+def parse_terms(query: str) -> List[str]:
+    """Words of a search query, lower case and without operators."""
+    return _TERM.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+
+def highlight(snippet: str) -> str:
+    """HTML escape a snippet and turn its match markers into <mark> tags."""
+    return (
+        html.escape(snippet)
+        .replace(_START, "<mark>")
+        .replace(_STOP, "</mark>")
+    )
+
+
+def _postgres_query(terms: List[str]) -> Any:
+    expression = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+    return func.to_tsquery(_TEXT_CONFIG, expression)
+
+
+def _sqlite_query(terms: List[str]) -> str:
+    return " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+class SearchService:
+    """Service class for searching messages"""
+
+    @staticmethod
+    def search_messages(
+        db: Session,
+        user: User,
+        query: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """
+        Search the messages of a user's chats.
+
+        Args:
+            db: Database session
+            user: User object
+            query: Words to search for
+            limit: Maximum number of results
+            cursor: next_cursor of the previous page
+
+        Returns:
+            Dictionary with ranked results, highlighted snippets and next_cursor
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+            SearchUnavailableError: If the search index has not been created
+        """
+        terms = parse_terms(query)
+        if not terms:
+            return {"results": [], "next_cursor": None}
+
+        if db.get_bind().dialect.name == "sqlite":
+            match = _FTS_MATCH.op("MATCH")(_sqlite_query(terms))
+            ranked = (
+                select(
+                    Message.id.label("id"),
+                    (-func.bm25(_FTS_MATCH)).label("score"),
+                )
+                .select_from(_FTS)
+                .join(_FTS_KEYS, _KEY_ID == _FTS_ROWID)
+                .join(Message, Message.id == _KEY_MESSAGE_ID)
+                .join(Chat, Chat.id == Message.chat_id)
+                .where(match, Chat.user_id == user.id)
+            )
+        else:
+            document = func.to_tsvector(_TEXT_CONFIG, Message.content)
+            ts_query = _postgres_query(terms)
+            ranked = (
+                select(
+                    Message.id.label("id"),
+                    func.ts_rank_cd(document, ts_query).label("score"),
+                )
+                .join(Chat, Chat.id == Message.chat_id)
+                .where(document.op("@@")(ts_query), Chat.user_id == user.id)
+            )
+
+        ranked = ranked.subquery()
+        page = select(ranked.c.id, ranked.c.score)
+        if cursor:
+            score, row_id = decode_score_cursor(cursor)
+            page = page.where(
+                or_(
+                    ranked.c.score < score,
+                    and_(ranked.c.score == score, ranked.c.id > row_id),
+                )
+            )
+        page = page.order_by(ranked.c.score.desc(), ranked.c.id).limit(limit + 1)
+
+        try:
+            hits = db.execute(page).all()
+        except OperationalError as e:
+            if "messages_fts" not in str(e):
+                raise
+            app_logger.error("Search index missing, apply the migrations")
+            raise SearchUnavailableError("Search is not available")
+
+        has_more = len(hits) > limit
+        hits = hits[:limit]
+        details = SearchService._page_details(db, terms, [hit.id for hit in hits])
+
+        results = [
+            {**details[hit.id], "score": hit.score} for hit in hits if hit.id in details
+        ]
+        next_cursor = (
+            encode_score_cursor(hits[-1].score, hits[-1].id) if has_more else None
+        )
+        app_logger.debug(
+            f"Search for {terms} by user {user.id} returned {len(results)} results"
+        )
+        return {"results": results, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _page_details(
+        db: Session, terms: List[str], message_ids: List[UUID]
+    ) -> Dict[UUID, Dict]:
+        """Chat, role, time and highlighted snippet of the messages of a page."""
+        if not message_ids:
+            return {}
+
+        if db.get_bind().dialect.name == "sqlite":
+            snippet = func.snippet(
+                _FTS_MATCH, 0, _START, _STOP, "…", SNIPPET_WORDS
+            )
+            query = (
+                select(Message.id, snippet)
+                .select_from(_FTS)
+                .join(_FTS_KEYS, _KEY_ID == _FTS_ROWID)
+                .join(Message, Message.id == _KEY_MESSAGE_ID)
+                .where(
+                    _FTS_MATCH.op("MATCH")(_sqlite_query(terms)),
+                    Message.id.in_(message_ids),
+                )
+            )
+        else:
+            options = (
+                f'StartSel="{_START}", StopSel="{_STOP}", '
+                f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+            )
+            snippet = func.ts_headline(
+                _TEXT_CONFIG, Message.content, _postgres_query(terms), options
+            )
+            query = select(Message.id, snippet).where(Message.id.in_(message_ids))
+        snippets = dict(db.execute(query).all())
+
+        rows = (
+            db.query(
+                Message.id,
+                Message.chat_id,
+                Chat.title,
+                Message.role,
+                Message.created_at,
+            )
+            .join(Chat, Chat.id == Message.chat_id)
+            .filter(Message.id.in_(message_ids))
+        )
+        return {
+            row.id: {
+                "message_id": row.id,
+                "chat_id": row.chat_id,
+                "chat_title": row.title,
+                "role": row.role,
+                "created_at": row.created_at,
+                "snippet": highlight(snippets.get(row.id) or ""),
+            }
+            for row in rows
+        }
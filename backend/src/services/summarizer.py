@@ -0,0 +1,256 @@
+"""
+Rolling summarization of long chats.
+
+Once the part of a chat's history that is not yet summarized grows past
+``CHAT_SUMMARY_THRESHOLD_TOKENS``, a background job asks a (small) model to
+fold the older turns into the chat's running summary. Later turns then send
+the summary plus the recent turns instead of the full history, which keeps
+prompt evaluation time flat on very long chats.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Set
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+from src.core.logger import app_logger
+from src.database import SessionLocal
+from src.models.chat_models import ChatSummary
+from src.services.chat_models import OllamaService
+from src.services.context_window import estimate_message_tokens, estimate_text_tokens
+
+CHAT_SUMMARY_ENABLED = os.getenv("CHAT_SUMMARY_ENABLED", "false").lower() == "true"
+# Model used for summaries; empty means the chat's own model
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "")
+CHAT_SUMMARY_THRESHOLD_TOKENS = int(
+    os.getenv("CHAT_SUMMARY_THRESHOLD_TOKENS", "3000")
+)
+# Most recent messages that are always sent verbatim
+CHAT_SUMMARY_KEEP_RECENT = int(os.getenv("CHAT_SUMMARY_KEEP_RECENT", "6"))
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below so it can replace the original messages "
+    "as context for later turns. Keep facts, decisions, names, numbers, code "
+    "identifiers and open questions. Write in third person and be concise."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Chats with a summary job running in this process
+_running: Set[UUID] = set()
+
+
+def _history_hash(messages: List[Dict[str, Any]]) -> str:
+    """Hash of the roles and contents of a message prefix."""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(
+            json.dumps([message.get("role"), message.get("content")]).encode("utf-8")
+        )
+    return digest.hexdigest()
+
+
+def _split_system(messages: List[Dict[str, Any]]):
+    system = [m for m in messages if m.get("role") == "system"]
+    conversation = [m for m in messages if m.get("role") != "system"]
+    return system, conversation
+
+
+class ConversationSummaryService:
+    """Service class for compacting long chat histories"""
+
+    @staticmethod
+    def apply_summary(
+        db: Session, chat_id: UUID, messages: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Replace the summarized prefix of a history with the stored summary.
+
+        The summary is only used when the history still starts with exactly
+        the messages it was built from, so edited or deleted turns fall back
+        to the full history.
+
+        Returns:
+            Dictionary with the messages to send, whether a summary was
+            applied and the estimated prompt tokens saved
+        """
+        result = {"messages": messages, "summary_applied": False, "tokens_saved": 0}
+        if not CHAT_SUMMARY_ENABLED:
+            return result
+
+        summary = db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).first()
+        if not summary:
+            return result
+
+        system, conversation = _split_system(messages)
+        covered = int(summary.covered_messages)
+        if len(conversation) <= covered:
+            return result
+        if _history_hash(conversation[:covered]) != summary.covered_hash:
+            app_logger.info(f"Stored summary for chat {chat_id} no longer matches")
+            return result
+
+        summary_message = {
+            "role": "system",
+            "content": SUMMARY_PREFIX + str(summary.content),
+        }
+        tokens_saved = max(
+            int(summary.covered_tokens) - int(summary.summary_tokens), 0
+        )
+        result.update(
+            messages=system + [summary_message] + conversation[covered:],
+            summary_applied=True,
+            tokens_saved=tokens_saved,
+        )
+        app_logger.debug(
+            f"Applied summary to chat {chat_id}: replaced {covered} messages, "
+            f"saved ~{tokens_saved} tokens"
+        )
+        return result
+
+    @staticmethod
+    def record_savings(db: Session, chat_id: UUID, tokens_saved: int) -> None:
+        """Add one compacted turn to the chat's savings counters (no commit)."""
+        db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).update(
+            {
+                ChatSummary.prompt_tokens_saved: ChatSummary.prompt_tokens_saved
+                + tokens_saved,
+                ChatSummary.turns_compacted: ChatSummary.turns_compacted + 1,
+            },
+            synchronize_session=False,
+        )
+
+    @staticmethod
+    def needs_summary(
+        db: Session, chat_id: UUID, messages: List[Dict[str, Any]]
+    ) -> bool:
+        """Whether the unsummarized part of a history passed the threshold."""
+        if not CHAT_SUMMARY_ENABLED or chat_id in _running:
+            return False
+
+        _, conversation = _split_system(messages)
+        summary = db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).first()
+        covered = 0
+        if summary and _history_hash(
+            conversation[: int(summary.covered_messages)]
+        ) == str(summary.covered_hash):
+            covered = int(summary.covered_messages)
+
+        candidates = conversation[covered : len(conversation) - CHAT_SUMMARY_KEEP_RECENT]
+        pending = sum(estimate_message_tokens(message) for message in candidates)
+        return pending > CHAT_SUMMARY_THRESHOLD_TOKENS
+
+    @staticmethod
+    async def summarize_chat(
+        chat_id: UUID,
+        chat_model: str,
+        messages: List[Dict[str, Any]],
+        session_factory: Callable[[], Session] = SessionLocal,
+    ) -> Optional[ChatSummary]:
+        """
+        Fold all but the most recent messages into the chat's summary.
+
+        Meant to run as a background task after a turn has been answered.
+
+        Args:
+            chat_id: Chat to summarize
+            chat_model: Model of the chat, used when no summary model is set
+            messages: Full history including the latest answer
+            session_factory: Factory for the job's own database session
+
+        Returns:
+            The stored summary, or None if nothing was summarized
+        """
+        if chat_id in _running:
+            return None
+        _running.add(chat_id)
+
+        db = session_factory()
+        try:
+            _, conversation = _split_system(messages)
+            new_covered = len(conversation) - CHAT_SUMMARY_KEEP_RECENT
+            if new_covered <= 0:
+                return None
+
+            summary = (
+                db.query(ChatSummary).filter(ChatSummary.chat_id == chat_id).first()
+            )
+            previous = ""
+            start = 0
+            if summary and _history_hash(
+                conversation[: int(summary.covered_messages)]
+            ) == str(summary.covered_hash):
+                previous = str(summary.content)
+                start = int(summary.covered_messages)
+            if start >= new_covered:
+                return summary
+
+            transcript = "\n\n".join(
+                f"{message.get('role', 'user').capitalize()}: {message.get('content', '')}"
+                for message in conversation[start:new_covered]
+            )
+            prompt = (
+                f"Previous summary:\n{previous}\n\nNew messages:\n{transcript}"
+                if previous
+                else f"Conversation:\n{transcript}"
+            )
+            model = CHAT_SUMMARY_MODEL or chat_model
+            app_logger.info(
+                f"Summarizing {new_covered - start} messages of chat {chat_id} "
+                f"with {model}"
+            )
+
+            response = await OllamaService.chat_with_model(
+                {
+                    "model": model,
+                    "messages": [
+                        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                        {"role": "user", "content": prompt},
+                    ],
+                    "stream": False,
+                    "options": {"temperature": 0.2},
+                }
+            )
+            content = (response.get("message") or {}).get("content", "").strip()
+            if "error" in response or not content:
+                app_logger.error(
+                    f"Failed to summarize chat {chat_id}: {response.get('error')}"
+                )
+                return None
+
+            covered_tokens = sum(
+                estimate_message_tokens(message)
+                for message in conversation[:new_covered]
+            )
+            values = {
+                "content": content,
+                "model": model,
+                "covered_messages": new_covered,
+                "covered_hash": _history_hash(conversation[:new_covered]),
+                "covered_tokens": covered_tokens,
+                "summary_tokens": estimate_text_tokens(SUMMARY_PREFIX + content),
+            }
+            if summary:
+                for key, value in values.items():
+                    setattr(summary, key, value)
+            else:
+                summary = ChatSummary(chat_id=chat_id, **values)
+                db.add(summary)
+            db.commit()
+            db.refresh(summary)
+
+            app_logger.info(
+                f"Stored summary for chat {chat_id}: {new_covered} messages, "
+                f"~{covered_tokens} -> ~{values['summary_tokens']} tokens"
+            )
+            return summary
+        except Exception as e:
+            app_logger.error(
+                f"Error summarizing chat {chat_id}: {str(e)}", exc_info=True
+            )
+            db.rollback()
+            return None
+        finally:
+            db.close()
+            _running.discard(chat_id)
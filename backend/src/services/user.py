@@ -3,6 +3,7 @@ import uuid
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from src.auth.jwt import get_password_hash
+from src.core.ids import uuid7
 from src.core.logger import app_logger
 from src.models.user import User
 from src.models.user_settings import UserSettings
@@ -58,7 +59,7 @@ def create_user(db: Session, user: UserCreate) -> User:
     # Create user
     hashed_password = get_password_hash(user.password)
     db_user = User(
-        id=uuid.uuid4(),
+        id=uuid7(),
         username=user.username,
         email=user.email,
         password_hash=hashed_password,
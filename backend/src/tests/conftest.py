@@ -0,0 +1,108 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.auth.jwt import create_access_token
+from src.database import Base, get_db, get_session_factory
+from src.main import app
+from src.models.chat_models import Chat
+from src.models.user import User
+
+
+@pytest.fixture
+def db_engine():
+    """Isolated in-memory SQLite database with all tables created"""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def statements(db_engine):
+    """SQL statements executed while the test runs"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+
+@pytest.fixture
+def db_session(session_factory):
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def chat_user(db_session):
+    """A regular active user"""
+    user = User(
+        username="chatuser",
+        email="chatuser@example.com",
+        password_hash="hashed_password",
+        role="user",
+        is_active=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def user_chat(db_session, chat_user):
+    """An empty chat owned by chat_user"""
+    chat = Chat(user_id=chat_user.id, title="New Chat")
+    db_session.add(chat)
+    db_session.commit()
+    db_session.refresh(chat)
+    return chat
+
+
+@pytest.fixture
+def client(session_factory, chat_user):
+    """Test client bound to the isolated database and logged in as chat_user"""
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+
+    access_token = create_access_token(
+        data={"sub": str(chat_user.id), "username": chat_user.username},
+        token_version=chat_user.token_version,
+    )
+    test_client = TestClient(app)
+    test_client.cookies.set("access_token", access_token)
+    yield test_client
+
+    app.dependency_overrides.pop(get_session_factory, None)
+    if previous is None:
+        app.dependency_overrides.pop(get_db, None)
+    else:
+        app.dependency_overrides[get_db] = previous
@@ -0,0 +1,214 @@
+import asyncio
+from datetime import timedelta
+from uuid import UUID
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from src.auth.jwt import create_access_token
+from src.core.channel import Channel
+from src.models.chat_models import Message
+from src.models.idempotency import IdempotencyRecord
+from src.models.user import User
+from src.services.chat_models import OllamaService
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    """Ollama streaming the words of the reply, optionally stalling midway"""
+    state = {"stall": False}
+
+    async def fake_stream(payload, on_chunk):
+        words = ["Hello", " there"]
+        for word in words:
+            await on_chunk({"message": {"role": "assistant", "content": word}})
+            if state["stall"]:
+                await asyncio.Event().wait()
+        return {
+            "message": {"role": "assistant", "content": "".join(words)},
+            "eval_count": 2,
+            "done": True,
+        }
+
+    async def fake_context_window(model_name, options=None):
+        return 4096
+
+    monkeypatch.setattr(OllamaService, "stream_chat", fake_stream)
+    monkeypatch.setattr(OllamaService, "get_context_window", fake_context_window)
+    return state
+
+
+def send_frame(chat, request_id="1"):
+    return {
+        "op": "send",
+        "id": request_id,
+        "request": {
+            "model": "llama3",
+            "chatId": str(chat.id),
+            "messages": [{"role": "user", "content": "Hi"}],
+        },
+    }
+
+
+def test_channel_streams_a_turn(client, db_session, user_chat, fake_ollama):
+    """Test that a turn sends its chunks, then the reply saved to the chat"""
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        ws.send_json(send_frame(user_chat))
+        frames = [ws.receive_json() for _ in range(3)]
+
+    assert [frame["type"] for frame in frames] == ["chunk", "chunk", "done"]
+    assert frames[0] == {
+        "type": "chunk",
+        "id": "1",
+        "message": {"role": "assistant", "content": "Hello"},
+    }
+    done = frames[2]
+    assert done["replayed"] is False
+    assert done["response"]["message"]["content"] == "Hello there"
+    assert done["response"]["chat"]["title"] == "Hi"
+    reply = db_session.get(Message, UUID(done["response"]["id"]))
+    assert reply.content == "Hello there"
+
+
+def test_channel_cancels_a_turn(client, db_session, user_chat, fake_ollama):
+    """Test that a cancelled turn saves nothing and releases its key"""
+    fake_ollama["stall"] = True
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        ws.send_json(send_frame(user_chat))
+        assert ws.receive_json()["type"] == "chunk"
+        ws.send_json({"op": "cancel", "id": "1"})
+        assert ws.receive_json() == {"type": "cancelled", "id": "1"}
+
+        ws.send_json({"op": "ping", "id": "2"})
+        assert ws.receive_json() == {"type": "pong", "id": "2"}
+
+    assert db_session.query(Message).count() == 0
+    assert db_session.query(IdempotencyRecord).count() == 0
+
+
+def test_channel_reports_errors(client, user_chat, fake_ollama):
+    """Test that bad frames and unknown chats get error frames"""
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["status"] == 400
+
+        ws.send_json({"op": "send", "id": "1", "request": {"model": "llama3"}})
+        assert ws.receive_json()["status"] == 422
+
+        frame = send_frame(user_chat, "2")
+        frame["request"]["chatId"] = "00000000-0000-0000-0000-000000000000"
+        ws.send_json(frame)
+        assert ws.receive_json() == {
+            "type": "error",
+            "id": "2",
+            "status": 404,
+            "detail": "Chat not found",
+        }
+
+
+def test_channel_forwards_chat_events(client):
+    """Test that subscribed channels receive chat-list events"""
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        ws.send_json({"op": "subscribe"})
+        ws.send_json({"op": "ping"})
+        assert ws.receive_json()["type"] == "pong"
+
+        chat = client.post("/api/v1/chats/my", json={"title": "Plans"}).json()
+        frame = ws.receive_json()
+
+    assert frame["type"] == "event"
+    assert frame["event"]["type"] == "chat.created"
+    assert frame["event"]["chat_id"] == chat["id"]
+
+
+def test_channel_requires_login(client):
+    """Test that the socket is refused without a valid session cookie"""
+    client.cookies.clear()
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/ollama/ws"):
+            pass
+
+
+def test_channel_send_waits_for_slow_client():
+    """Test that a full send queue holds producers back"""
+
+    class SlowSocket:
+        def __init__(self):
+            self.sent = []
+            self.ready = asyncio.Event()
+
+        async def send_text(self, text):
+            await self.ready.wait()
+            self.sent.append(text)
+
+    async def scenario():
+        socket = SlowSocket()
+        channel = Channel(socket, queue_size=2, max_tasks=1)
+        writer = asyncio.create_task(channel._write())
+
+        # One frame is held by the writer, two fill the queue
+        for i in range(3):
+            await asyncio.wait_for(channel.send({"n": i}), 1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(channel.send({"n": 3}), 0.05)
+
+        async def idle():
+            await asyncio.sleep(10)
+
+        assert channel.start("a", idle())
+        assert not channel.start("b", idle())
+        assert channel.start("events", idle(), limited=False)
+
+        socket.ready.set()
+        await asyncio.wait_for(channel.send({"n": 3}), 1)
+        for task in [writer, *channel._tasks.values()]:
+            task.cancel()
+        return socket.sent
+
+    assert len(asyncio.run(scenario())) >= 3
+
+
+def test_channel_refuses_foreign_origins(client):
+    """Test that sockets opened by other sites are refused"""
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(
+            "/api/v1/ollama/ws", headers={"Origin": "https://evil.example"}
+        ):
+            pass
+
+    with client.websocket_connect(
+        "/api/v1/ollama/ws", headers={"Origin": "http://localhost:5173"}
+    ) as ws:
+        ws.send_json({"op": "ping", "id": "1"})
+        assert ws.receive_json() == {"type": "pong", "id": "1"}
+
+
+def test_channel_closes_after_logout(client, db_session, chat_user, monkeypatch):
+    """Test that the socket is closed once its token version is revoked"""
+    monkeypatch.setattr("src.routers.ollama.WS_AUTH_CHECK_SECONDS", 0.05)
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        ws.send_json({"op": "ping", "id": "1"})
+        assert ws.receive_json() == {"type": "pong", "id": "1"}
+
+        user = db_session.get(User, chat_user.id)
+        user.token_version += 1
+        db_session.commit()
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert closed.value.code == 4401
+
+
+def test_channel_closes_when_the_token_expires(client, chat_user):
+    """Test that the socket does not outlive its access token"""
+    token = create_access_token(
+        data={"sub": str(chat_user.id), "username": chat_user.username},
+        token_version=chat_user.token_version,
+        expires_delta=timedelta(seconds=1),
+    )
+    client.cookies.set("access_token", token)
+    with client.websocket_connect("/api/v1/ollama/ws") as ws:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert closed.value.code == 4401
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from src.models.chat_models import Chat, ChatStats, Message, UserChatStats
+from src.models.sync import SyncChange
+from src.models.user import User
+from src.services import chat_export
+from src.services.chat_export import ChatExportService, ndjson_lines, spooled
+
+
+def add_history(db_session, user, chats=2, messages=3):
+    start = datetime(2025, 1, 1)
+    for i in range(chats):
+        chat = Chat(user_id=user.id, title=f"Chat {i}", created_at=start)
+        db_session.add(chat)
+        db_session.flush()
+        db_session.add_all(
+            Message(
+                chat_id=chat.id,
+                role="user" if j % 2 == 0 else "assistant",
+                content=f"Message {i}.{j}",
+                thinking="Hmm" if j % 2 else None,
+                created_at=start + timedelta(seconds=j),
+                tokens_used=j,
+            )
+            for j in range(messages)
+        )
+    db_session.commit()
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_ndjson(client, db_session, chat_user):
+    """Test that the export lists each chat followed by its messages"""
+    add_history(db_session, chat_user)
+    response = client.get("/api/v1/chats/export")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    assert "attachment" in response.headers["Content-Disposition"]
+
+    header, *lines = ndjson(response)
+    assert header["type"] == "export" and header["version"] == 1
+    assert [line["type"] for line in lines] == ["chat", *["message"] * 3] * 2
+    chat, first, second = lines[:3]
+    assert chat["title"] == "Chat 0"
+    assert first["chat_id"] == chat["id"]
+    assert (first["content"], second["thinking"]) == ("Message 0.0", "Hmm")
+
+
+def test_export_json_matches_ndjson(client, db_session, chat_user, user_chat):
+    """Test that the JSON export nests the same chats and messages"""
+    add_history(db_session, chat_user)
+    document = client.get("/api/v1/chats/export?format=json").json()
+    header, *lines = ndjson(client.get("/api/v1/chats/export"))
+
+    assert document["version"] == header["version"]
+    chats = [
+        {**{k: v for k, v in line.items() if k != "type"}, "messages": []}
+        for line in lines
+        if line["type"] == "chat"
+    ]
+    by_id = {chat["id"]: chat for chat in chats}
+    for line in lines:
+        if line["type"] == "message":
+            by_id[line["chat_id"]]["messages"].append(
+                {k: v for k, v in line.items() if k != "type"}
+            )
+    assert document["chats"] == chats
+    # Chats without messages are exported too
+    assert any(chat["messages"] == [] for chat in document["chats"])
+
+
+def test_export_one_chat_and_other_users(client, db_session, chat_user, user_chat):
+    """Test exporting one chat, and that other accounts are admin only"""
+    add_history(db_session, chat_user, chats=1)
+    url = f"/api/v1/chats/export?chat_id={user_chat.id}"
+    assert [line["type"] for line in ndjson(client.get(url))] == ["export", "chat"]
+
+    other = "00000000-0000-0000-0000-000000000000"
+    assert client.get(f"/api/v1/chats/export?chat_id={other}").status_code == 404
+    assert client.get(f"/api/v1/chats/export?user_id={other}").status_code == 403
+
+    db_session.query(User).filter(User.id == chat_user.id).update({"role": "admin"})
+    db_session.commit()
+    assert client.get(f"/api/v1/chats/export?user_id={other}").status_code == 404
+
+
+def test_export_streams_in_chunks(session_factory, db_session, chat_user, monkeypatch):
+    """Test that the export is produced in chunks rather than all at once"""
+    add_history(db_session, chat_user, chats=3, messages=20)
+    monkeypatch.setattr(chat_export, "CHAT_EXPORT_BATCH_SIZE", 5)
+    monkeypatch.setattr(chat_export, "CHAT_EXPORT_CHUNK_BYTES", 1024)
+
+    chunks = list(ChatExportService.export_ndjson(session_factory, chat_user.id))
+    assert len(chunks) > 5
+    lines = b"".join(chunks).splitlines()
+    assert len(lines) == 1 + 3 * 21
+
+
+def test_import_round_trip(client, db_session, chat_user, monkeypatch):
+    """Test that an export imports as new chats, in batches"""
+    monkeypatch.setattr(chat_export, "CHAT_IMPORT_BATCH_SIZE", 2)
+    add_history(db_session, chat_user)
+    exported = client.get("/api/v1/chats/export").content
+
+    response = client.post(
+        "/api/v1/chats/import",
+        content=exported,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 201
+    assert response.json() == {
+        "success": True,
+        "imported_chats": 2,
+        "imported_messages": 6,
+    }
+
+    db_session.expire_all()
+    assert db_session.query(Chat).count() == 4
+    assert db_session.query(Message).filter(Message.thinking == "Hmm").count() == 4
+    assert db_session.get(UserChatStats, chat_user.id).chat_count == 4
+    imported = db_session.query(Chat).order_by(Chat.created_at, Chat.id).all()[-1]
+    assert db_session.get(ChatStats, imported.id).message_count == 3
+    assert (
+        db_session.query(SyncChange).filter(SyncChange.entity == "message").count()
+        == 6
+    )
+
+
+def test_import_rejects_invalid_lines(client, db_session):
+    """Test that an invalid line fails the whole import"""
+    chat = {"type": "chat", "id": "00000000-0000-0000-0000-000000000001"}
+    message = {
+        "type": "message",
+        "chat_id": "00000000-0000-0000-0000-000000000002",
+        "role": "user",
+        "content": "Hi",
+    }
+    body = "\n".join(json.dumps(line) for line in [chat, message])
+
+    response = client.post("/api/v1/chats/import", content=body)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 2: Unknown chat")
+    assert db_session.query(Chat).count() == 0
+
+    response = client.post("/api/v1/chats/import", content=json.dumps(chat) + "\n{")
+    assert response.json()["detail"] == "Line 2: Invalid JSON"
+
+
+def test_import_reads_lines_after_the_whole_upload(monkeypatch):
+    """Test that no line reaches the importer while the client is uploading"""
+    monkeypatch.setattr(chat_export, "CHAT_IMPORT_SPOOL_MEMORY_BYTES", 4)
+    received = []
+
+    async def upload():
+        for chunk in [b'{"a": 1}\n{"b"', b": 2}\n", b'{"c": 3}']:
+            received.append(chunk)
+            yield chunk
+
+    async def scenario():
+        lines = []
+        async for number, text in ndjson_lines(spooled(upload())):
+            lines.append((number, text, len(received)))
+        return lines
+
+    assert asyncio.run(scenario()) == [
+        (1, b'{"a": 1}', 3),
+        (2, b'{"b": 2}', 3),
+        (3, b'{"c": 3}', 3),
+    ]
@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import delete
+
+from src.models.chat_models import (
+    Chat,
+    ChatPurgeJob,
+    ChatStats,
+    Message,
+    UserChatStats,
+)
+from src.schemas import chat as schemas
+from src.services import chat as chat_service
+from src.services.chat_models import OllamaService
+from src.services.chat_purge import ChatPurgeService
+
+
+def test_chat_list_cursor_pages(client, db_session, chat_user):
+    """Test that cursor pages cover every chat once, newest first"""
+    start = datetime(2025, 1, 1)
+    db_session.add_all(
+        Chat(
+            user_id=chat_user.id,
+            title=f"chat {i}",
+            updated_at=start + timedelta(minutes=i // 3),
+        )
+        for i in range(25)
+    )
+    db_session.commit()
+
+    seen = []
+    params = {"limit": 10}
+    while True:
+        body = client.get("/api/v1/chats/my", params=params).json()
+        seen.extend(chat["id"] for chat in body["chats"])
+        if body["next_cursor"] is None:
+            break
+        params["cursor"] = body["next_cursor"]
+
+    by_offset = client.get("/api/v1/chats/my", params={"limit": 100}).json()
+    assert seen == [chat["id"] for chat in by_offset["chats"]]
+    assert len(set(seen)) == 25
+
+    bad = client.get("/api/v1/chats/my", params={"cursor": "bad"})
+    assert bad.status_code == 400
+
+
+def test_chat_count_is_maintained(client, db_session, chat_user):
+    """Test that the counters follow creates, archives and deletes"""
+    ids = [client.post("/api/v1/chats/my").json()["id"] for _ in range(3)]
+    client.patch(f"/api/v1/chats/chat/{ids[0]}", json={"is_archived": True})
+    client.delete(f"/api/v1/chats/chat/{ids[1]}")
+
+    stats = db_session.get(UserChatStats, chat_user.id)
+    assert (stats.chat_count, stats.archived_count) == (2, 1)
+
+    assert client.get("/api/v1/chats/my").json()["total"] == 1
+    listing = client.get("/api/v1/chats/my", params={"include_archived": True})
+    assert listing.json()["total"] == 2
+    assert client.get("/api/v1/chats/my", params={"total": "none"}).json()["total"] is None
+
+
+def test_exact_total_repairs_counter(client, db_session, chat_user):
+    """Test that total=exact recounts and stores the result"""
+    client.post("/api/v1/chats/my")
+    db_session.query(UserChatStats).update({UserChatStats.chat_count: 42})
+    db_session.commit()
+
+    assert client.get("/api/v1/chats/my").json()["total"] == 42
+    assert client.get("/api/v1/chats/my", params={"total": "exact"}).json()["total"] == 1
+    assert client.get("/api/v1/chats/my").json()["total"] == 1
+
+
+def test_chat_list_includes_message_stats(client, db_session, user_chat):
+    """Test that previews and counts follow message changes"""
+    url = f"/api/v1/chats/{user_chat.id}/messages"
+    client.post(url, json={"role": "user", "content": "Hello\n  there"})
+    second = client.post(url, json={"role": "user", "content": "Second one"}).json()
+
+    stats = client.get("/api/v1/chats/my").json()["chats"][0]["stats"]
+    assert stats["message_count"] == 2
+    assert stats["last_message_preview"] == "Second one"
+
+    client.patch(f"{url}/{second['id']}", json={"content": "Edited"})
+    stats = client.get("/api/v1/chats/my").json()["chats"][0]["stats"]
+    assert stats["last_message_preview"] == "Edited"
+
+    client.delete(f"{url}/{second['id']}")
+    stats = client.get("/api/v1/chats/my").json()["chats"][0]["stats"]
+    assert stats["message_count"] == 1
+    assert stats["last_message_preview"] == "Hello there"
+
+
+def test_missing_chat_stats_are_backfilled(client, db_session, user_chat):
+    """Test that chats without a stats row get one when listed"""
+    db_session.add(Message(chat_id=user_chat.id, role="user", content="old"))
+    db_session.commit()
+
+    stats = client.get("/api/v1/chats/my").json()["chats"][0]["stats"]
+
+    assert stats["message_count"] == 1
+    assert db_session.get(ChatStats, user_chat.id) is not None
+
+
+def test_chat_turn_updates_stats_and_title(client, monkeypatch, user_chat):
+    """Test that an Ollama reply is counted and names a new chat"""
+
+    async def fake_chat(payload):
+        return {
+            "message": {"role": "assistant", "content": "Hi!"},
+            "eval_count": 7,
+        }
+
+    async def fake_context_window(model_name, options=None):
+        return 4096
+
+    monkeypatch.setattr(OllamaService, "chat_with_model", fake_chat)
+    monkeypatch.setattr(OllamaService, "get_context_window", fake_context_window)
+
+    text = "Plan a trip to the mountains"
+    client.post(
+        f"/api/v1/chats/{user_chat.id}/messages", json={"role": "user", "content": text}
+    )
+    reply = client.post(
+        "/api/v1/ollama/chat",
+        json={
+            "model": "llama3",
+            "chatId": str(user_chat.id),
+            "messages": [{"role": "user", "content": text}],
+        },
+    )
+
+    assert reply.json()["chat"]["title"] == text
+    chat = client.get("/api/v1/chats/my").json()["chats"][0]
+    assert chat["stats"]["message_count"] == 2
+    assert chat["stats"]["total_tokens"] == 7
+    assert chat["stats"]["last_message_role"] == "assistant"
+
+
+def add_messages(db_session, chat, count):
+    db_session.add_all(
+        Message(chat_id=chat.id, role="user", content=f"message {i}")
+        for i in range(count)
+    )
+    db_session.add(ChatStats(chat_id=chat.id, message_count=count))
+    db_session.commit()
+
+
+def test_delete_chat_returns_counts(client, db_session, user_chat):
+    """Test that deleting a chat reports what was deleted"""
+    add_messages(db_session, user_chat, 3)
+
+    response = client.delete(f"/api/v1/chats/chat/{user_chat.id}")
+    assert response.json() == {
+        "success": True,
+        "message": "Chat and all messages deleted",
+        "deleted_chats": 1,
+        "deleted_messages": 3,
+        "purge_job_id": None,
+    }
+    assert db_session.query(Message).count() == 0
+    assert db_session.query(ChatStats).count() == 0
+    assert client.delete(f"/api/v1/chats/chat/{user_chat.id}").status_code == 404
+
+
+def test_large_deletes_are_purged_in_background(
+    client, db_session, session_factory, chat_user, monkeypatch
+):
+    """Test that big deletions detach the chats and purge them in scheduled"""
+    chats = [Chat(user_id=chat_user.id, title=f"chat {i}") for i in range(2)]
+    db_session.add_all(chats)
+    db_session.commit()
+    for chat in chats:
+        add_messages(db_session, chat, 5)
+
+    run = ChatPurgeService.run
+    scheduled = []
+    monkeypatch.setattr(chat_service, "CHAT_DELETE_SYNC_LIMIT", 4)
+    monkeypatch.setattr(
+        ChatPurgeService,
+        "run",
+        staticmethod(lambda job_id: scheduled.append(job_id)),
+    )
+
+    body = client.delete("/api/v1/chats/my").json()
+    job_id = body["purge_job_id"]
+    assert job_id and scheduled == [UUID(job_id)]
+    assert client.get("/api/v1/chats/my").json()["chats"] == []
+
+    progress = client.get(f"/api/v1/chats/purge/{job_id}").json()
+    assert (progress["status"], progress["total_messages"]) == ("pending", 10)
+
+    run(scheduled[0], session_factory=session_factory, batch_size=2)
+
+    progress = client.get(f"/api/v1/chats/purge/{job_id}").json()
+    assert progress["status"] == "done"
+    assert (progress["deleted_chats"], progress["deleted_messages"]) == (2, 10)
+    assert progress["finished_at"] is not None
+    db_session.expire_all()
+    assert db_session.query(Chat).count() == 0
+    assert db_session.query(Message).count() == 0
+    assert db_session.query(ChatPurgeJob).one().status == "done"
+
+
+def test_chat_delete_cascades_to_messages(db_session, user_chat):
+    """Test that deleting a chat row removes its messages in the database"""
+    add_messages(db_session, user_chat, 2)
+
+    db_session.execute(delete(Chat).where(Chat.id == user_chat.id))
+    db_session.commit()
+
+    assert db_session.query(Message).count() == 0
+    assert db_session.query(ChatStats).count() == 0
+
+
+def test_chat_list_title_filter(client, db_session, chat_user):
+    """Test that title_contains matches substrings, ignoring case and wildcards"""
+    titles = ["Docker setup", "Kubernetes vs docker", "Pasta recipes", "100% done"]
+    db_session.add_all(Chat(user_id=chat_user.id, title=title) for title in titles)
+    db_session.add(Chat(user_id=None, title="docker elsewhere"))
+    db_session.commit()
+
+    def titles_matching(text, **params):
+        body = client.get(
+            "/api/v1/chats/my", params={"title_contains": text, **params}
+        ).json()
+        return sorted(chat["title"] for chat in body["chats"]), body["total"]
+
+    assert titles_matching("DOCKER") == (
+        ["Docker setup", "Kubernetes vs docker"],
+        2,
+    )
+    assert titles_matching("%") == (["100% done"], 1)
+    assert titles_matching("_") == ([], 0)
+
+    first = client.get(
+        "/api/v1/chats/my", params={"title_contains": "docker", "limit": 1}
+    ).json()
+    second = client.get(
+        "/api/v1/chats/my",
+        params={"title_contains": "docker", "cursor": first["next_cursor"]},
+    ).json()
+    assert len(first["chats"]) == len(second["chats"]) == 1
+    assert second["next_cursor"] is None
+
+
+def test_list_responses_match_their_schemas(client, db_session, user_chat):
+    """Test that the row DTO responses serialize like their response models"""
+    db_session.add_all(
+        Message(
+            chat_id=user_chat.id,
+            role="assistant",
+            content=f"Reply {i} ✓",
+            thinking="Hmm",
+            images=["sha256:" + "0" * 64] if i == 0 else None,
+            tokens_used=i,
+        )
+        for i in range(3)
+    )
+    db_session.commit()
+
+    listing = client.get("/api/v1/chats/my").json()
+    assert listing == schemas.ChatListResponse.model_validate(listing).model_dump(
+        mode="json"
+    )
+
+    url = f"/api/v1/chats/chat/{user_chat.id}?include=images,thinking"
+    chat = client.get(url).json()
+    assert chat == schemas.ChatMessagesResponse.model_validate(chat).model_dump(
+        mode="json", exclude_unset=True
+    )
+    fields = {*chat_service.MESSAGE_FIELDS, "images", "thinking"}
+    assert set(chat["messages"][0]) == fields
+    assert chat["messages"][0]["images"] == ["sha256:" + "0" * 64]
+    assert chat["chat"]["stats"]["message_count"] == 3
@@ -0,0 +1,106 @@
+import asyncio
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from src.core.compression import (
+    CompressionMiddleware,
+    GzipEncoder,
+    available_encoders,
+    choose_encoding,
+)
+from src.models.chat_models import Message
+
+
+def test_choose_encoding():
+    """Test negotiation by q-value, then by server preference"""
+    offered = ["zstd", "br", "gzip"]
+    assert choose_encoding("gzip, deflate, br, zstd", offered) == "zstd"
+    assert choose_encoding("gzip;q=1.0, zstd;q=0.5", offered) == "gzip"
+    assert choose_encoding("*;q=0.1, gzip;q=0", offered) == "zstd"
+    assert choose_encoding("identity", offered) is None
+    assert choose_encoding("zstd;q=0", ["gzip"]) is None
+    assert choose_encoding(None, offered) is None
+
+
+def test_large_chat_is_compressed(client, db_session, user_chat):
+    """Test that a chat history above the threshold is sent compressed"""
+    for i in range(40):
+        db_session.add(
+            Message(chat_id=user_chat.id, role="user", content=f"Message {i} " * 10)
+        )
+    db_session.commit()
+    url = f"/api/v1/chats/chat/{user_chat.id}"
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+
+    for encoding in available_encoders():
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert int(response.headers["Content-Length"]) < len(plain.content) / 3
+        assert response.json() == plain.json()
+
+
+def test_small_response_is_not_compressed(client):
+    """Test that responses below the threshold are sent as they are"""
+    response = client.get("/api/v1/health", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streamed_chunks_are_flushed():
+    """Test that every streamed chunk can be decoded as soon as it arrives"""
+    chunks = [f"data: event {i}\n\n".encode() for i in range(3)]
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream")],
+            }
+        )
+        for i, chunk in enumerate(chunks):
+            more_body = i < len(chunks) - 1
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = CompressionMiddleware(app, encoders={"gzip": GzipEncoder})
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    asyncio.run(middleware(scope, None, send))
+
+    start, *bodies = sent
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk, message in zip(chunks, bodies):
+        assert decoder.decompress(message["body"]) == chunk
+    assert bodies[-1]["more_body"] is False
+
+
+def test_images_are_not_compressed():
+    """Test that content types other than JSON and text are left alone"""
+    app = FastAPI()
+
+    @app.get("/image")
+    async def image():
+        return PlainTextResponse("x" * 4096, media_type="image/svg+xml")
+
+    client = TestClient(CompressionMiddleware(app))
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.text == "x" * 4096
@@ -0,0 +1,71 @@
+import pytest
+
+from src.services.context_window import ContextWindowService
+
+
+@pytest.fixture(autouse=True)
+def reset_calibration():
+    ContextWindowService.reset_calibration()
+    yield
+    ContextWindowService.reset_calibration()
+
+
+def make_history(turns, words_per_message=200):
+    text = " ".join(["word"] * words_per_message)
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} {text}"})
+        messages.append({"role": "assistant", "content": f"answer {i} {text}"})
+    messages.append({"role": "user", "content": "latest question"})
+    return messages
+
+
+def test_short_history_is_not_trimmed():
+    """Test that history within the budget is sent unchanged"""
+    messages = make_history(2, words_per_message=10)
+
+    result = ContextWindowService.trim_history("llama3", messages, num_ctx=4096)
+
+    assert result["messages"] == messages
+    assert result["dropped"] == 0
+
+
+def test_long_history_keeps_system_prompt_and_recent_turns():
+    """Test that trimming drops the oldest turns first"""
+    messages = make_history(50)
+
+    result = ContextWindowService.trim_history("llama3", messages, num_ctx=4096)
+    kept = result["messages"]
+
+    assert result["dropped"] > 0
+    assert result["estimated_tokens"] <= result["budget"]
+    assert kept[0]["role"] == "system"
+    assert kept[1]["role"] == "user"
+    assert kept[-1] == messages[-1]
+    assert kept[-2] == messages[-2]
+
+
+def test_prompt_eval_count_calibrates_estimates():
+    """Test that real prompt sizes of first turns correct later estimates"""
+    messages = make_history(0)
+    estimated = ContextWindowService.estimate_prompt_tokens("llama3", messages)
+
+    ContextWindowService.record_prompt_eval(
+        "llama3", messages, estimated, estimated * 2 - 1
+    )
+
+    assert ContextWindowService.estimate_prompt_tokens("llama3", messages) > estimated
+    assert ContextWindowService.estimate_prompt_tokens("other", messages) == estimated
+
+
+def test_follow_up_turns_do_not_calibrate():
+    """Test that prompts partly served from Ollama's KV cache are ignored"""
+    messages = make_history(2)
+    estimated = ContextWindowService.estimate_prompt_tokens("llama3", messages)
+
+    # Only the latest question was evaluated, the rest came from the cache
+    ContextWindowService.record_prompt_eval(
+        "llama3", messages, estimated, int(estimated * 0.6)
+    )
+
+    assert ContextWindowService.estimate_prompt_tokens("llama3", messages) == estimated
@@ -0,0 +1,169 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.models.chat_models import Message
+from src.models.embedding import ContentEmbedding, MessageEmbedding
+from src.services import embeddings
+from src.services.chat_models import OllamaService
+from src.services.embeddings import EmbeddingService, pack_vector, unpack_vector
+
+VOCABULARY = ["docker", "compose", "python", "pandas", "dataframe", "cooking"]
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Fake bag-of-words embedding model recording the texts it embeds"""
+    texts = []
+
+    async def fake_embed(model_name, inputs):
+        texts.extend(inputs)
+        return [
+            [float(text.lower().count(word)) for word in VOCABULARY] + [0.1]
+            for text in inputs
+        ]
+
+    monkeypatch.setattr(OllamaService, "embed", fake_embed)
+    monkeypatch.setattr(embeddings, "EMBEDDINGS_ENABLED", True)
+    return texts
+
+
+def add_messages(db_session, chat, contents):
+    messages = [Message(chat_id=chat.id, role="user", content=c) for c in contents]
+    db_session.add_all(messages)
+    db_session.commit()
+    return messages
+
+
+def index(user, session_factory):
+    return asyncio.run(
+        EmbeddingService.index_user_messages(user.id, session_factory=session_factory)
+    )
+
+
+def test_vectors_are_unit_float16():
+    """Test that stored vectors are normalized float16"""
+    vector = unpack_vector(pack_vector([3.0, 4.0]))
+    assert vector.dtype == np.float16
+    assert np.allclose(vector, [0.6, 0.8], atol=1e-3)
+
+
+def test_duplicates_and_edits_reuse_embeddings(
+    db_session, session_factory, chat_user, user_chat, embedded
+):
+    """Test that each distinct text is embedded once"""
+    messages = add_messages(
+        db_session, user_chat, ["docker compose up", "docker compose up", "pandas"]
+    )
+
+    assert index(chat_user, session_factory) == 3
+    assert sorted(embedded) == ["docker compose up", "pandas"]
+    assert db_session.query(ContentEmbedding).count() == 2
+    assert index(chat_user, session_factory) == 0
+
+    # Editing to a text seen before needs no new embedding
+    messages[2].content = "docker compose up"
+    EmbeddingService.forget_message(db_session, messages[2].id)
+    db_session.commit()
+    assert index(chat_user, session_factory) == 1
+    assert len(embedded) == 2
+    assert db_session.query(MessageEmbedding).count() == 3
+
+
+def test_semantic_search_finds_closest_messages(
+    client, db_session, session_factory, chat_user, user_chat, embedded
+):
+    """Test that search ranks by similarity and follows deletes"""
+    cooking, pandas, docker = add_messages(
+        db_session,
+        user_chat,
+        ["cooking pasta tonight", "pandas dataframe merge", "docker compose logs"],
+    )
+    index(chat_user, session_factory)
+
+    def search(q):
+        response = client.get("/api/v1/chats/semantic-search", params={"q": q})
+        assert response.status_code == 200
+        return [result["message_id"] for result in response.json()["results"]]
+
+    results = search("how do I join two pandas dataframe objects")
+    assert results[0] == str(pandas.id)
+    assert len(results) == 3
+
+    client.delete(f"/api/v1/chats/{user_chat.id}/messages/{pandas.id}")
+    assert str(pandas.id) not in search("pandas dataframe")
+
+
+def test_queries_and_replaced_texts_are_not_kept(
+    client, db_session, session_factory, chat_user, user_chat, embedded
+):
+    """Test that search queries are not stored and old texts are pruned"""
+    (message,) = add_messages(db_session, user_chat, ["docker compose up"])
+    index(chat_user, session_factory)
+
+    response = client.get("/api/v1/chats/semantic-search", params={"q": "pandas"})
+    assert response.status_code == 200
+    assert "pandas" in embedded
+    assert db_session.query(ContentEmbedding).count() == 1
+
+    message.content = "cooking pasta"
+    EmbeddingService.forget_message(db_session, message.id)
+    db_session.commit()
+    index(chat_user, session_factory)
+    assert EmbeddingService.prune_unused(db_session, force=True) == 1
+
+    (kept,) = db_session.query(ContentEmbedding.content_hash).all()
+    assert kept == (embeddings.content_hash("cooking pasta"),)
+
+
+def test_pruned_vectors_are_embedded_again(
+    db_session, session_factory, chat_user, user_chat, embedded
+):
+    """Test that a message whose vector was pruned is indexed again"""
+    add_messages(db_session, user_chat, ["docker compose up"])
+    index(chat_user, session_factory)
+    db_session.query(ContentEmbedding).delete()
+    db_session.commit()
+
+    assert index(chat_user, session_factory) == 1
+    assert db_session.query(ContentEmbedding).count() == 1
+
+
+def test_short_embedding_answers_are_not_indexed(
+    db_session, session_factory, chat_user, user_chat, monkeypatch
+):
+    """Test that a batch answered with too few vectors links no message"""
+
+    async def truncated_embed(model_name, inputs):
+        return [[1.0, 0.0]] * (len(inputs) - 1)
+
+    monkeypatch.setattr(OllamaService, "embed", truncated_embed)
+    add_messages(db_session, user_chat, ["docker compose up", "pandas"])
+
+    assert index(chat_user, session_factory) == 0
+    assert db_session.query(MessageEmbedding).count() == 0
+    assert db_session.query(ContentEmbedding).count() == 0
+
+
+def test_indexing_stops_without_progress(
+    db_session, session_factory, chat_user, user_chat, monkeypatch
+):
+    """Test that messages that stay pending are not embedded in a loop"""
+    calls = []
+
+    async def vectors_never_stored(db, texts, model=None, store=True):
+        calls.append(texts)
+        return {}
+
+    monkeypatch.setattr(EmbeddingService, "embed_texts", vectors_never_stored)
+    add_messages(db_session, user_chat, ["docker compose up"])
+
+    index(chat_user, session_factory)
+    assert len(calls) == 1
+
+
+def test_semantic_search_disabled(client, user_chat):
+    """Test that semantic search answers 503 unless enabled"""
+    response = client.get("/api/v1/chats/semantic-search", params={"q": "x"})
+    assert response.status_code == 503
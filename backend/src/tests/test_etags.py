@@ -0,0 +1,106 @@
+from src.core.etag import etag_matches
+from src.models.chat_models import Message, Model
+from src.services.chat_models import OllamaService, model_cache
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+
+def test_etag_comparison():
+    """Test weak comparison against lists and the wildcard"""
+    assert etag_matches('"a", W/"b"', 'W/"b"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches("*", 'W/"a"')
+    assert not etag_matches('W/"ab"', 'W/"a"')
+    assert not etag_matches(None, 'W/"a"')
+
+
+def test_chat_list_not_modified(client):
+    """Test that the chat list answers 304 until a chat changes"""
+    first = client.get("/api/v1/chats/my")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    cached = revalidate(client, "/api/v1/chats/my", etag)
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    # Other query parameters are another representation
+    assert revalidate(client, "/api/v1/chats/my?limit=5", etag).status_code == 200
+
+    client.post("/api/v1/chats/my", json={"title": "Notes"})
+    changed = revalidate(client, "/api/v1/chats/my", etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_chat_not_modified_skips_messages(client, db_session, user_chat, statements):
+    """Test that a matching chat ETag answers without reading messages"""
+    db_session.add(Message(chat_id=user_chat.id, role="user", content="Hi"))
+    db_session.commit()
+    url = f"/api/v1/chats/chat/{user_chat.id}"
+    etag = client.get(url).headers["ETag"]
+
+    statements.clear()
+    assert revalidate(client, url, etag).status_code == 304
+    assert not any("FROM messages" in statement for statement in statements)
+
+    message_id = client.get(url).json()["messages"][0]["id"]
+    client.patch(
+        f"/api/v1/chats/{user_chat.id}/messages/{message_id}", json={"content": "Hey"}
+    )
+    changed = revalidate(client, url, etag)
+    assert changed.status_code == 200
+    assert changed.json()["messages"][0]["content"] == "Hey"
+
+    other = "00000000-0000-0000-0000-000000000000"
+    assert revalidate(client, f"/api/v1/chats/chat/{other}", etag).status_code == 404
+
+
+def test_models_not_modified(client, db_session):
+    """Test that the model list ETag follows the models table"""
+    etag = client.get("/api/v1/chats/models").headers["ETag"]
+    assert revalidate(client, "/api/v1/chats/models", etag).status_code == 304
+
+    db_session.add(Model(name="llama3", is_active=False))
+    db_session.commit()
+    assert revalidate(client, "/api/v1/chats/models", etag).status_code == 200
+
+
+def test_tags_not_modified_without_ollama(client, monkeypatch):
+    """Test that a cached model list is revalidated without calling Ollama"""
+    calls = []
+    models = {"models": []}
+
+    async def fake_models():
+        calls.append(1)
+        model_cache.set("models_with_capabilities", models, versioned=True)
+        return models
+
+    monkeypatch.setattr(OllamaService, "get_models_with_capabilities", fake_models)
+    model_cache.clear()
+    try:
+        etag = client.get("/api/v1/ollama/tags").headers["ETag"]
+        assert revalidate(client, "/api/v1/ollama/tags", etag).status_code == 304
+        assert calls == [1]
+
+        # A refetch with the same content keeps the ETag
+        model_cache.clear()
+        assert revalidate(client, "/api/v1/ollama/tags", etag).status_code == 304
+        assert calls == [1, 1]
+    finally:
+        model_cache.clear()
+
+
+def test_model_details_are_cached_without_a_digest():
+    """Test that only the model list pays for hashing its cached value"""
+    model_cache.clear()
+    try:
+        model_cache.set("model_details_llama3", {"details": {}})
+        model_cache.set("models_with_capabilities", {"models": []}, versioned=True)
+        assert model_cache.version("model_details_llama3") is None
+        assert OllamaService.models_version() is not None
+    finally:
+        model_cache.clear()
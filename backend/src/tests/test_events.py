@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from src.core import events
+from src.core.events import broker, event_stream
+from src.schemas.chat import ChatCreateSchema
+from src.services.chat import ChatService
+from src.services.chat_models import OllamaService
+
+
+def drain(subscription):
+    received = []
+    while not subscription.queue.empty():
+        received.append(subscription.queue.get_nowait())
+    return received
+
+
+def test_events_are_published_on_commit(db_session, chat_user):
+    """Test that only committed changes reach subscribers"""
+
+    async def scenario():
+        subscription = broker.subscribe(chat_user.id)
+        try:
+            chat_id = ChatService.create_chat(
+                db_session, chat_user, ChatCreateSchema(title="Plans")
+            ).id
+            await asyncio.sleep(0)
+            created = drain(subscription)
+
+            events.queue_event(db_session, chat_user.id, {"type": "chat.updated"})
+            db_session.rollback()
+            ChatService.delete_chat(db_session, chat_user, chat_id)
+            await asyncio.sleep(0)
+            return chat_id, created, drain(subscription)
+        finally:
+            broker.unsubscribe(subscription)
+
+    chat_id, created, deleted = asyncio.run(scenario())
+    assert created == [
+        {"type": "chat.created", "chat_id": str(chat_id), "cursor": 1, "title": "Plans"}
+    ]
+    assert deleted == [{"type": "chat.deleted", "chat_id": str(chat_id), "cursor": 2}]
+    assert broker.subscriber_count(chat_user.id) == 0
+
+
+def test_slow_subscribers_get_resync(monkeypatch, chat_user):
+    """Test that a full queue is replaced by a single resync event"""
+    monkeypatch.setattr(events, "EVENT_QUEUE_SIZE", 2)
+
+    async def scenario():
+        subscription = broker.subscribe(chat_user.id)
+        try:
+            for i in range(3):
+                broker.publish(chat_user.id, {"type": "chat.updated", "cursor": i})
+            await asyncio.sleep(0)
+            return drain(subscription)
+        finally:
+            broker.unsubscribe(subscription)
+
+    assert asyncio.run(scenario()) == [{"type": "resync"}]
+
+
+def test_auto_title_reaches_stream(client, monkeypatch, chat_user, user_chat):
+    """Test that the title given by the first turn is streamed as an event"""
+
+    async def fake_chat(payload):
+        return {"message": {"role": "assistant", "content": "Sure"}}
+
+    async def fake_context_window(model_name, options=None):
+        return 4096
+
+    monkeypatch.setattr(OllamaService, "chat_with_model", fake_chat)
+    monkeypatch.setattr(OllamaService, "get_context_window", fake_context_window)
+
+    class Request:
+        async def is_disconnected(self):
+            return False
+
+    async def scenario():
+        subscription = broker.subscribe(chat_user.id)
+        stream = event_stream(Request(), subscription, {"type": "ready", "cursor": 0})
+        first = await stream.__anext__()
+
+        await asyncio.to_thread(
+            client.post,
+            "/api/v1/ollama/chat",
+            json={
+                "model": "llama3",
+                "chatId": str(user_chat.id),
+                "messages": [{"role": "user", "content": "Tea"}],
+            },
+        )
+        second = await asyncio.wait_for(stream.__anext__(), 5)
+        await stream.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == 'retry: 3000\nevent: ready\ndata: {"cursor": 0}\n\n'
+    name, data = second.split("\n")[:2]
+    assert name == "event: chat.title"
+    payload = json.loads(data[len("data: ") :])
+    # Cursor of the stored user message and reply
+    assert payload.pop("cursor") == 2
+    assert payload == {"chat_id": str(user_chat.id), "title": "Tea"}
+    assert broker.subscriber_count(chat_user.id) == 0
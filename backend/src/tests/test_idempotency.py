@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from src.core.idempotency import run_idempotent
+from src.models.chat_models import Message
+from src.services.chat_models import OllamaService
+
+
+def test_create_message_replays_idempotency_key(client, db_session, user_chat):
+    """Test that a retried send returns the original message"""
+    headers = {"Idempotency-Key": "send-1"}
+    payload = {"role": "user", "content": "Hello there"}
+
+    first = client.post(
+        f"/api/v1/chats/{user_chat.id}/messages", json=payload, headers=headers
+    )
+    second = client.post(
+        f"/api/v1/chats/{user_chat.id}/messages", json=payload, headers=headers
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert db_session.query(Message).filter(Message.chat_id == user_chat.id).count() == 1
+
+
+def test_idempotency_key_reused_with_different_payload(client, user_chat):
+    """Test that a key cannot be reused for another request"""
+    headers = {"Idempotency-Key": "send-2"}
+    url = f"/api/v1/chats/{user_chat.id}/messages"
+
+    client.post(url, json={"role": "user", "content": "first"}, headers=headers)
+    response = client.post(
+        url, json={"role": "user", "content": "second"}, headers=headers
+    )
+
+    assert response.status_code == 422
+
+
+def test_concurrent_identical_requests_share_one_generation(
+    session_factory, chat_user
+):
+    """Test that an identical in-flight request attaches to the running one"""
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"content": "generated"}
+
+    async def send():
+        db = session_factory()
+        try:
+            return await run_idempotent(
+                db=db,
+                user_id=chat_user.id,
+                scope="ollama_chat:test",
+                payload={"messages": ["hi"]},
+                handler=handler,
+            )
+        finally:
+            db.close()
+
+    async def main():
+        return await asyncio.gather(send(), send())
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert [body for body, _ in results] == [{"content": "generated"}] * 2
+    assert sorted(replayed for _, replayed in results) == [False, True]
+
+
+def test_failed_request_releases_key(session_factory, chat_user):
+    """Test that a failed request does not block a retry"""
+    calls = []
+
+    async def failing():
+        calls.append("fail")
+        raise HTTPException(status_code=502, detail="Ollama down")
+
+    async def succeeding():
+        calls.append("ok")
+        return {"content": "generated"}
+
+    async def send(handler):
+        db = session_factory()
+        try:
+            return await run_idempotent(
+                db=db,
+                user_id=chat_user.id,
+                scope="ollama_chat:test",
+                payload={"messages": ["hi"]},
+                handler=handler,
+                idempotency_key="retry-me",
+            )
+        finally:
+            db.close()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(send(failing))
+    body, replayed = asyncio.run(send(succeeding))
+
+    assert calls == ["fail", "ok"]
+    assert body == {"content": "generated"}
+    assert replayed is False
+
+
+def test_identical_message_sent_twice_is_stored_twice(client, db_session, user_chat):
+    """Test that repeating a short reply without a key is not deduplicated"""
+    url = f"/api/v1/chats/{user_chat.id}/messages"
+    payload = {"role": "user", "content": "ok"}
+
+    first = client.post(url, json=payload)
+    second = client.post(url, json=payload)
+
+    assert second.json()["id"] != first.json()["id"]
+    assert "Idempotent-Replayed" not in second.headers
+    assert db_session.query(Message).filter(Message.chat_id == user_chat.id).count() == 2
+
+
+def test_identical_generations_without_key_both_generate(
+    client, db_session, user_chat, monkeypatch
+):
+    """Test that regenerating the same conversation runs the model again"""
+    replies = iter(["First answer", "Second answer"])
+
+    async def fake_chat(payload):
+        return {"message": {"role": "assistant", "content": next(replies)}}
+
+    async def fake_context_window(model_name, options=None):
+        return 4096
+
+    monkeypatch.setattr(OllamaService, "chat_with_model", fake_chat)
+    monkeypatch.setattr(OllamaService, "get_context_window", fake_context_window)
+    payload = {
+        "model": "llama3",
+        "chatId": str(user_chat.id),
+        "messages": [{"role": "user", "content": "Hi"}],
+    }
+
+    first = client.post("/api/v1/ollama/chat", json=payload)
+    second = client.post("/api/v1/ollama/chat", json=payload)
+
+    assert first.json()["message"]["content"] == "First answer"
+    assert second.json()["message"]["content"] == "Second answer"
+    assert "Idempotent-Replayed" not in second.headers
@@ -0,0 +1,22 @@
+import time
+
+from src.core.ids import uuid7, uuid7_time
+
+
+def test_uuid7_layout():
+    """Test the version, variant and embedded timestamp"""
+    before = time.time()
+    value = uuid7()
+
+    assert value.version == 7
+    assert value.variant == "specified in RFC 4122"
+    assert before - 0.01 <= uuid7_time(value) <= time.time() + 0.01
+
+
+def test_uuid7_is_monotonic():
+    """Test that ids generated in a burst sort in creation order"""
+    ids = [uuid7() for _ in range(10_000)]
+
+    assert ids == sorted(ids)
+    assert [i.hex for i in ids] == sorted(i.hex for i in ids)
+    assert len(set(ids)) == len(ids)
@@ -0,0 +1,71 @@
+from src.services.image_policy import ImagePolicyService
+
+IMAGE = "iVBORw0KGgo" * 1000
+
+
+def make_history(current_text):
+    return [
+        {"role": "user", "content": "What is this?", "images": [IMAGE]},
+        {"role": "assistant", "content": "A cat."},
+        {"role": "user", "content": "And this?", "images": [IMAGE, IMAGE]},
+        {"role": "assistant", "content": "A dog."},
+        {"role": "user", "content": current_text},
+    ]
+
+
+def test_none_policy_drops_historical_images():
+    """Test that earlier images become text placeholders"""
+    messages = make_history("Thanks!")
+
+    result = ImagePolicyService.apply(messages, policy="none")
+    sent = result["messages"]
+
+    assert result["images_dropped"] == 3
+    assert result["bytes_saved"] == 3 * len(IMAGE)
+    assert all(not m.get("images") for m in sent)
+    assert sent[2]["content"] == "And this?\n[2 images from this message omitted]"
+    # The request payload itself is left untouched
+    assert messages[0]["images"] == [IMAGE]
+
+
+def test_current_turn_images_are_always_sent():
+    """Test that images attached to the current message are kept"""
+    messages = make_history("Compare with this one")
+    messages[-1]["images"] = [IMAGE]
+
+    result = ImagePolicyService.apply(messages, policy="none")
+
+    assert result["messages"][-1]["images"] == [IMAGE]
+    assert result["images_dropped"] == 3
+
+
+def test_referenced_policy_keeps_latest_earlier_images():
+    """Test that referring to an earlier picture keeps the latest one"""
+    result = ImagePolicyService.apply(
+        make_history("Is the dog in that picture sleeping?"), policy="referenced"
+    )
+    sent = result["messages"]
+
+    assert sent[2]["images"] == [IMAGE, IMAGE]
+    assert sent[0]["images"] is None
+    assert result["images_dropped"] == 1
+
+
+def test_default_policy_keeps_latest_earlier_images():
+    """Test that a follow-up about the last picture still sends it"""
+    result = ImagePolicyService.apply(make_history("What breed is it?"))
+    sent = result["messages"]
+
+    assert sent[2]["images"] == [IMAGE, IMAGE]
+    assert sent[0]["images"] is None
+    assert result["images_dropped"] == 1
+
+
+def test_all_policy_sends_everything():
+    """Test the previous behaviour is still available"""
+    messages = make_history("Thanks!")
+
+    result = ImagePolicyService.apply(messages, policy="all")
+
+    assert result["messages"] is messages
+    assert result["bytes_saved"] == 0
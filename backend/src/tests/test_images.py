@@ -0,0 +1,263 @@
+import base64
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.auth.jwt import create_access_token
+from src.migrations import discover
+from src.models.chat_models import Chat, Message
+from src.models.image_blob import ImageBlob, ImageBlobOwner
+from src.models.user import User
+from src.services import images as images_service
+from src.services.images import ImageService, make_ref
+from src.tools.images import migrate_inline_images
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+PNG_B64 = base64.b64encode(PNG).decode()
+
+
+@pytest.fixture(autouse=True)
+def blob_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(images_service.blob_store, "root", tmp_path)
+    return tmp_path
+
+
+def post_image_message(client, chat_id, content="look"):
+    return client.post(
+        f"/api/v1/chats/{chat_id}/messages",
+        json={"role": "user", "content": content, "images": [PNG_B64]},
+    )
+
+
+def test_images_are_stored_once_and_referenced(client, db_session, user_chat):
+    """Test that messages keep digests and identical images are deduplicated"""
+    first = post_image_message(client, user_chat.id).json()
+    second = post_image_message(client, user_chat.id, content="again").json()
+
+    ref = first["images"][0]
+    assert ref.startswith("sha256:")
+    assert second["images"] == [ref]
+
+    blob = db_session.query(ImageBlob).one()
+    assert blob.ref_count == 2
+    assert blob.size == len(PNG)
+    assert blob.content_type == "image/png"
+
+
+def test_get_image_supports_etag_and_range(client, user_chat):
+    """Test that blobs are served with caching and range support"""
+    ref = post_image_message(client, user_chat.id).json()["images"][0]
+    url = f"/api/v1/images/{ref}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == PNG
+    assert response.headers["content-type"] == "image/png"
+    etag = response.headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    partial = client.get(url, headers={"Range": "bytes=0-7"})
+    assert partial.status_code == 206
+    assert partial.content == PNG[:8]
+
+
+def test_deleting_messages_releases_images(client, db_session, user_chat, blob_dir):
+    """Test that unreferenced blobs are garbage collected"""
+    message = post_image_message(client, user_chat.id).json()
+
+    client.delete(f"/api/v1/chats/{user_chat.id}/messages/{message['id']}")
+    db_session.expire_all()
+    assert db_session.query(ImageBlob).one().ref_count == 0
+
+    assert ImageService.collect_garbage(db_session, grace=timedelta(0)) == 1
+    assert db_session.query(ImageBlob).count() == 0
+    assert not any(path.is_file() for path in blob_dir.rglob("*"))
+
+
+def test_deleting_chat_releases_images(client, db_session, user_chat):
+    """Test that deleting a chat releases the images of its messages"""
+    post_image_message(client, user_chat.id)
+    post_image_message(client, user_chat.id, content="again")
+
+    body = client.delete(f"/api/v1/chats/chat/{user_chat.id}").json()
+    assert (body["deleted_chats"], body["deleted_messages"]) == (1, 2)
+    db_session.expire_all()
+    assert db_session.query(ImageBlob).one().ref_count == 0
+
+
+def test_invalid_image_is_rejected(client, user_chat):
+    """Test that malformed base64 is a validation error"""
+    response = client.post(
+        f"/api/v1/chats/{user_chat.id}/messages",
+        json={"role": "user", "content": "look", "images": ["not base64!"]},
+    )
+
+    assert response.status_code == 422
+
+
+def test_migrate_inline_images(db_session, user_chat):
+    """Test that legacy base64 rows are converted in batches"""
+    user_id = user_chat.user_id
+    for _ in range(3):
+        db_session.add(
+            Message(chat_id=user_chat.id, role="user", content="x", images=[PNG_B64])
+        )
+    db_session.commit()
+
+    assert migrate_inline_images(db_session, batch_size=2) == 3
+    assert migrate_inline_images(db_session, batch_size=2) == 0
+
+    digest = ImageService.store_images(db_session, user_id, [PNG_B64])[0]
+    images = [m.images for m in db_session.query(Message).all()]
+    assert images == [[digest]] * 3
+    assert digest == make_ref(db_session.query(ImageBlob).one().digest)
+
+
+def test_migrate_inline_images_skips_invalid_ones(db_session, user_chat):
+    """Test that a bad image neither stops the migration nor loses data"""
+    bad = Message(chat_id=user_chat.id, role="user", content="x", images=["!!"])
+    good = Message(chat_id=user_chat.id, role="user", content="y", images=[PNG_B64])
+    db_session.add_all([bad, good])
+    user_chat.updated_at = datetime(2020, 1, 1)
+    db_session.commit()
+    bad_id, good_id, chat_id = bad.id, good.id, user_chat.id
+
+    assert migrate_inline_images(db_session, batch_size=1) == 1
+    assert migrate_inline_images(db_session, batch_size=1) == 0
+
+    assert db_session.get(Message, bad_id).images == ["!!"]
+    digest = db_session.query(ImageBlob).one().digest
+    assert db_session.get(Message, good_id).images == [make_ref(digest)]
+    assert db_session.query(ImageBlob).one().ref_count == 1
+    assert db_session.get(Chat, chat_id).updated_at > datetime(2020, 1, 1)
+
+
+def test_reupload_restarts_garbage_collection_grace(
+    client, db_session, monkeypatch
+):
+    """Test that uploading an orphaned blob again keeps it from being collected"""
+    upload = {"file": ("a.png", PNG, "image/png")}
+    monkeypatch.setattr(images_service, "pillow_available", lambda: False)
+    assert client.post("/api/v1/images", files=upload).status_code == 201
+    blob = db_session.query(ImageBlob).one()
+    blob.updated_at = datetime(2020, 1, 1)
+    db_session.commit()
+
+    assert client.post("/api/v1/images", files=upload).status_code == 201
+    db_session.expire_all()
+    assert ImageService.collect_garbage(db_session, grace=timedelta(hours=1)) == 0
+    assert db_session.query(ImageBlob).count() == 1
+
+
+def log_in_as_other_user(client, db_session):
+    other = User(
+        username="other",
+        email="other@example.com",
+        password_hash="hashed_password",
+        role="user",
+        is_active=True,
+    )
+    db_session.add(other)
+    db_session.commit()
+    client.cookies.set(
+        "access_token",
+        create_access_token(
+            data={"sub": str(other.id), "username": other.username},
+            token_version=other.token_version,
+        ),
+    )
+    return other
+
+
+def test_images_are_private_to_their_owners(client, db_session, user_chat):
+    """Test that other users can neither read nor attach someone's image"""
+    ref = post_image_message(client, user_chat.id).json()["images"][0]
+    etag = client.get(f"/api/v1/images/{ref}").headers["etag"]
+
+    other = log_in_as_other_user(client, db_session)
+    chat = Chat(user_id=other.id, title="Mine")
+    db_session.add(chat)
+    db_session.commit()
+
+    unknown = "sha256:" + "0" * 64
+    for digest in (ref, unknown):
+        response = client.get(
+            f"/api/v1/images/{digest}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 404
+
+    responses = [
+        client.post(
+            f"/api/v1/chats/{chat.id}/messages",
+            json={"role": "user", "content": "mine", "images": [digest]},
+        )
+        for digest in (ref, unknown)
+    ]
+    assert [response.status_code for response in responses] == [422, 422]
+    assert responses[0].json()["detail"] == f"Unknown image {ref}"
+    assert responses[1].json()["detail"] == f"Unknown image {unknown}"
+
+    # Uploading the same image makes it theirs as well
+    own = post_image_message(client, chat.id).json()
+    assert own["images"] == [ref]
+    assert client.get(f"/api/v1/images/{ref}").status_code == 200
+
+
+def test_owners_migration_backfills_referenced_images(
+    db_engine, db_session, user_chat
+):
+    """Test that chat owners become owners of images already in their chats"""
+    ref = ImageService.store_images(db_session, user_chat.user_id, [PNG_B64])[0]
+    db_session.add(
+        Message(chat_id=user_chat.id, role="user", content="x", images=[ref])
+    )
+    db_session.query(ImageBlobOwner).delete()
+    db_session.commit()
+
+    with db_engine.begin() as connection:
+        discover()["0005_image_blob_owners"].upgrade(connection)
+
+    owner = db_session.query(ImageBlobOwner).one()
+    assert (make_ref(owner.digest), owner.user_id) == (ref, user_chat.user_id)
+
+
+def test_upload_downscales_large_images(client, db_session, monkeypatch):
+    """Test that uploads are resized to the target size and stored as blobs"""
+    Image = pytest.importorskip("PIL.Image")
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (3000, 1500), "red").save(buffer, format="BMP")
+    monkeypatch.setattr(images_service, "UPLOAD_CHUNK_SIZE", 64 * 1024)
+
+    response = client.post(
+        "/api/v1/images",
+        files={"file": ("photo.bmp", buffer.getvalue(), "image/bmp")},
+    )
+
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["width"], body["height"]) == (1024, 512)
+    assert body["content_type"] == "image/jpeg"
+    assert body["size"] < body["original_size"]
+
+    blob = db_session.query(ImageBlob).one()
+    assert make_ref(blob.digest) == body["ref"]
+    assert blob.ref_count == 0
+    assert images_service.blob_store.exists(blob.digest)
+
+
+def test_upload_rejects_invalid_and_oversized_files(client, monkeypatch, blob_dir):
+    """Test that non-images and large uploads are refused and cleaned up"""
+    not_image = client.post(
+        "/api/v1/images", files={"file": ("a.txt", b"hello", "text/plain")}
+    )
+    assert not_image.status_code == 422
+
+    monkeypatch.setattr(images_service, "IMAGE_UPLOAD_MAX_BYTES", 100)
+    too_large = client.post(
+        "/api/v1/images", files={"file": ("a.png", PNG, "image/png")}
+    )
+    assert too_large.status_code == 413
+    assert list((blob_dir / "tmp").iterdir()) == []
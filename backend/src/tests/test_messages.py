@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from src.models.chat_models import Message
+
+
+@pytest.fixture
+def thinking_message(db_session, user_chat):
+    """An assistant message with every heavy column filled"""
+    message = Message(
+        chat_id=user_chat.id,
+        role="assistant",
+        content="The answer is 4.",
+        thinking="2 + 2 is 4. " * 1000,
+        tool_calls=[{"function": {"name": "add", "arguments": {"a": 2, "b": 2}}}],
+        images=["sha256:" + "a" * 64],
+        extended_metadata={"model": "llama3"},
+    )
+    db_session.add(message)
+    db_session.commit()
+    return message
+
+
+def test_get_chat_leaves_out_heavy_columns(
+    client, user_chat, thinking_message, statements
+):
+    """Test that opening a chat neither selects nor returns heavy columns"""
+    response = client.get(f"/api/v1/chats/chat/{user_chat.id}")
+
+    assert response.status_code == 200
+    message = response.json()["messages"][0]
+    assert message["content"] == "The answer is 4."
+    for name in ("images", "thinking", "tool_calls", "extended_metadata"):
+        assert name not in message
+
+    message_queries = [s for s in statements if "FROM messages" in s]
+    assert message_queries
+    assert not any("messages.thinking" in s for s in message_queries)
+    assert not any("messages.images" in s for s in message_queries)
+
+
+def test_sparse_fieldsets(client, user_chat, thinking_message):
+    """Test the fields= and include= parameters"""
+    url = f"/api/v1/chats/chat/{user_chat.id}"
+
+    lean = client.get(url, params={"fields": "role"}).json()["messages"][0]
+    assert lean == {"id": str(thinking_message.id), "role": "assistant"}
+
+    full = client.get(url, params={"include": "images,thinking"}).json()
+    message = full["messages"][0]
+    assert message["images"] == thinking_message.images
+    assert message["thinking"] == thinking_message.thinking
+    assert "tool_calls" not in message
+
+    assert client.get(url, params={"fields": "password"}).status_code == 400
+
+
+def test_lazy_images_and_thinking_endpoints(client, user_chat, thinking_message):
+    """Test that heavy columns can be fetched per message"""
+    base = f"/api/v1/chats/{user_chat.id}/messages/{thinking_message.id}"
+
+    images = client.get(f"{base}/images")
+    assert images.json() == {
+        "message_id": str(thinking_message.id),
+        "images": thinking_message.images,
+    }
+
+    thinking = client.get(f"{base}/thinking")
+    assert thinking.json()["thinking"] == thinking_message.thinking
+
+    message = client.get(base, params={"include": "tool_calls"}).json()
+    assert message["tool_calls"] == thinking_message.tool_calls
+    assert "thinking" not in message
+
+
+def test_history_pages_newest_first(client, db_session, user_chat):
+    """Test keyset pagination, including messages sharing a timestamp"""
+    start = datetime(2025, 1, 1)
+    db_session.add_all(
+        Message(
+            chat_id=user_chat.id,
+            role="user",
+            content=f"message {i}",
+            # Pairs of messages share a timestamp, the id breaks the tie
+            created_at=start + timedelta(seconds=i // 2),
+        )
+        for i in range(25)
+    )
+    db_session.commit()
+    url = f"/api/v1/chats/chat/{user_chat.id}"
+
+    pages = []
+    params = {"limit": 10}
+    while True:
+        body = client.get(url, params=params).json()
+        pages.append(body["messages"])
+        if not body["has_more"]:
+            assert body["next_cursor"] is None
+            break
+        params["before"] = body["next_cursor"]
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    paged = [m["id"] for page in reversed(pages) for m in page]
+    everything = [m["id"] for m in client.get(url).json()["messages"]]
+    assert paged == everything
+    assert len(set(paged)) == 25
+
+    assert client.get(url, params={"limit": 10, "before": "nope"}).status_code == 400
+
+
+def test_bulk_delete_is_one_statement(client, db_session, user_chat, statements):
+    """Test that bulk deletion issues a single DELETE and reports misses"""
+    messages = [
+        Message(chat_id=user_chat.id, role="user", content=f"message {i}")
+        for i in range(5)
+    ]
+    db_session.add_all(messages)
+    db_session.commit()
+    missing = str(uuid4())
+    ids = [str(m.id) for m in messages[:3]] + [missing]
+
+    statements.clear()
+    response = client.request(
+        "DELETE",
+        f"/api/v1/chats/{user_chat.id}/messages/bulk",
+        json={"message_ids": ids},
+    )
+
+    body = response.json()
+    assert body["deleted_count"] == 3
+    assert body["failed_deletions"] == [missing]
+    deletes = [s for s in statements if s.startswith("DELETE FROM messages")]
+    assert len(deletes) == 1
+    remaining = client.get(f"/api/v1/chats/chat/{user_chat.id}").json()
+    assert [m["content"] for m in remaining["messages"]] == ["message 3", "message 4"]
+    assert remaining["chat"]["stats"]["message_count"] == 2
+
+
+def test_message_operations_skip_chat_lookup(
+    client, db_session, user_chat, statements
+):
+    """Test that message endpoints check chat ownership without a separate query"""
+    message = Message(chat_id=user_chat.id, role="user", content="hi")
+    db_session.add(message)
+    db_session.commit()
+    url = f"/api/v1/chats/{user_chat.id}/messages"
+
+    def run(method, path, **kwargs):
+        statements.clear()
+        assert client.request(method, path, **kwargs).status_code == 200
+        data = [s for s in statements if not s.startswith("SELECT users.")]
+        assert not [s for s in data if s.startswith("SELECT chats.")]
+        return data
+
+    assert len(run("GET", f"{url}/{message.id}")) == 1
+    run("PATCH", f"{url}/{message.id}", json={"content": "edited"})
+    run("POST", url, json={"role": "user", "content": "new"})
+    deleted = run("DELETE", f"{url}/{message.id}")
+    assert [s for s in deleted if not s.startswith("SELECT")][0].startswith(
+        "DELETE FROM messages"
+    )
+
+
+def test_message_of_other_user_is_not_found(client, db_session, user_chat):
+    """Test that the joined ownership check still tells chat and message apart"""
+    message = Message(chat_id=user_chat.id, role="user", content="hi")
+    db_session.add(message)
+    db_session.commit()
+
+    missing = client.get(f"/api/v1/chats/{user_chat.id}/messages/{uuid4()}")
+    assert missing.status_code == 404
+    assert missing.json()["detail"] == "Message not found"
+
+    user_chat.user_id = None
+    db_session.commit()
+    for method in ("GET", "DELETE"):
+        response = client.request(
+            method, f"/api/v1/chats/{user_chat.id}/messages/{message.id}"
+        )
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Chat not found"
+    assert db_session.query(Message).count() == 1
@@ -0,0 +1,67 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from src.migrations import discover, pending, upgrade
+
+
+@pytest.fixture
+def indexes():
+    return discover()["0001_performance_indexes"].INDEXES
+
+
+def explain(db_engine, sql, **params):
+    with db_engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)
+        return " | ".join(row[-1] for row in rows)
+
+
+def test_upgrade_adds_indexes_to_existing_database(db_engine, indexes):
+    """Test that migrations create the indexes an older database lacks"""
+    with db_engine.begin() as connection:
+        for name, _ in indexes:
+            connection.execute(text(f"DROP INDEX {name}"))
+
+    assert "0001_performance_indexes" in pending(db_engine)
+    assert "0001_performance_indexes" in upgrade(db_engine)
+    assert upgrade(db_engine) == []
+    assert pending(db_engine) == []
+
+    with db_engine.connect() as connection:
+        existing = {
+            row[0]
+            for row in connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            )
+        }
+    assert {name for name, _ in indexes} <= existing
+
+
+@pytest.mark.parametrize(
+    "sql, index",
+    [
+        (
+            "SELECT id FROM chats WHERE user_id = :id AND is_archived = 0 "
+            "ORDER BY updated_at DESC, id DESC LIMIT 21",
+            "ix_chats_user_archived_updated",
+        ),
+        (
+            "SELECT id, content FROM messages WHERE chat_id = :id "
+            "ORDER BY created_at DESC, id DESC LIMIT 51",
+            "ix_messages_chat_created_id",
+        ),
+        ("SELECT id FROM models WHERE name = 'llama3'", "ix_models_name"),
+        (
+            "SELECT id FROM user_model_access WHERE user_id = :id AND model_id = :id",
+            "ix_user_model_access_user_model",
+        ),
+    ],
+)
+def test_hot_queries_use_indexes(db_engine, sql, index):
+    """Test with EXPLAIN that the hot queries are index scans without sorting"""
+    upgrade(db_engine)
+    plan = explain(db_engine, sql, id=uuid.uuid4().hex)
+
+    assert f"INDEX {index}" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,128 @@
+import pytest
+
+from src.migrations import upgrade
+from src.models.chat_models import Chat, Message
+
+
+@pytest.fixture
+def search_index(db_engine):
+    """The full-text index from the migrations"""
+    upgrade(db_engine)
+
+
+def add_message(db_session, chat, content, role="user"):
+    message = Message(chat_id=chat.id, role=role, content=content)
+    db_session.add(message)
+    db_session.commit()
+    return message
+
+
+def search(client, q, **params):
+    response = client.get("/api/v1/chats/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_search_ranks_and_highlights(client, db_session, user_chat, search_index):
+    """Test that matches are ranked, highlighted and escaped"""
+    add_message(db_session, user_chat, "Nothing relevant here")
+    weak = add_message(db_session, user_chat, "<b>kubernetes</b> " + "filler " * 50)
+    strong = add_message(db_session, user_chat, "kubernetes kubernetes pods")
+
+    body = search(client, "kubernetes")
+    ids = [result["message_id"] for result in body["results"]]
+    assert ids == [str(strong.id), str(weak.id)]
+
+    snippet = body["results"][1]["snippet"]
+    assert "&lt;b&gt;<mark>kubernetes</mark>&lt;/b&gt;" in snippet
+    assert body["results"][0]["chat_title"] == user_chat.title
+    assert search(client, "kube")["results"][0]["message_id"] == str(strong.id)
+    # Operators and quotes are plain text, not query syntax
+    operators = search(client, 'kubernetes" (pods* -')["results"]
+    assert [result["message_id"] for result in operators] == [str(strong.id)]
+
+
+def test_search_index_follows_edits_and_deletes(
+    client, db_session, user_chat, search_index
+):
+    """Test that the index is maintained on update and delete"""
+    message = add_message(db_session, user_chat, "postgres tuning")
+    url = f"/api/v1/chats/{user_chat.id}/messages/{message.id}"
+
+    client.patch(url, json={"content": "sqlite tuning"})
+    assert search(client, "postgres")["results"] == []
+    assert len(search(client, "sqlite")["results"]) == 1
+
+    client.delete(url)
+    assert search(client, "tuning")["results"] == []
+
+
+def test_search_is_scoped_and_paginated(
+    client, db_session, chat_user, user_chat, search_index
+):
+    """Test cursor pages and that other users' messages are not found"""
+    for i in range(7):
+        add_message(db_session, user_chat, f"python tip number {i}")
+    other = Chat(user_id=None, title="Someone else")
+    db_session.add(other)
+    db_session.commit()
+    add_message(db_session, other, "python secrets")
+
+    seen = []
+    params = {"limit": 3}
+    while True:
+        body = search(client, "python", **params)
+        seen.extend(result["message_id"] for result in body["results"])
+        if body["next_cursor"] is None:
+            break
+        params["cursor"] = body["next_cursor"]
+
+    assert len(seen) == len(set(seen)) == 7
+    bad = client.get("/api/v1/chats/search", params={"q": "python", "cursor": "x"})
+    assert bad.status_code == 400
+
+
+def test_search_without_index_is_unavailable(client, user_chat):
+    """Test that a database without the index answers 503"""
+    response = client.get("/api/v1/chats/search", params={"q": "anything"})
+    assert response.status_code == 503
+
+
+def test_search_survives_vacuum(
+    client, db_engine, db_session, user_chat, search_index
+):
+    """Test that renumbered message rowids do not mix up search results"""
+    messages = [
+        add_message(db_session, user_chat, f"{word} notes")
+        for word in ["alpha", "bravo", "charlie", "delta"]
+    ]
+    kept = str(messages[3].id)
+    for message in messages[:2]:
+        db_session.delete(message)
+    db_session.commit()
+    db_session.close()
+
+    with db_engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql(
+            "VACUUM"
+        )
+    # VACUUM is free to renumber them, whether or not this build does
+    with db_engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE messages SET rowid = rowid + 100")
+
+    results = search(client, "delta")["results"]
+    assert [result["message_id"] for result in results] == [kept]
+    assert results[0]["snippet"] == "<mark>delta</mark> notes"
+    assert len(search(client, "notes")["results"]) == 2
+
+
+def test_search_index_covers_existing_messages(
+    client, db_engine, db_session, user_chat
+):
+    """Test that the migrations index messages written before them"""
+    message = add_message(db_session, user_chat, "existing history")
+    message_id = str(message.id)
+    upgrade(db_engine)
+
+    results = search(client, "history")["results"]
+    assert [result["message_id"] for result in results] == [message_id]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.services import summarizer
+from src.services.chat_models import OllamaService
+from src.services.summarizer import ConversationSummaryService
+
+
+@pytest.fixture(autouse=True)
+def enable_summaries(monkeypatch):
+    monkeypatch.setattr(summarizer, "CHAT_SUMMARY_ENABLED", True)
+    monkeypatch.setattr(summarizer, "CHAT_SUMMARY_THRESHOLD_TOKENS", 500)
+    monkeypatch.setattr(summarizer, "CHAT_SUMMARY_KEEP_RECENT", 2)
+
+
+def make_history(turns):
+    text = " ".join(["word"] * 100)
+    messages = [{"role": "system", "content": "Be brief."}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} {text}"})
+        messages.append({"role": "assistant", "content": f"answer {i} {text}"})
+    return messages
+
+
+def test_long_history_is_summarized_and_applied(
+    monkeypatch, db_session, session_factory, user_chat
+):
+    """Test that a stored summary replaces the turns it covers"""
+    requests = []
+
+    async def fake_chat(payload):
+        requests.append(payload)
+        return {"message": {"role": "assistant", "content": "They talked a lot."}}
+
+    monkeypatch.setattr(OllamaService, "chat_with_model", fake_chat)
+    history = make_history(5)
+
+    assert ConversationSummaryService.needs_summary(db_session, user_chat.id, history)
+    summary = asyncio.run(
+        ConversationSummaryService.summarize_chat(
+            user_chat.id, "llama3", history, session_factory=session_factory
+        )
+    )
+
+    assert len(requests) == 1
+    assert summary.covered_messages == 8
+
+    next_turn = history + [{"role": "user", "content": "and now?"}]
+    result = ConversationSummaryService.apply_summary(
+        db_session, user_chat.id, next_turn
+    )
+    sent = result["messages"]
+
+    assert result["summary_applied"] is True
+    assert result["tokens_saved"] > 0
+    assert [m["role"] for m in sent] == ["system", "system", "user", "assistant", "user"]
+    assert "They talked a lot." in sent[1]["content"]
+    assert sent[2:] == next_turn[-3:]
+
+
+def test_summary_is_ignored_when_history_changed(
+    monkeypatch, db_session, session_factory, user_chat
+):
+    """Test that editing a summarized turn falls back to the full history"""
+
+    async def fake_chat(payload):
+        return {"message": {"role": "assistant", "content": "Summary."}}
+
+    monkeypatch.setattr(OllamaService, "chat_with_model", fake_chat)
+    history = make_history(5)
+    asyncio.run(
+        ConversationSummaryService.summarize_chat(
+            user_chat.id, "llama3", history, session_factory=session_factory
+        )
+    )
+
+    edited = [dict(m) for m in history] + [{"role": "user", "content": "next"}]
+    edited[1]["content"] = "an edited first question"
+    result = ConversationSummaryService.apply_summary(db_session, user_chat.id, edited)
+
+    assert result["summary_applied"] is False
+    assert result["messages"] == edited
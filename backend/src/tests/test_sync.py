@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from src.models.sync import SyncChange
+from src.services.change_log import ChangeLogService
+
+
+def reset(cursor):
+    return {
+        "cursor": cursor,
+        "reset": True,
+        "has_more": False,
+        "chats": [],
+        "messages": [],
+        "deleted_chat_ids": [],
+        "deleted_message_ids": [],
+    }
+
+
+def sync(client, since=None, **params):
+    if since is not None:
+        params["since"] = since
+    response = client.get("/api/v1/sync", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_first_sync_resets(client):
+    """Test that a sync without a cursor only returns the current cursor"""
+    assert sync(client) == reset(0)
+
+    client.post("/api/v1/chats/my", json={"title": "Notes"})
+    assert sync(client) == reset(1)
+
+
+def test_sync_returns_changes_since_cursor(client):
+    """Test that created, edited and deleted rows show up once"""
+    cursor = sync(client)["cursor"]
+
+    chat_id = client.post("/api/v1/chats/my", json={"title": "Notes"}).json()["id"]
+    messages = [
+        client.post(
+            f"/api/v1/chats/{chat_id}/messages",
+            json={"role": "user", "content": f"message {i}"},
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    changes = sync(client, cursor)
+    assert changes["reset"] is False and changes["has_more"] is False
+    assert [chat["id"] for chat in changes["chats"]] == [chat_id]
+    assert changes["chats"][0]["stats"]["message_count"] == 3
+    assert [message["id"] for message in changes["messages"]] == messages
+    assert changes["messages"][0]["content"] == "message 0"
+    assert changes["deleted_chat_ids"] == changes["deleted_message_ids"] == []
+    cursor = changes["cursor"]
+
+    assert sync(client, cursor) == {**reset(cursor), "reset": False}
+
+    client.patch(
+        f"/api/v1/chats/{chat_id}/messages/{messages[0]}", json={"content": "edited"}
+    )
+    client.delete(f"/api/v1/chats/{chat_id}/messages/{messages[1]}")
+
+    changes = sync(client, cursor, fields="id,content")
+    assert changes["messages"] == [{"id": messages[0], "content": "edited"}]
+    assert changes["deleted_message_ids"] == [messages[1]]
+    cursor = changes["cursor"]
+
+    client.delete(f"/api/v1/chats/chat/{chat_id}")
+    changes = sync(client, cursor)
+    assert changes["chats"] == changes["messages"] == []
+    assert changes["deleted_chat_ids"] == [chat_id]
+    assert changes["deleted_message_ids"] == []
+
+
+def test_sync_pages_through_changes(client):
+    """Test that has_more and the cursor walk the log in order"""
+    cursor = sync(client)["cursor"]
+    created = [
+        client.post("/api/v1/chats/my", json={"title": f"chat {i}"}).json()["id"]
+        for i in range(5)
+    ]
+
+    seen = []
+    while True:
+        changes = sync(client, cursor, limit=2)
+        seen += [chat["id"] for chat in changes["chats"]]
+        cursor = changes["cursor"]
+        if not changes["has_more"]:
+            break
+    assert sorted(seen) == sorted(created)
+    assert cursor == 5
+
+
+def test_sync_resets_after_pruning(client, db_session):
+    """Test that clients behind the retained log must reload"""
+    client.post("/api/v1/chats/my", json={"title": "old"})
+    client.post("/api/v1/chats/my", json={"title": "new"})
+
+    db_session.query(SyncChange).filter(SyncChange.seq == 1).update(
+        {SyncChange.created_at: SyncChange.created_at - timedelta(days=60)}
+    )
+    db_session.commit()
+    assert ChangeLogService.prune(db_session) == 1
+
+    assert sync(client, 0) == reset(2)
+    assert len(sync(client, 1)["chats"]) == 1
+    assert sync(client, 7) == reset(2)
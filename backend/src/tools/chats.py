@@ -0,0 +1,66 @@
+"""
+Maintenance commands for chats.
+
+Usage (from the backend directory):
+    python -m src.tools.chats purge [--batch-size 1000]
+    python -m src.tools.chats prune-sync [--days 30]
+"""
+
+import argparse
+from datetime import timedelta
+
+from src.database import SessionLocal
+from src.models.chat_models import ChatPurgeJob
+from src.services.change_log import SYNC_RETENTION_DAYS, ChangeLogService
+from src.services.chat_purge import CHAT_PURGE_BATCH_SIZE, ChatPurgeService
+
+
+def resume_purges(batch_size: int = CHAT_PURGE_BATCH_SIZE) -> int:
+    """
+    Run purge jobs that were interrupted or failed.
+
+    Returns:
+        Number of jobs run
+    """
+    db = SessionLocal()
+    try:
+        job_ids = [
+            job_id
+            for (job_id,) in db.query(ChatPurgeJob.id)
+            .filter(ChatPurgeJob.status != "done")
+            .order_by(ChatPurgeJob.created_at)
+        ]
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        ChatPurgeService.run(job_id, batch_size=batch_size)
+    return len(job_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    purge = commands.add_parser("purge", help="Resume unfinished chat purges")
+    purge.add_argument("--batch-size", type=int, default=CHAT_PURGE_BATCH_SIZE)
+
+    prune = commands.add_parser("prune-sync", help="Delete old sync change log entries")
+    prune.add_argument("--days", type=int, default=SYNC_RETENTION_DAYS)
+
+    args = parser.parse_args()
+    if args.command == "prune-sync":
+        db = SessionLocal()
+        try:
+            count = ChangeLogService.prune(db, timedelta(days=args.days))
+        finally:
+            db.close()
+        print(f"Deleted {count} sync change log entries")
+        return
+
+    count = resume_purges(batch_size=args.batch_size)
+    print(f"Ran {count} purge jobs")
+
+
+if __name__ == "__main__":
+    main()
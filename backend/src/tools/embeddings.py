@@ -0,0 +1,64 @@
+"""
+Maintenance commands for message embeddings.
+
+Usage (from the backend directory):
+    python -m src.tools.embeddings index [--user USER_ID]
+    python -m src.tools.embeddings prune
+"""
+
+import argparse
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from src.database import SessionLocal
+from src.models.user import User
+from src.services.embeddings import EmbeddingService
+
+
+async def index_all(user_id: Optional[UUID] = None) -> int:
+    """
+    Embed the messages of one or every user that are not indexed yet.
+
+    Returns:
+        Number of messages indexed
+    """
+    if user_id is None:
+        db = SessionLocal()
+        try:
+            user_ids = [user_id for (user_id,) in db.query(User.id)]
+        finally:
+            db.close()
+    else:
+        user_ids = [user_id]
+
+    indexed = 0
+    for user_id in user_ids:
+        indexed += await EmbeddingService.index_user_messages(user_id)
+    return indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Message embedding maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="Embed messages without embeddings")
+    index.add_argument("--user", type=UUID, default=None)
+
+    commands.add_parser("prune", help="Delete embeddings no message uses")
+
+    args = parser.parse_args()
+    if args.command == "index":
+        indexed = asyncio.run(index_all(args.user))
+        print(f"Embedded {indexed} messages")
+    else:
+        db = SessionLocal()
+        try:
+            deleted = EmbeddingService.prune_unused(db, force=True)
+        finally:
+            db.close()
+        print(f"Deleted {deleted} unused embeddings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Maintenance commands for the image blob store.
+
+Usage (from the backend directory):
+    python -m src.tools.images migrate [--batch-size 200]
+    python -m src.tools.images gc [--grace-hours 1]
+"""
+
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session, load_only
+from src.core.logger import app_logger
+from src.database import SessionLocal
+from src.models.chat_models import Chat, Message
+from src.services.change_log import ChangeLogService
+from src.services.images import ImageService, InvalidImageError, is_image_ref
+
+
+def migrate_inline_images(db: Session, batch_size: int = 200) -> int:
+    """
+    Move base64 images stored in Message.images into the blob store.
+
+    Rows are processed in id order and committed per batch, so the command
+    can be interrupted and started again at any time. The owner of each chat
+    becomes an owner of its images. Messages with an invalid image are logged
+    and kept as they are. Chats whose messages changed get a new updated_at,
+    so their ETags change, and a change log entry for sync clients.
+
+    Returns:
+        Number of converted messages
+    """
+    converted = 0
+    last_id = None
+    while True:
+        query = (
+            db.query(Message, Chat.user_id)
+            .join(Chat, Chat.id == Message.chat_id)
+            .options(load_only(Message.id, Message.chat_id, Message.images))
+        )
+        if last_id is not None:
+            query = query.filter(Message.id > last_id)
+        batch = query.order_by(Message.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1][0].id
+
+        changed: Dict[Tuple[UUID, UUID], List[UUID]] = defaultdict(list)
+        for message, user_id in batch:
+            images = message.images or []
+            inline = [image for image in images if not is_image_ref(image)]
+            if not inline:
+                continue
+            try:
+                # Raises before writing to the database if any image is invalid
+                stored = iter(ImageService.store_images(db, user_id, inline))
+            except InvalidImageError as e:
+                app_logger.warning(f"Kept inline images of message {message.id}: {e}")
+                continue
+            refs = [image if is_image_ref(image) else next(stored) for image in images]
+            db.query(Message).filter(Message.id == message.id).update(
+                {Message.images: refs}, synchronize_session=False
+            )
+            changed[(message.chat_id, user_id)].append(message.id)
+            converted += 1
+
+        if changed:
+            db.query(Chat).filter(
+                Chat.id.in_({chat_id for chat_id, _ in changed})
+            ).update({Chat.updated_at: datetime.now()}, synchronize_session=False)
+        for (chat_id, user_id), message_ids in changed.items():
+            ChangeLogService.messages_changed(
+                db, user_id, chat_id, upserted=message_ids
+            )
+        db.commit()
+        db.expunge_all()
+        app_logger.info(f"Migrated images up to message {last_id} ({converted} so far)")
+
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image blob store maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="Move inline base64 images to blobs")
+    migrate.add_argument("--batch-size", type=int, default=200)
+
+    gc = commands.add_parser("gc", help="Delete unreferenced blobs")
+    gc.add_argument("--grace-hours", type=float, default=1)
+
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        if args.command == "migrate":
+            converted = migrate_inline_images(db, batch_size=args.batch_size)
+            print(f"Converted {converted} messages")
+        else:
+            deleted = ImageService.collect_garbage(
+                db, grace=timedelta(hours=args.grace_hours)
+            )
+            print(f"Deleted {deleted} unreferenced images")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -62,7 +62,9 @@ export const useChatStore = defineStore('chat', () => {
       loading.value = true
       error.value = null
 
-      const response = await api.get(`/chats/chat/${chatId}`)
+      // Thinking is not part of the default message fields; it is shown in the
+      // chat and sent back to the model with the history
+      const response = await api.get(`/chats/chat/${chatId}?include=thinking`)
 
       currentConversation.value = response.chat
       messages.value = response.messages.map((msg) => ({